@@ -4,6 +4,7 @@ from typing import Optional
 
 from aiohttp import web
 from aiogram import Bot, Dispatcher, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.types import (
     BufferedInputFile,
@@ -24,9 +25,30 @@ sys.path.append(str(ROOT))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("admin_bot")
+from shared.auth_context import auth_contexts
+from shared.bot_pool import close_bots, get_bot
 from shared.config import settings
-from shared.db import AsyncSessionLocal
-from shared.escrow import refund_escrow, release_escrow
+from shared.db import AsyncSessionLocal, pool_stats, read_session
+from shared.internal_api import internal_token_middleware
+from shared.middlewares import ActorMiddleware, QueryStatsMiddleware
+from shared.query_stats import query_budget
+from shared.admin_queues import (
+    QueueCursor,
+    clip_line,
+    escrows_query,
+    fetch_page,
+    parse_queue_callback,
+    pending_content_query,
+    pending_crypto_query,
+    pending_models_query,
+    render_page,
+)
+from shared.escrow import get_escrow_with_parties, refund_escrow, release_escrow
+from shared.stats import (
+    cached_platform_stats,
+    format_age,
+    stats_age_seconds,
+)
 from shared.time_utils import utcnow
 from models import (
     AdminAction,
@@ -39,7 +61,7 @@ from models import (
     User,
 )
 from bot.session_flow import get_or_create_user
-from shared.notifications import send_user_message
+from shared.notifications import flush_escrow_log, send_user_message
 from shared.payment_processor import process_transaction, _deliver_content_to_buyer
 
 
@@ -146,59 +168,52 @@ def _admin_entry_keyboard() -> InlineKeyboardMarkup:
     )
 
 
-def _model_action_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Review",
-                    callback_data=f"admin:review_model:{user_id}",
-                ),
-                InlineKeyboardButton(
-                    text="Approve",
-                    callback_data=f"admin:approve_model:{user_id}",
-                ),
-                InlineKeyboardButton(
-                    text="Reject",
-                    callback_data=f"admin:reject_model:{user_id}",
-                ),
-            ]
-        ]
-    )
-
-
-def _escrow_action_keyboard(escrow_ref: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Release",
-                    callback_data=f"admin:release_escrow:{escrow_ref}",
-                )
-            ]
-        ]
-    )
+# Queue views show one row of these per item; `prefix` is the item's number.
+def _model_action_buttons(user_id: int, prefix: str = "") -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton(
+            text=f"{prefix}Review",
+            callback_data=f"admin:review_model:{user_id}",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Approve",
+            callback_data=f"admin:approve_model:{user_id}",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Reject",
+            callback_data=f"admin:reject_model:{user_id}",
+        ),
+    ]
+
+
+def _escrow_action_buttons(escrow_ref: str, prefix: str = "") -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton(
+            text=f"{prefix}Release",
+            callback_data=f"admin:release_escrow:{escrow_ref}",
+        )
+    ]
+
+
+def _content_action_buttons(content_id: int, prefix: str = "") -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton(
+            text=f"{prefix}Review",
+            callback_data=f"admin:review_content:{content_id}",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Approve",
+            callback_data=f"admin:approve_content:{content_id}",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Reject",
+            callback_data=f"admin:reject_content:{content_id}",
+        ),
+    ]
 
 
 def _content_action_keyboard(content_id: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Review",
-                    callback_data=f"admin:review_content:{content_id}",
-                ),
-                InlineKeyboardButton(
-                    text="Approve",
-                    callback_data=f"admin:approve_content:{content_id}",
-                ),
-                InlineKeyboardButton(
-                    text="Reject",
-                    callback_data=f"admin:reject_content:{content_id}",
-                ),
-            ]
-        ]
-    )
+    return InlineKeyboardMarkup(inline_keyboard=[_content_action_buttons(content_id)])
 
 
 def _gallery_cta_keyboard(
@@ -266,38 +281,44 @@ async def _post_gallery_content(message_bot: Bot, content: DigitalContent, model
     )
 
 
-def _crypto_action_keyboard(transaction_ref: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Approve",
-                    callback_data=f"admin:approve_crypto:{transaction_ref}",
-                ),
-                InlineKeyboardButton(
-                    text="Reject",
-                    callback_data=f"admin:reject_crypto:{transaction_ref}",
-                ),
-            ]
-        ]
-    )
-
-
-def _dispute_action_keyboard(escrow_ref: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Release",
-                    callback_data=f"admin:resolve_dispute:{escrow_ref}:release",
-                ),
-                InlineKeyboardButton(
-                    text="Refund",
-                    callback_data=f"admin:resolve_dispute:{escrow_ref}:refund",
-                ),
-            ]
-        ]
-    )
+def _crypto_action_buttons(transaction_ref: str, prefix: str = "") -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton(
+            text=f"{prefix}Approve",
+            callback_data=f"admin:approve_crypto:{transaction_ref}",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Reject",
+            callback_data=f"admin:reject_crypto:{transaction_ref}",
+        ),
+    ]
+
+
+def _dispute_action_buttons(escrow_ref: str, prefix: str = "") -> list[InlineKeyboardButton]:
+    return [
+        InlineKeyboardButton(
+            text=f"{prefix}Release",
+            callback_data=f"admin:resolve_dispute:{escrow_ref}:release",
+        ),
+        InlineKeyboardButton(
+            text=f"{prefix}Refund",
+            callback_data=f"admin:resolve_dispute:{escrow_ref}:refund",
+        ),
+    ]
+
+
+async def _show_queue(
+    message: types.Message, cursor: QueueCursor, text: str, markup: Optional[InlineKeyboardMarkup]
+) -> None:
+    # Opening a queue sends one message; paging edits it in place.
+    if cursor.after is None and cursor.before is None:
+        await message.answer(text, reply_markup=markup)
+        return
+    try:
+        await message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest as exc:
+        if "message is not modified" not in str(exc):
+            raise
 
 
 def _init_sentry():
@@ -356,150 +377,116 @@ async def whoami_handler(message: types.Message):
     )
 
 
-async def pending_models_handler(message: types.Message):
+@query_budget(1)
+async def pending_models_handler(message: types.Message, cursor: Optional[QueueCursor] = None):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(ModelProfile).where(ModelProfile.verification_status == "submitted")
+    cursor = cursor or QueueCursor("pending_models")
+    async with read_session() as db:
+        page = await fetch_page(
+            db, pending_models_query(), ModelProfile.id, after=cursor.after, before=cursor.before
         )
-        models = list(result.scalars().all())
-
-    if not models:
-        await message.answer("No pending models.")
-        return
 
-    await message.answer("Pending model verifications:")
-    async with AsyncSessionLocal() as db:
-        for item in models[:20]:
-            user = await db.get(User, item.user_id)
-            public_id = user.public_id if user else str(item.user_id)
-            await message.answer(
-                f"User ID: {public_id}\nName: {item.display_name or 'N/A'}",
-                reply_markup=_model_action_keyboard(item.user_id),
-            )
+    rows = [
+        (
+            f"{item.user.public_id if item.user else item.user_id} · {item.display_name or 'N/A'}",
+            _model_action_buttons(item.user_id, f"{number} "),
+        )
+        for number, item in enumerate(page.items, 1)
+    ]
+    await _show_queue(
+        message,
+        cursor,
+        *render_page(cursor.queue, page, "Pending model verifications:", "No pending models.", rows),
+    )
 
 
-async def pending_content_handler(message: types.Message):
+@query_budget(1)
+async def pending_content_handler(message: types.Message, cursor: Optional[QueueCursor] = None):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        rejected = (
-            select(AdminAction.id)
-            .where(
-                AdminAction.target_type == "digital_content",
-                AdminAction.target_id == DigitalContent.id,
-                AdminAction.action_type == "reject_content",
-            )
-            .exists()
+    cursor = cursor or QueueCursor("pending_content")
+    async with read_session() as db:
+        page = await fetch_page(
+            db, pending_content_query(), DigitalContent.id, after=cursor.after, before=cursor.before
         )
-        result = await db.execute(
-            select(DigitalContent).where(
-                DigitalContent.is_active.is_(False),
-                ~rejected,
-            )
-        )
-        items = list(result.scalars().all())
 
-    if not items:
-        await message.answer("No pending content.")
-        return
-
-    await message.answer("Pending content approvals:")
-    async with AsyncSessionLocal() as db:
-        for content in items[:20]:
-            user = await db.get(User, content.model_id)
-            public_id = user.public_id if user else str(content.model_id)
-            await message.answer(
-                f"Content #{content.id}\nModel: {public_id}\n{content.title} - ${content.price}",
-                reply_markup=_content_action_keyboard(content.id),
-            )
+    rows = [
+        (
+            # Clipped here too, so a long title cannot push the model out of the line.
+            f"#{content.id} {clip_line(content.title or '', 60)} - ${content.price} · "
+            f"model {content.model.public_id if content.model else content.model_id}",
+            _content_action_buttons(content.id, f"{number} "),
+        )
+        for number, content in enumerate(page.items, 1)
+    ]
+    await _show_queue(
+        message,
+        cursor,
+        *render_page(cursor.queue, page, "Pending content approvals:", "No pending content.", rows),
+    )
 
 
-async def pending_crypto_handler(message: types.Message):
+@query_budget(1)
+async def pending_crypto_handler(message: types.Message, cursor: Optional[QueueCursor] = None):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(Transaction).where(
-                Transaction.payment_provider == "crypto",
-                Transaction.status == "pending_review",
-            )
+    cursor = cursor or QueueCursor("pending_crypto")
+    async with read_session() as db:
+        page = await fetch_page(
+            db, pending_crypto_query(), Transaction.id, after=cursor.after, before=cursor.before
         )
-        items = list(result.scalars().all())
 
-    if not items:
-        await message.answer("No pending crypto approvals.")
-        return
-
-    await message.answer("Pending crypto approvals:")
-    for tx in items[:20]:
+    rows = []
+    for number, tx in enumerate(page.items, 1):
         metadata = tx.metadata_json or {}
         network = metadata.get("crypto_network") or "-"
         currency = metadata.get("crypto_currency") or "-"
         tx_hash = metadata.get("crypto_tx_hash") or "-"
-        await message.answer(
-            f"Transaction ref: {tx.transaction_ref}\n"
-            f"Amount: {tx.amount}\n"
-            f"User ID: {tx.user_id}\n"
-            f"Network: {network}\n"
-            f"Currency: {currency}\n"
-            f"Tx hash: {tx_hash}",
-            reply_markup=_crypto_action_keyboard(tx.transaction_ref),
+        rows.append(
+            (
+                f"{tx.transaction_ref} · {tx.amount} {currency}/{network} · "
+                f"user {tx.user_id} · tx {tx_hash}",
+                _crypto_action_buttons(tx.transaction_ref, f"{number} "),
+            )
         )
+    await _show_queue(
+        message,
+        cursor,
+        *render_page(
+            cursor.queue, page, "Pending crypto approvals:", "No pending crypto approvals.", rows
+        ),
+    )
 
 
+@query_budget(1)
 async def stats_handler(message: types.Message):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        total_users = (await db.execute(select(func.count()).select_from(User))).scalar() or 0
-        total_models = (
-            await db.execute(
-                select(func.count()).select_from(User).where(User.role == "model")
-            )
-        ).scalar() or 0
-        pending_models = (
-            await db.execute(
-                select(func.count()).select_from(ModelProfile).where(
-                    ModelProfile.verification_status == "submitted"
-                )
-            )
-        ).scalar() or 0
-        held_escrows = (
-            await db.execute(
-                select(func.count()).select_from(EscrowAccount).where(
-                    EscrowAccount.status == "held"
-                )
-            )
-        ).scalar() or 0
-        disputed_escrows = (
-            await db.execute(
-                select(func.count()).select_from(EscrowAccount).where(
-                    EscrowAccount.status == "disputed"
-                )
-            )
-        ).scalar() or 0
-        total_volume = (
-            await db.execute(select(func.coalesce(func.sum(Transaction.amount), 0)))
-        ).scalar() or 0
+    # The worker keeps this row current; /stats never counts anything itself.
+    async with read_session() as db:
+        stats = await cached_platform_stats(db)
+    if stats is None:
+        await message.answer("Platform stats are not ready yet. Try again in a minute.")
+        return
 
     await message.answer(
         "Platform stats 📊\n"
-        f"Users: {total_users}\n"
-        f"Models: {total_models}\n"
-        f"Pending models: {pending_models}\n"
-        f"Held escrows: {held_escrows}\n"
-        f"Disputed escrows: {disputed_escrows}\n"
-        f"Total volume: {total_volume}"
+        f"Users: {stats.total_users}\n"
+        f"Models: {stats.total_models}\n"
+        f"Pending models: {stats.pending_models}\n"
+        f"Held escrows: {stats.held_escrows}\n"
+        f"Disputed escrows: {stats.disputed_escrows}\n"
+        f"Total volume: {stats.total_volume}\n"
+        f"\nUpdated {format_age(stats_age_seconds(stats))} ago"
     )
 
 
@@ -579,15 +566,13 @@ async def _transfer_media_to_admin_target(
     if not settings.user_bot_token:
         logger.warning("USER_BOT_TOKEN not configured; cannot fetch media.")
         return
-    user_bot = Bot(token=settings.user_bot_token)
+    user_bot = get_bot(settings.user_bot_token)
     file_path = None
     try:
         tg_file = await user_bot.get_file(file_id)
         file_path = tg_file.file_path
     except Exception as exc:
         logger.warning("Failed to fetch file path via user bot: %s", exc)
-    finally:
-        await user_bot.session.close()
 
     if not file_path:
         logger.warning("No file path available for media transfer.")
@@ -646,23 +631,19 @@ async def _send_content_review_media(admin_bot: Bot, chat_id: int, content_id: i
 
 async def _notify_model(telegram_id: int, text: str) -> None:
     if settings.user_bot_token:
-        bot = Bot(token=settings.user_bot_token)
+        bot = get_bot(settings.user_bot_token)
         try:
             await bot.send_message(telegram_id, text)
             return
         except Exception as exc:
             logger.warning("User bot notify failed: %s", exc)
-        finally:
-            await bot.session.close()
     if not settings.admin_bot_token:
         return
-    admin_bot = Bot(token=settings.admin_bot_token)
+    admin_bot = get_bot(settings.admin_bot_token)
     try:
         await admin_bot.send_message(telegram_id, text)
     except Exception as exc:
         logger.warning("Admin bot notify failed: %s", exc)
-    finally:
-        await admin_bot.session.close()
 
 
 async def _approve_model(user_id: int, admin_id: int) -> Optional[int]:
@@ -689,6 +670,7 @@ async def _approve_model(user_id: int, admin_id: int) -> Optional[int]:
             )
         )
         await db.commit()
+    await auth_contexts.invalidate(user.telegram_id if user else None)
 
     return user.telegram_id if user else None
 
@@ -744,6 +726,7 @@ async def _reject_model(user_id: int, admin_id: int) -> Optional[int]:
             )
         )
         await db.commit()
+    await auth_contexts.invalidate(user.telegram_id if user else None)
 
     return user.telegram_id if user else None
 
@@ -903,6 +886,7 @@ async def ban_user_handler(message: types.Message):
             )
         )
         await db.commit()
+    await auth_contexts.invalidate(user.telegram_id)
     await message.answer(f"User {user_id} banned.")
     if user.telegram_id:
         await _notify_model(user.telegram_id, "Your account has been suspended by admin.")
@@ -941,55 +925,56 @@ async def unban_user_handler(message: types.Message):
             )
         )
         await db.commit()
+    await auth_contexts.invalidate(user.telegram_id)
     await message.answer(f"User {user_id} unbanned.")
 
 
-async def pending_escrows_handler(message: types.Message):
+@query_budget(1)
+async def pending_escrows_handler(message: types.Message, cursor: Optional[QueueCursor] = None):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(EscrowAccount).where(EscrowAccount.status == "held").order_by(
-                EscrowAccount.held_at.desc()
-            )
+    cursor = cursor or QueueCursor("pending_escrows")
+    async with read_session() as db:
+        page = await fetch_page(
+            db, escrows_query("held"), EscrowAccount.id, after=cursor.after, before=cursor.before
         )
-        escrows = list(result.scalars().all())
-
-    if not escrows:
-        await message.answer("No pending escrows.")
-        return
 
-    await message.answer("Held escrows:")
-    for item in escrows[:20]:
-        await message.answer(
-            f"{item.escrow_ref}\nType: {item.escrow_type}\nAmount: {item.amount}",
-            reply_markup=_escrow_action_keyboard(item.escrow_ref),
+    rows = [
+        (
+            f"{item.escrow_ref} · {item.escrow_type} · {item.amount}",
+            _escrow_action_buttons(item.escrow_ref, f"{number} "),
         )
+        for number, item in enumerate(page.items, 1)
+    ]
+    await _show_queue(
+        message, cursor, *render_page(cursor.queue, page, "Held escrows:", "No pending escrows.", rows)
+    )
 
 
-async def disputes_handler(message: types.Message):
+@query_budget(1)
+async def disputes_handler(message: types.Message, cursor: Optional[QueueCursor] = None):
     if not _admin_guard(message):
         await message.answer("Admin access required.")
         return
 
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(EscrowAccount).where(EscrowAccount.status == "disputed")
+    cursor = cursor or QueueCursor("disputes")
+    async with read_session() as db:
+        page = await fetch_page(
+            db, escrows_query("disputed"), EscrowAccount.id, after=cursor.after, before=cursor.before
         )
-        escrows = list(result.scalars().all())
 
-    if not escrows:
-        await message.answer("No active disputes.")
-        return
-
-    await message.answer("Disputed escrows:")
-    for item in escrows[:20]:
-        await message.answer(
-            f"{item.escrow_ref}\nType: {item.escrow_type}\nAmount: {item.amount}",
-            reply_markup=_dispute_action_keyboard(item.escrow_ref),
+    rows = [
+        (
+            f"{item.escrow_ref} · {item.escrow_type} · {item.amount}",
+            _dispute_action_buttons(item.escrow_ref, f"{number} "),
         )
+        for number, item in enumerate(page.items, 1)
+    ]
+    await _show_queue(
+        message, cursor, *render_page(cursor.queue, page, "Disputed escrows:", "No active disputes.", rows)
+    )
 
 
 async def resolve_dispute_handler(message: types.Message):
@@ -1028,13 +1013,11 @@ async def _release_escrow_by_ref(
         await message.answer("Admin access required.")
         return
     async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(EscrowAccount).where(EscrowAccount.escrow_ref == escrow_ref)
-        )
-        escrow = result.scalar_one_or_none()
+        escrow = await get_escrow_with_parties(db, escrow_ref)
         if not escrow:
             await message.answer("Escrow not found.")
             return
+        payer, receiver = escrow.payer, escrow.receiver
         if escrow.status not in {"held", "disputed"}:
             await message.answer(f"Escrow {escrow_ref} already {escrow.status}.")
             return
@@ -1044,11 +1027,10 @@ async def _release_escrow_by_ref(
             )
             purchase = result.scalar_one_or_none()
             content = await db.get(DigitalContent, escrow.related_id) if escrow.related_id else None
-            buyer = await db.get(User, escrow.payer_id) if escrow.payer_id else None
-            if not purchase or not content or not buyer:
+            if not purchase or not content or not payer:
                 await message.answer("Content delivery failed: missing purchase or content.")
                 return
-            delivered = await _deliver_content_to_buyer(buyer, content)
+            delivered = await _deliver_content_to_buyer(payer, content)
             if not delivered:
                 await message.answer("Content delivery failed. Escrow not released.")
                 return
@@ -1075,27 +1057,25 @@ async def _release_escrow_by_ref(
             )
         )
         await db.commit()
+        if escrow.escrow_type == "access_fee":
+            await auth_contexts.invalidate(payer.telegram_id if payer else None)
         await message.answer(f"Escrow {escrow_ref} released.")
-        if escrow.payer_id:
-            payer = await db.get(User, escrow.payer_id)
-            if payer:
-                if escrow.escrow_type == "access_fee":
-                    await send_user_message(
-                        payer.telegram_id,
-                        "Access granted ✅ Your gallery is now unlocked.",
-                    )
-                else:
-                    await send_user_message(
-                        payer.telegram_id,
-                        f"Escrow {escrow_ref} has been released.",
-                    )
-        if escrow.receiver_id:
-            receiver = await db.get(User, escrow.receiver_id)
-            if receiver:
+        if payer:
+            if escrow.escrow_type == "access_fee":
                 await send_user_message(
-                    receiver.telegram_id,
+                    payer.telegram_id,
+                    "Access granted ✅ Your gallery is now unlocked.",
+                )
+            else:
+                await send_user_message(
+                    payer.telegram_id,
                     f"Escrow {escrow_ref} has been released.",
                 )
+        if receiver:
+            await send_user_message(
+                receiver.telegram_id,
+                f"Escrow {escrow_ref} has been released.",
+            )
 
 
 async def _resolve_dispute_by_ref(
@@ -1112,13 +1092,11 @@ async def _resolve_dispute_by_ref(
         await message.answer("Admin access required.")
         return
     async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(EscrowAccount).where(EscrowAccount.escrow_ref == escrow_ref)
-        )
-        escrow = result.scalar_one_or_none()
+        escrow = await get_escrow_with_parties(db, escrow_ref)
         if not escrow:
             await message.answer("Escrow not found.")
             return
+        payer, receiver = escrow.payer, escrow.receiver
 
         if resolution == "release":
             escrow, changed = await release_escrow(db, escrow, reason="dispute_release")
@@ -1139,47 +1117,33 @@ async def _resolve_dispute_by_ref(
         )
         await db.commit()
         await message.answer(f"Dispute resolved for {escrow_ref}: {resolution}.")
-        if escrow.payer_id:
-            payer = await db.get(User, escrow.payer_id)
-            if payer:
-                await send_user_message(
-                    payer.telegram_id,
-                    f"Dispute resolved for {escrow_ref}: {resolution}.",
-                )
-        if escrow.receiver_id:
-            receiver = await db.get(User, escrow.receiver_id)
-            if receiver:
+        for party in (payer, receiver):
+            if party:
                 await send_user_message(
-                    receiver.telegram_id,
+                    party.telegram_id,
                     f"Dispute resolved for {escrow_ref}: {resolution}.",
                 )
 
 
+QUEUE_HANDLERS = {
+    "pending_models": pending_models_handler,
+    "pending_content": pending_content_handler,
+    "pending_crypto": pending_crypto_handler,
+    "pending_escrows": pending_escrows_handler,
+    "disputes": disputes_handler,
+}
+
+
 async def admin_callback_handler(query: types.CallbackQuery):
     if not _admin_guard_query(query):
         await query.answer("Admin access required.", show_alert=True)
         return
     logger.info("Admin callback received: %s", query.data)
     data = query.data or ""
-    if data == "admin:pending_models":
+    cursor = parse_queue_callback(data)
+    if cursor and cursor.queue in QUEUE_HANDLERS:
         await query.answer()
-        await pending_models_handler(query.message)
-        return
-    if data == "admin:pending_content":
-        await query.answer()
-        await pending_content_handler(query.message)
-        return
-    if data == "admin:pending_escrows":
-        await query.answer()
-        await pending_escrows_handler(query.message)
-        return
-    if data == "admin:disputes":
-        await query.answer()
-        await disputes_handler(query.message)
-        return
-    if data == "admin:pending_crypto":
-        await query.answer()
-        await pending_crypto_handler(query.message)
+        await QUEUE_HANDLERS[cursor.queue](query.message, cursor)
         return
     if data == "admin:webapp_missing":
         await query.answer()
@@ -1427,14 +1391,18 @@ async def on_startup(bot: Bot):
 
 async def on_shutdown(bot: Bot):
     await bot.delete_webhook()
-    await bot.session.close()
+    await flush_escrow_log()
+    await close_bots()
 
 
 def main():
     _init_sentry()
 
-    bot = Bot(token=_require_bot_token())
+    bot = get_bot(_require_bot_token())
     dp = Dispatcher()
+    dp.update.outer_middleware(ActorMiddleware())
+    dp.message.middleware(QueryStatsMiddleware())
+    dp.callback_query.middleware(QueryStatsMiddleware())
     logger.info("Admin bot starting on %s:%s", settings.admin_bot_host, settings.admin_bot_port)
 
     dp.message.register(admin_start_handler, Command("start"))
@@ -1445,9 +1413,13 @@ def main():
     async def handle_shutdown(app: web.Application):
         await on_shutdown(bot)
 
-    app = web.Application()
+    async def handle_db_pool(request: web.Request):
+        return web.json_response(pool_stats())
+
+    app = web.Application(middlewares=[internal_token_middleware])
     app.on_startup.append(handle_startup)
     app.on_shutdown.append(handle_shutdown)
+    app.router.add_get("/internal/db-pool", handle_db_pool)
 
     from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
@@ -1,19 +1,52 @@
 import hashlib
 import hmac
+from contextlib import asynccontextmanager
 from pathlib import Path
 import sys
 from typing import Any, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 
 ROOT = Path(__file__).resolve().parent
 sys.path.append(str(ROOT))
 
+from shared.bot_pool import close_bots
 from shared.config import settings
-from shared.db import AsyncSessionLocal
+from shared.db import AsyncSessionLocal, pool_stats
+from shared.dedupe import Claim, webhook_dedupe_key, webhook_deduper
+from shared.internal_api import INTERNAL_TOKEN_HEADER, internal_token_ok
+from shared.notifications import flush_escrow_log
 from shared.payment_processor import process_transaction
+from shared.query_stats import track
+from shared.redis_client import close_redis
+from shared.webhook_capture import webhook_capture
+from shared.webhook_queue import consumer_pool, enqueue_webhook_event, webhook_queue_depth
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.webhook_async_mode:
+        consumer_pool.start()
+    try:
+        yield
+    finally:
+        await consumer_pool.stop()
+        await flush_escrow_log()
+        await close_bots()
+        await close_redis()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    with track("unmatched") as stats:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            stats.label = f"{request.method} {route.path}"
+        return response
 
 
 def _verify_paystack_signature(payload: bytes, signature: Optional[str]) -> bool:
@@ -37,6 +70,11 @@ def _verify_flutterwave_signature(signature: Optional[str]) -> bool:
     return hmac.compare_digest(settings.flutterwave_webhook_hash, signature)
 
 
+def _require_internal_token(request: Request) -> None:
+    if not internal_token_ok(request.headers.get(INTERNAL_TOKEN_HEADER)):
+        raise HTTPException(status_code=404)
+
+
 def _extract_reference(payload: dict[str, Any]) -> Optional[str]:
     data = payload.get("data") or {}
     return (
@@ -47,6 +85,52 @@ def _extract_reference(payload: dict[str, Any]) -> Optional[str]:
     )
 
 
+async def _handle_payment_event(
+    provider: str, transaction_ref: str, payload: dict[str, Any]
+) -> dict[str, str]:
+    dedupe_key = webhook_dedupe_key(provider, payload, transaction_ref)
+    claim = await webhook_deduper.claim(dedupe_key)
+    if claim is Claim.DONE:
+        return {"status": "duplicate"}
+    if claim is Claim.IN_FLIGHT:
+        # Not acknowledged: if the first attempt fails, the provider's next
+        # retry is what delivers the event.
+        raise HTTPException(status_code=409, detail="Event is already being processed")
+    handled = False
+    try:
+        result = await _dispatch_payment_event(provider, transaction_ref, payload)
+        handled = True
+        return result
+    finally:
+        if handled:
+            await webhook_deduper.complete(dedupe_key)
+        else:
+            await webhook_deduper.release(dedupe_key)
+
+
+async def _dispatch_payment_event(
+    provider: str, transaction_ref: str, payload: dict[str, Any]
+) -> dict[str, str]:
+    async with AsyncSessionLocal() as db:
+        if settings.webhook_async_mode:
+            # Ack as soon as the event is durably queued; the consumer pool
+            # runs process_transaction.
+            await enqueue_webhook_event(
+                db,
+                provider=provider,
+                transaction_ref=transaction_ref,
+                payload=payload,
+            )
+            return {"status": "queued"}
+        await process_transaction(
+            db,
+            transaction_ref=transaction_ref,
+            provider=provider,
+            payload=payload,
+        )
+    return {"status": "ok"}
+
+
 @app.post("/webhooks/paystack")
 async def paystack_webhook(request: Request):
     if not settings.paystack_secret_key:
@@ -55,21 +139,15 @@ async def paystack_webhook(request: Request):
     signature = request.headers.get("X-Paystack-Signature")
     if not _verify_paystack_signature(raw_body, signature):
         raise HTTPException(status_code=401, detail="Invalid Paystack signature")
+    if webhook_capture is not None:
+        await webhook_capture.append("paystack", dict(request.headers), raw_body)
 
     payload = await request.json()
     transaction_ref = _extract_reference(payload)
     if not transaction_ref:
         raise HTTPException(status_code=400, detail="Missing transaction reference")
 
-    async with AsyncSessionLocal() as db:
-        await process_transaction(
-            db,
-            transaction_ref=transaction_ref,
-            provider="paystack",
-            payload=payload,
-        )
-
-    return {"status": "ok"}
+    return await _handle_payment_event("paystack", transaction_ref, payload)
 
 
 @app.post("/webhooks/flutterwave")
@@ -79,18 +157,29 @@ async def flutterwave_webhook(request: Request):
     signature = request.headers.get("verif-hash")
     if not _verify_flutterwave_signature(signature):
         raise HTTPException(status_code=401, detail="Invalid Flutterwave signature")
+    if webhook_capture is not None:
+        await webhook_capture.append("flutterwave", dict(request.headers), await request.body())
 
     payload = await request.json()
     transaction_ref = _extract_reference(payload)
     if not transaction_ref:
         raise HTTPException(status_code=400, detail="Missing transaction reference")
 
+    return await _handle_payment_event("flutterwave", transaction_ref, payload)
+
+
+@app.get("/internal/webhook-queue", dependencies=[Depends(_require_internal_token)])
+async def webhook_queue_stats():
     async with AsyncSessionLocal() as db:
-        await process_transaction(
-            db,
-            transaction_ref=transaction_ref,
-            provider="flutterwave",
-            payload=payload,
-        )
+        depth = await webhook_queue_depth(db)
+    return {"async_mode": settings.webhook_async_mode, **depth, **consumer_pool.stats()}
 
-    return {"status": "ok"}
+
+@app.get("/internal/webhook-dedupe", dependencies=[Depends(_require_internal_token)])
+async def webhook_dedupe_stats():
+    return webhook_deduper.stats()
+
+
+@app.get("/internal/db-pool", dependencies=[Depends(_require_internal_token)])
+async def db_pool_stats():
+    return pool_stats()
@@ -1,9 +1,11 @@
+from datetime import timedelta
 from typing import Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import User, Session, EscrowAccount, Transaction
+from shared.auth_context import auth_contexts
 from shared.escrow import create_escrow, release_escrow
 from shared.transactions import create_transaction
 from shared.id_utils import generate_public_id
@@ -63,6 +65,7 @@ async def _allocate_public_id(db: AsyncSession, max_tries: int = 20) -> str:
 async def update_user_role(db: AsyncSession, user: User, role: str) -> User:
     user.role = role
     await db.commit()
+    await auth_contexts.invalidate(user.telegram_id)
     await db.refresh(user)
     return user
 
@@ -141,6 +144,15 @@ async def set_session_status(db: AsyncSession, session: Session, status: str):
     await db.refresh(session)
 
 
+async def start_session(db: AsyncSession, session: Session) -> None:
+    now = utcnow()
+    session.started_at = now
+    session.actual_start = now
+    if session.duration_minutes:
+        session.scheduled_end = now + timedelta(minutes=session.duration_minutes)
+    await set_session_status(db, session, "active")
+
+
 async def set_escrow_status(
     db: AsyncSession,
     escrow: EscrowAccount,
@@ -0,0 +1,9 @@
+async def upgrade(op):
+    data_type = await op.column_type("users", "telegram_id")
+    if data_type is None:
+        raise RuntimeError("users.telegram_id column not found")
+    if data_type != "bigint":
+        # Rewrites the table; run it in a quiet window on large databases.
+        await op.execute(
+            "ALTER TABLE users ALTER COLUMN telegram_id TYPE BIGINT USING telegram_id::bigint"
+        )
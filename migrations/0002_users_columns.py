@@ -0,0 +1,17 @@
+COLUMNS = [
+    ("first_name", "TEXT"),
+    ("last_name", "TEXT"),
+    ("email", "TEXT"),
+    ("wallet_balance", "DOUBLE PRECISION DEFAULT 0"),
+    ("public_id", "VARCHAR(4)"),
+    ("disclaimer_accepted_at", "TIMESTAMP"),
+    ("disclaimer_version", "TEXT"),
+]
+
+
+async def upgrade(op):
+    adding_public_id = not await op.column_exists("users", "public_id")
+    for column, definition in COLUMNS:
+        await op.execute(f"ALTER TABLE users ADD COLUMN IF NOT EXISTS {column} {definition}")
+    if adding_public_id:
+        await op.create_index("idx_users_public_id", "users (public_id)", unique=True)
@@ -0,0 +1,13 @@
+COLUMNS = [
+    ("client_confirmed", "BOOLEAN DEFAULT FALSE"),
+    ("model_confirmed", "BOOLEAN DEFAULT FALSE"),
+    ("duration_minutes", "INTEGER"),
+    ("started_at", "TIMESTAMP"),
+    ("ended_at", "TIMESTAMP"),
+    ("completed_at", "TIMESTAMP"),
+]
+
+
+async def upgrade(op):
+    for column, definition in COLUMNS:
+        await op.execute(f"ALTER TABLE sessions ADD COLUMN IF NOT EXISTS {column} {definition}")
@@ -0,0 +1,5 @@
+async def upgrade(op):
+    if await op.column_exists("transactions", "metadata") and not await op.column_exists(
+        "transactions", "metadata_json"
+    ):
+        await op.execute("ALTER TABLE transactions RENAME COLUMN metadata TO metadata_json")
@@ -0,0 +1,7 @@
+async def upgrade(op):
+    await op.execute(
+        "ALTER TABLE model_profiles ADD COLUMN IF NOT EXISTS verification_video_url VARCHAR"
+    )
+    await op.execute(
+        "ALTER TABLE model_profiles ADD COLUMN IF NOT EXISTS verification_video_path VARCHAR"
+    )
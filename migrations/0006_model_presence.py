@@ -0,0 +1,5 @@
+async def upgrade(op):
+    await op.execute(
+        "ALTER TABLE model_profiles ADD COLUMN IF NOT EXISTS is_online BOOLEAN DEFAULT FALSE"
+    )
+    await op.execute("ALTER TABLE model_profiles ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP")
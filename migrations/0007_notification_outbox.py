@@ -0,0 +1,5 @@
+from models import NotificationOutbox
+
+
+async def upgrade(op):
+    await op.create_table(NotificationOutbox.__table__)
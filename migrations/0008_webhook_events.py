@@ -0,0 +1,5 @@
+from models import WebhookEvent
+
+
+async def upgrade(op):
+    await op.create_table(WebhookEvent.__table__)
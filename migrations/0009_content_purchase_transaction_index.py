@@ -0,0 +1,2 @@
+async def upgrade(op):
+    await op.create_index("idx_content_purchases_transaction", "content_purchases (transaction_id)")
@@ -0,0 +1,12 @@
+async def upgrade(op):
+    await op.execute("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS scheduled_end TIMESTAMP")
+    updated = await op.backfill(
+        "sessions",
+        "scheduled_end = COALESCE(actual_start, started_at) + duration_minutes * INTERVAL '1 minute'",
+        "scheduled_end IS NULL AND duration_minutes IS NOT NULL "
+        "AND COALESCE(actual_start, started_at) IS NOT NULL",
+    )
+    print(f"  backfilled scheduled_end on {updated} sessions")
+    await op.create_index(
+        "idx_sessions_active_scheduled_end", "sessions (scheduled_end) WHERE status = 'active'"
+    )
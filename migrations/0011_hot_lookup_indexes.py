@@ -0,0 +1,25 @@
+INDEXES = [
+    ("idx_model_profiles_user", "model_profiles (user_id)"),
+    (
+        "idx_model_profiles_submitted",
+        "model_profiles (user_id) WHERE verification_status = 'submitted'",
+    ),
+    ("idx_client_profiles_user", "client_profiles (user_id)"),
+    ("idx_client_profiles_access_fee_escrow", "client_profiles (access_fee_escrow_id)"),
+    ("idx_sessions_status", "sessions (status)"),
+    ("idx_digital_content_model", "digital_content (model_id, is_active)"),
+    ("idx_digital_content_pending", "digital_content (id) WHERE is_active = false"),
+    ("idx_content_purchases_escrow", "content_purchases (escrow_id)"),
+    (
+        "idx_transactions_pending_review",
+        "transactions (payment_provider) WHERE status = 'pending_review'",
+    ),
+    ("idx_admin_actions_target", "admin_actions (target_type, target_id, action_type)"),
+]
+
+
+async def upgrade(op):
+    for name, definition in INDEXES:
+        await op.create_index(name, definition)
+    for table in sorted({definition.split()[0] for _, definition in INDEXES}):
+        await op.execute(f"ANALYZE {table}")
@@ -0,0 +1,5 @@
+from models import WalletLedgerEntry
+
+
+async def upgrade(op):
+    await op.create_table(WalletLedgerEntry.__table__)
@@ -0,0 +1,122 @@
+from sqlalchemy import text
+
+from shared.partitions import (
+    add_months,
+    default_partition_ddl,
+    month_partition_ddl,
+    month_start,
+)
+from shared.time_utils import utcnow
+
+# The existing table becomes the first partition (<table>_legacy) covering
+# everything before `boundary`, so no rows are copied. Every index and
+# constraint the partitioned parent needs is built concurrently on the old
+# table first; the swap itself only touches the catalog.
+TABLES = {
+    "transactions": {
+        "created_at_fill": "COALESCE(completed_at, now())",
+        "indexes": [
+            ("idx_transactions_ref", "(transaction_ref)", None),
+            ("idx_transactions_pending_review", "(payment_provider)", "status = 'pending_review'"),
+        ],
+    },
+    "admin_actions": {
+        "created_at_fill": "now()",
+        "indexes": [
+            ("idx_admin_actions_target", "(target_type, target_id, action_type)", None),
+        ],
+    },
+}
+
+
+async def _is_partitioned(op, table: str) -> bool:
+    return await op.scalar(
+        "SELECT relkind::text = 'p' FROM pg_class WHERE oid = to_regclass(:table)",
+        {"table": table},
+    )
+
+
+async def _constraints(op, sql: str, table: str) -> list:
+    return (await op.conn.execute(text(sql), {"table": table})).all()
+
+
+async def _partition(op, table: str, spec: dict) -> None:
+    legacy = f"{table}_legacy"
+    # Two months out, so rows written while the migration runs still fall
+    # below the legacy partition's bound.
+    first_month = add_months(month_start(utcnow()), 2)
+    boundary = f"{first_month:%Y-%m-%d}"
+
+    await op.backfill(table, f"created_at = {spec['created_at_fill']}", "created_at IS NULL")
+    await op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT now()")
+    # SET NOT NULL and ATTACH PARTITION both skip their full-table scan when a
+    # validated CHECK already proves the condition; VALIDATE does not block writes.
+    for name, check in (
+        (f"{table}_created_at_not_null", "created_at IS NOT NULL"),
+        (f"{legacy}_bound", f"created_at < '{boundary}'"),
+    ):
+        await op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+        await op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({check}) NOT VALID")
+        await op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+    await op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL")
+    await op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_created_at_not_null")
+
+    await op.create_index(f"{legacy}_id_created_at", f"{table} (id, created_at)", unique=True)
+    renames, parent_indexes = [], []
+    for name, columns, where in spec["indexes"]:
+        legacy_name = f"{legacy}_{name.removeprefix(f'idx_{table}_')}"
+        definition = f"{table} {columns}" + (f" WHERE {where}" if where else "")
+        if await op.scalar("SELECT to_regclass(:name) IS NOT NULL", {"name": name}):
+            renames.append(f"ALTER INDEX {name} RENAME TO {legacy_name}")
+        else:
+            await op.create_index(legacy_name, definition)
+        # Attaches the matching legacy index instead of building a new one.
+        parent_indexes.append(f"CREATE INDEX {name} ON {definition}")
+
+    # Foreign keys pointing at the table cannot survive: id alone is no longer
+    # unique. Its own foreign keys are re-added on the parent, where Postgres
+    # adopts the legacy table's identical constraints without re-checking.
+    incoming = await _constraints(
+        op,
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:table)",
+        table,
+    )
+    outgoing = await _constraints(
+        op,
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND conrelid = to_regclass(:table)",
+        table,
+    )
+    sequence = await op.scalar("SELECT pg_get_serial_sequence(:table, 'id')", {"table": table})
+    primary_key = await op.scalar(
+        "SELECT conname FROM pg_constraint WHERE contype = 'p' AND conrelid = to_regclass(:table)",
+        {"table": table},
+    )
+
+    await op.atomic(
+        [f"ALTER TABLE {owner} DROP CONSTRAINT {name}" for owner, name in incoming]
+        # ATTACH only adopts an index that already backs a primary key.
+        + [
+            f"ALTER TABLE {table} DROP CONSTRAINT {primary_key}, "
+            f"ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {legacy}_id_created_at",
+            f"ALTER TABLE {table} RENAME TO {legacy}",
+        ]
+        + renames
+        + [
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)",
+            f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)",
+            f"ALTER SEQUENCE {sequence} OWNED BY {table}.id",
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary}')",
+        ]
+        + parent_indexes
+        + [f"ALTER TABLE {table} ADD {definition}" for (definition,) in outgoing]
+        + [default_partition_ddl(table), month_partition_ddl(table, first_month)]
+    )
+    print(f"  {table}: existing rows kept in {legacy} (before {boundary})")
+
+
+async def upgrade(op):
+    for table, spec in TABLES.items():
+        if not await _is_partitioned(op, table):
+            await _partition(op, table, spec)
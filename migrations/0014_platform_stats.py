@@ -0,0 +1,5 @@
+from models import PlatformStats
+
+
+async def upgrade(op):
+    await op.create_table(PlatformStats.__table__)
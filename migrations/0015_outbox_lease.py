@@ -0,0 +1,5 @@
+async def upgrade(op):
+    await op.execute("ALTER TABLE notification_outbox ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP")
+    await op.create_index(
+        "idx_outbox_sending", "notification_outbox (locked_until) WHERE status = 'sending'"
+    )
@@ -0,0 +1,5 @@
+from models import WALLET_AVAILABLE_DDL
+
+
+async def upgrade(op):
+    await op.execute(WALLET_AVAILABLE_DDL)
@@ -0,0 +1,53 @@
+from models import PLATFORM_STATS_DDL, TRANSACTION_REFS_DDL, TransactionRef
+
+BATCH_SIZE = 1000
+
+# Partitioning (0013) left transaction_ref unique only within the legacy
+# partition and dropped the foreign keys into transactions. transaction_refs
+# restores both; the trigger records new rows before the backfill starts, so
+# none are missed.
+FOREIGN_KEYS = ("escrow_accounts", "content_purchases")
+
+
+async def upgrade(op):
+    await op.create_table(TransactionRef.__table__)
+    for statement in TRANSACTION_REFS_DDL:
+        await op.execute(statement)
+    # Same functions as 0017, now skipped under app.moving_rows.
+    for statement in PLATFORM_STATS_DDL:
+        await op.execute(statement)
+
+    duplicates = await op.scalar(
+        "SELECT string_agg(transaction_ref, ', ') FROM ("
+        "SELECT transaction_ref FROM transactions WHERE transaction_ref IS NOT NULL "
+        "GROUP BY transaction_ref HAVING count(*) > 1 LIMIT 20) d"
+    )
+    if duplicates:
+        raise RuntimeError(f"Resolve duplicate transaction refs before migrating: {duplicates}")
+
+    if op.dry_run:
+        print(f"  INSERT INTO transaction_refs SELECT ... FROM transactions  -- batches of {BATCH_SIZE}")
+    else:
+        after = 0
+        while after is not None:
+            after = await op.scalar(
+                "WITH batch AS ("
+                "SELECT id, transaction_ref, created_at FROM transactions "
+                "WHERE id > :after ORDER BY id LIMIT :batch), "
+                "copied AS ("
+                "INSERT INTO transaction_refs (transaction_id, transaction_ref, created_at) "
+                "SELECT * FROM batch ON CONFLICT (transaction_id) DO NOTHING) "
+                "SELECT max(id) FROM batch",
+                {"after": after, "batch": BATCH_SIZE},
+            )
+
+    for table in FOREIGN_KEYS:
+        name = f"{table}_transaction_id_fkey"
+        await op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+        # NOT VALID holds new rows at once; VALIDATE checks the old ones
+        # without blocking writes.
+        await op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY (transaction_id) "
+            "REFERENCES transaction_refs (transaction_id) NOT VALID"
+        )
+        await op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
@@ -0,0 +1,22 @@
+// The bots cache each user's role, status, verification and access fee
+// (shared/auth_context.py). Routes that change those call this after their
+// writes commit so the bots stop acting on the old values.
+const USER_BOT_INTERNAL_URL = process.env.USER_BOT_INTERNAL_URL || "";
+const INTERNAL_API_TOKEN = process.env.INTERNAL_API_TOKEN || "";
+
+export async function invalidateAuthCache(userIds) {
+  const ids = (Array.isArray(userIds) ? userIds : [userIds]).filter(Boolean).map(Number);
+  if (!USER_BOT_INTERNAL_URL || !INTERNAL_API_TOKEN || !ids.length) {
+    return;
+  }
+  try {
+    await fetch(`${USER_BOT_INTERNAL_URL}/internal/auth-cache/invalidate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "X-Internal-Token": INTERNAL_API_TOKEN },
+      body: JSON.stringify({ user_ids: ids }),
+      signal: AbortSignal.timeout(3000),
+    });
+  } catch {
+    // The cache TTL still bounds how long the old values are used.
+  }
+}
@@ -0,0 +1,22 @@
+// Balances are users.wallet_balance plus the wallet_ledger credits the worker
+// has not compacted into it yet; wallet_available() (models.py) adds both up.
+// Debits still lower users.wallet_balance directly, which may dip below zero
+// while credits are pending.
+
+export async function lockWalletBalance(client, userId) {
+  // Lock first and read afterwards, so a compaction that committed while we
+  // waited for the lock is not counted twice.
+  const locked = await client.query("SELECT id FROM users WHERE id = $1 FOR UPDATE", [userId]);
+  if (!locked.rowCount) {
+    return null;
+  }
+  const res = await client.query("SELECT wallet_available($1) AS balance", [userId]);
+  return Number(res.rows[0]?.balance || 0);
+}
+
+export async function debitLockedWallet(client, userId, amount) {
+  await client.query(
+    "UPDATE users SET wallet_balance = COALESCE(wallet_balance, 0) - $1 WHERE id = $2",
+    [amount, userId]
+  );
+}
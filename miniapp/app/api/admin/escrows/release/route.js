@@ -6,6 +6,7 @@ import { getSupabase } from "../../../_lib/supabase";
 import { getOrCreateInviteLink } from "../../../_lib/telegram_invites";
 import { createNotification } from "../../../_lib/notifications";
 import { resolveEscrowDispute } from "../../../_lib/disputes";
+import { invalidateAuthCache } from "../../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -156,6 +157,7 @@ export async function POST(request) {
     await query("UPDATE users SET role = 'client', status = 'active' WHERE id = $1", [
       escrow.payer_id,
     ]);
+    await invalidateAuthCache(escrow.payer_id);
   }
 
   if (escrowType === "session" && escrow.related_id) {
@@ -3,6 +3,7 @@ import { query } from "../../../_lib/db";
 import { requireAdmin } from "../../../_lib/admin_auth";
 import { ensureUser } from "../../../_lib/users";
 import { createNotification } from "../../../_lib/notifications";
+import { invalidateAuthCache } from "../../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -58,6 +59,7 @@ export async function POST(request) {
     `UPDATE users SET status = 'inactive' WHERE id = $1`,
     [userId]
   );
+  await invalidateAuthCache(userId);
   await query(
     `INSERT INTO admin_actions (admin_id, action_type, target_user_id, target_type, target_id, details, created_at)
      VALUES ($1, 'reject_model', $2, 'model_profile', $3, $4, NOW())`,
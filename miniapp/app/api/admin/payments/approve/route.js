@@ -4,6 +4,7 @@ import { requireAdmin } from "../../../_lib/admin_auth";
 import { ensureUser } from "../../../_lib/users";
 import { getOrCreateInviteLink } from "../../../_lib/telegram_invites";
 import { createNotification } from "../../../_lib/notifications";
+import { invalidateAuthCache } from "../../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -41,6 +42,7 @@ async function grantClientAccess(userId) {
     );
   }
   await query("UPDATE users SET role = 'client', status = 'active' WHERE id = $1", [userId]);
+  await invalidateAuthCache(userId);
 }
 
 async function sendMessage(chatId, text) {
@@ -277,6 +279,7 @@ export async function POST(request) {
        WHERE user_id = $2`,
       [escrowId, transaction.user_id]
     );
+    await invalidateAuthCache(transaction.user_id);
   }
 
   if (escrowType === "content") {
@@ -4,6 +4,7 @@ import { extractUser, verifyInitData } from "../../_lib/telegram";
 import { ensureUser } from "../../_lib/users";
 import { ensureClientProfileColumns } from "../../_lib/clients";
 import { logConsent } from "../../_lib/consent";
+import { invalidateAuthCache } from "../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -120,6 +121,7 @@ export async function POST(request) {
   );
 
   await query("UPDATE users SET status = 'active' WHERE id = $1", [userId]);
+  await invalidateAuthCache(userId);
   await logConsent({
     userId,
     consentType: "client_disclaimer",
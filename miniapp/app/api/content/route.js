@@ -8,6 +8,7 @@ import { ensureSessionColumns } from "../_lib/sessions";
 import { ensureEngagementTables } from "../_lib/engagement";
 import { ensureContentColumns } from "../_lib/content";
 import { createAdminNotifications } from "../_lib/notifications";
+import { invalidateAuthCache } from "../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -229,6 +230,7 @@ export async function GET(request) {
         await query("UPDATE users SET role = 'client', status = 'active' WHERE id = $1", [
           userRes.rows[0].id,
         ]);
+        await invalidateAuthCache(userRes.rows[0].id);
         role = "client";
       }
     }
@@ -278,6 +280,7 @@ export async function GET(request) {
           [escrowId, userRes.rows[0].id]
         );
       }
+      await invalidateAuthCache(userRes.rows[0].id);
     }
     res = await query(
       `SELECT dc.id, dc.title, dc.description, dc.price, dc.content_type,
@@ -5,6 +5,7 @@ import { checkRateLimit } from "../../_lib/rate_limit";
 import { reserveIdempotencyKey, finalizeIdempotencyKey, ensureIdempotencyTable } from "../../_lib/idempotency";
 import { createNotification } from "../../_lib/notifications";
 import { createRequestContext } from "../../_lib/observability";
+import { debitLockedWallet, lockWalletBalance } from "../../_lib/wallet";
 
 const BOT_TOKEN = process.env.USER_BOT_TOKEN || process.env.BOT_TOKEN || "";
 
@@ -53,7 +54,7 @@ export async function POST(req) {
     if (!giftRes.rowCount) return NextResponse.json({ error: "Gift not found" }, { status: 404 });
     const gift = giftRes.rows[0];
 
-    const userRes = await query("SELECT id, wallet_balance FROM users WHERE telegram_id = $1", [tgUser.id]);
+    const userRes = await query("SELECT id, wallet_available(id) AS wallet_balance FROM users WHERE telegram_id = $1", [tgUser.id]);
     if (!userRes.rowCount) return NextResponse.json({ error: "User not found" }, { status: 404 });
     const sender = userRes.rows[0];
 
@@ -74,11 +75,9 @@ export async function POST(req) {
       }
 
       // Deduct sender wallet
-      const deductRes = await client.query(
-        "UPDATE users SET wallet_balance = wallet_balance - $1 WHERE id = $2 AND wallet_balance >= $1 RETURNING wallet_balance",
-        [gift.price_ngn, sender.id]
-      );
-      if (!deductRes.rowCount) throw new Error("Insufficient balance");
+      const balance = await lockWalletBalance(client, sender.id);
+      if (balance === null || balance < gift.price_ngn) throw new Error("Insufficient balance");
+      await debitLockedWallet(client, sender.id, gift.price_ngn);
 
       // Credit recipient
       await client.query(
@@ -35,7 +35,7 @@ export async function GET(request) {
   }
 
   const userRes = await query(
-    `SELECT id, telegram_id, public_id, username, role, status, email, created_at, wallet_balance, first_name, last_name, avatar_path, privacy_hide_email, privacy_hide_location
+    `SELECT id, telegram_id, public_id, username, role, status, email, created_at, wallet_available(id) AS wallet_balance, first_name, last_name, avatar_path, privacy_hide_email, privacy_hide_location
      FROM users WHERE telegram_id = $1`,
     [tgUser.id]
   );
@@ -4,6 +4,7 @@ import { extractUser, verifyInitData } from "../../_lib/telegram";
 import { ensureUserColumns } from "../../_lib/users";
 import { ensureClientProfileColumns } from "../../_lib/clients";
 import { checkRateLimit } from "../../_lib/rate_limit";
+import { invalidateAuthCache } from "../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -84,7 +85,10 @@ export async function POST(request) {
   const shouldGrantAccess =
     accessTx?.status === "completed" || accessEscrow?.status === "released";
 
+  // Only the access-fee and role repairs below touch what the bots cache.
+  let authChanged = false;
   if (!client && (accessTx || accessEscrow)) {
+    authChanged = true;
     if (shouldGrantAccess) {
       await query(
         `INSERT INTO client_profiles (user_id, access_fee_paid, access_granted_at, access_fee_escrow_id)
@@ -119,6 +123,7 @@ export async function POST(request) {
       );
     }
   } else if (client && !client.access_fee_paid && shouldGrantAccess) {
+    authChanged = true;
     await query(
       `UPDATE client_profiles
        SET access_fee_paid = TRUE,
@@ -139,6 +144,7 @@ export async function POST(request) {
   }
 
   if (model?.verification_status === "approved" && user.role !== "model") {
+    authChanged = true;
     await query(
       `UPDATE users
        SET role = 'model', status = 'active'
@@ -146,6 +152,7 @@ export async function POST(request) {
       [user.id]
     );
   } else if (!model && user.role === "model") {
+    authChanged = true;
     await query(
       `UPDATE users
        SET role = 'client', status = 'active'
@@ -153,6 +160,7 @@ export async function POST(request) {
       [user.id]
     );
   } else if (!["model", "admin", "client"].includes(user.role || "") && (client || accessTx || accessEscrow)) {
+    authChanged = true;
     await query(
       `UPDATE users
        SET role = 'client', status = 'active'
@@ -160,6 +168,9 @@ export async function POST(request) {
       [user.id]
     );
   }
+  if (authChanged) {
+    await invalidateAuthCache(user.id);
+  }
 
   return NextResponse.json({ ok: true });
 }
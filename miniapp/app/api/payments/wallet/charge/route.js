@@ -9,6 +9,7 @@ import { ensureIdempotencyTable, readIdempotencyRecord, writeIdempotencyRecord }
 import { createRequestContext, logError, withRequestId } from "../../../_lib/observability";
 import { checkRateLimit } from "../../../_lib/rate_limit";
 import { createAdminNotifications, createNotification } from "../../../_lib/notifications";
+import { debitLockedWallet, lockWalletBalance } from "../../../_lib/wallet";
 
 export const runtime = "nodejs";
 
@@ -341,24 +342,11 @@ export async function POST(request) {
         return { cached: true, response: cached };
       }
 
-      const balanceRes = await client.query(
-        "SELECT wallet_balance FROM users WHERE id = $1 FOR UPDATE",
-        [userId]
-      );
-      const balance = Number(balanceRes.rows[0]?.wallet_balance || 0);
+      const balance = (await lockWalletBalance(client, userId)) ?? 0;
       if (balance < amount) {
         return { error: "insufficient_wallet", balance };
       }
-
-      const updateBalance = await client.query(
-        `UPDATE users
-         SET wallet_balance = wallet_balance - $1
-         WHERE id = $2 AND wallet_balance >= $1`,
-        [amount, userId]
-      );
-      if (!updateBalance.rowCount) {
-        return { error: "insufficient_wallet" };
-      }
+      await debitLockedWallet(client, userId, amount);
 
       let relatedId = null;
       let sessionBooking = null;
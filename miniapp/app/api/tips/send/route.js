@@ -5,6 +5,7 @@ import { checkRateLimit } from "../../_lib/rate_limit";
 import { reserveIdempotencyKey, finalizeIdempotencyKey, clearIdempotencyKey, ensureIdempotencyTable } from "../../_lib/idempotency";
 import { createNotification } from "../../_lib/notifications";
 import { createRequestContext } from "../../_lib/observability";
+import { debitLockedWallet, lockWalletBalance } from "../../_lib/wallet";
 
 const BOT_TOKEN = process.env.USER_BOT_TOKEN || process.env.BOT_TOKEN || "";
 
@@ -21,7 +22,7 @@ async function ensureTipsTable() {
        context_id BIGINT,
        platform_fee INTEGER NOT NULL DEFAULT 0,
        net_amount INTEGER NOT NULL,
-       transaction_id BIGINT REFERENCES transactions(id) ON DELETE SET NULL,
+       transaction_id BIGINT,
        message TEXT,
        created_at TIMESTAMPTZ DEFAULT NOW()
      )`
@@ -53,7 +54,7 @@ export async function POST(req) {
       return NextResponse.json({ error: "Invalid tip parameters" }, { status: 400 });
     }
 
-    const userRes = await query("SELECT id, wallet_balance FROM users WHERE telegram_id = $1", [tgUser.id]);
+    const userRes = await query("SELECT id, wallet_available(id) AS wallet_balance FROM users WHERE telegram_id = $1", [tgUser.id]);
     if (!userRes.rowCount) return NextResponse.json({ error: "User not found" }, { status: 404 });
     const sender = userRes.rows[0];
 
@@ -81,11 +82,9 @@ export async function POST(req) {
       }
 
       // Deduct from sender wallet
-      const deductRes = await client.query(
-        "UPDATE users SET wallet_balance = wallet_balance - $1 WHERE id = $2 AND wallet_balance >= $1 RETURNING wallet_balance",
-        [amount, sender.id]
-      );
-      if (!deductRes.rowCount) throw new Error("Insufficient balance");
+      const balance = await lockWalletBalance(client, sender.id);
+      if (balance === null || balance < amount) throw new Error("Insufficient balance");
+      await debitLockedWallet(client, sender.id, amount);
 
       // Credit recipient wallet
       await client.query(
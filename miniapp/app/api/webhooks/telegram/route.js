@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server";
 import { query } from "../../_lib/db";
 import { ensureClientProfileColumns } from "../../_lib/clients";
+import { invalidateAuthCache } from "../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -87,6 +88,7 @@ async function ensureAccess(userId) {
       [escrowId, userId]
     );
   }
+  await invalidateAuthCache(userId);
   return true;
 }
 
@@ -2,6 +2,7 @@ import { NextResponse } from "next/server";
 import { query } from "../../_lib/db";
 import { ensureRateLimitTable } from "../../_lib/rate_limit";
 import { ensureIdempotencyTable } from "../../_lib/idempotency";
+import { invalidateAuthCache } from "../../_lib/auth_cache";
 
 export const runtime = "nodejs";
 
@@ -156,6 +157,7 @@ export async function POST(request) {
             escrow.payer_id,
           ]);
         }
+        await invalidateAuthCache(escrow.payer_id);
       }
 
       if (escrow.escrow_type === "content") {
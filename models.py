@@ -1,6 +1,7 @@
 from sqlalchemy import (
     Boolean,
     Column,
+    DDL,
     DateTime,
     Float,
     ForeignKey,
@@ -9,10 +10,13 @@ from sqlalchemy import (
     BigInteger,
     String,
     Text,
+    event,
+    func,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import declarative_base, relationship
 
+from shared.partitions import default_partition_ddl, month_partition_ddl, month_start
 from shared.time_utils import utcnow
 
 Base = declarative_base()
@@ -61,6 +65,13 @@ class ModelProfile(Base):
 
     user = relationship("User", back_populates="model_profile")
 
+Index("idx_model_profiles_user", ModelProfile.user_id)
+Index(
+    "idx_model_profiles_submitted",
+    ModelProfile.user_id,
+    postgresql_where=ModelProfile.verification_status == "submitted",
+)
+
 
 class ClientProfile(Base):
     __tablename__ = "client_profiles"
@@ -73,6 +84,10 @@ class ClientProfile(Base):
     access_granted_at = Column(DateTime)
 
     user = relationship("User", back_populates="client_profile")
+    access_fee_escrow = relationship("EscrowAccount", foreign_keys=[access_fee_escrow_id])
+
+Index("idx_client_profiles_user", ClientProfile.user_id)
+Index("idx_client_profiles_access_fee_escrow", ClientProfile.access_fee_escrow_id)
 
 
 class Session(Base):
@@ -96,6 +111,8 @@ class Session(Base):
     escrow_id = Column(Integer, ForeignKey("escrow_accounts.id"))
     created_at = Column(DateTime, default=utcnow)
 
+    escrow = relationship("EscrowAccount", foreign_keys=[escrow_id])
+
 
 class DigitalContent(Base):
     __tablename__ = "digital_content"
@@ -113,6 +130,15 @@ class DigitalContent(Base):
     total_revenue = Column(Float, default=0.0)
     created_at = Column(DateTime, default=utcnow)
 
+    model = relationship("User", foreign_keys=[model_id])
+
+Index("idx_digital_content_model", DigitalContent.model_id, DigitalContent.is_active)
+Index(
+    "idx_digital_content_pending",
+    DigitalContent.id,
+    postgresql_where=DigitalContent.is_active.is_(False),
+)
+
 
 class ContentPurchase(Base):
     __tablename__ = "content_purchases"
@@ -120,18 +146,26 @@ class ContentPurchase(Base):
     id = Column(Integer, primary_key=True)
     content_id = Column(Integer, ForeignKey("digital_content.id"), nullable=False)
     client_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    transaction_id = Column(Integer)
+    transaction_id = Column(Integer, ForeignKey("transaction_refs.transaction_id"))
     price_paid = Column(Float)
     escrow_id = Column(Integer, ForeignKey("escrow_accounts.id"))
     status = Column(String, default="pending")
     purchased_at = Column(DateTime, default=utcnow)
 
+    escrow = relationship("EscrowAccount", foreign_keys=[escrow_id])
+
+Index("idx_content_purchases_escrow", ContentPurchase.escrow_id)
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Range-partitioned by month (shared/partitions.py). Postgres requires the
+    # partition key in every unique constraint, so the table's primary key is
+    # (id, created_at) while the ORM keeps identifying rows by id alone.
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
-    id = Column(Integer, primary_key=True)
-    transaction_ref = Column(String, unique=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    transaction_ref = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     transaction_type = Column(String)
     amount = Column(Float)
@@ -139,7 +173,58 @@ class Transaction(Base):
     status = Column(String)
     metadata_json = Column(JSONB)
     completed_at = Column(DateTime)
-    created_at = Column(DateTime, default=utcnow)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now(), primary_key=True)
+
+    __mapper_args__ = {"primary_key": [id]}
+
+Index("idx_transactions_ref", Transaction.transaction_ref)
+Index(
+    "idx_transactions_pending_review",
+    Transaction.payment_provider,
+    postgresql_where=Transaction.status == "pending_review",
+)
+
+
+class TransactionRef(Base):
+    __tablename__ = "transaction_refs"
+
+    # One row per transaction, kept by the trigger below for every writer,
+    # the miniapp included. Unpartitioned, so it enforces what transactions
+    # cannot: refs unique across all months, and an id other tables can
+    # reference. Archived months keep their rows.
+    transaction_id = Column(Integer, primary_key=True)
+    transaction_ref = Column(String, unique=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+# Skipped, like the platform stats triggers, while partition maintenance
+# moves rows between partitions without changing them.
+TRANSACTION_REFS_DDL = [
+    """
+CREATE OR REPLACE FUNCTION transaction_refs_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('app.moving_rows', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO transaction_refs (transaction_id, transaction_ref, created_at)
+        VALUES (NEW.id, NEW.transaction_ref, NEW.created_at);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE transaction_refs
+        SET transaction_id = NEW.id, transaction_ref = NEW.transaction_ref, created_at = NEW.created_at
+        WHERE transaction_id = OLD.id;
+    ELSE
+        DELETE FROM transaction_refs WHERE transaction_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END
+$$
+""",
+    "CREATE OR REPLACE TRIGGER transaction_refs_sync "
+    "AFTER INSERT OR DELETE OR UPDATE OF id, transaction_ref, created_at "
+    "ON transactions FOR EACH ROW EXECUTE FUNCTION transaction_refs_sync()",
+]
 
 
 class EscrowAccount(Base):
@@ -155,7 +240,9 @@ class EscrowAccount(Base):
     platform_fee = Column(Float, nullable=False)
     receiver_payout = Column(Float)
     status = Column(String, default="held")
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    # transactions is partitioned and its id alone is not unique, so this
+    # references the one-row-per-transaction transaction_refs instead.
+    transaction_id = Column(Integer, ForeignKey("transaction_refs.transaction_id"))
     held_at = Column(DateTime, default=utcnow)
     released_at = Column(DateTime)
     auto_release_at = Column(DateTime)
@@ -163,19 +250,251 @@ class EscrowAccount(Base):
     release_condition_met = Column(Boolean, default=False)
     dispute_reason = Column(Text)
 
+    payer = relationship("User", foreign_keys=[payer_id])
+    receiver = relationship("User", foreign_keys=[receiver_id])
+
+Index("idx_content_purchases_transaction", ContentPurchase.transaction_id)
+Index(
+    "idx_sessions_active_scheduled_end",
+    Session.scheduled_end,
+    postgresql_where=Session.status == "active",
+)
+Index("idx_sessions_status", Session.status)
 Index("idx_escrow_type", EscrowAccount.escrow_type)
 Index("idx_escrow_status", EscrowAccount.status)
 Index("idx_escrow_related", EscrowAccount.escrow_type, EscrowAccount.related_id)
 Index("idx_escrow_auto_release", EscrowAccount.auto_release_at, EscrowAccount.status)
 
+class WalletLedgerEntry(Base):
+    __tablename__ = "wallet_ledger"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Float, nullable=False)
+    entry_type = Column(String, nullable=False)
+    escrow_id = Column(Integer, ForeignKey("escrow_accounts.id"))
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    compacted_at = Column(DateTime)
+
+Index("idx_wallet_ledger_user", WalletLedgerEntry.user_id, WalletLedgerEntry.id)
+Index(
+    "idx_wallet_ledger_pending",
+    WalletLedgerEntry.user_id,
+    postgresql_where=WalletLedgerEntry.compacted_at.is_(None),
+)
+
+# users.wallet_balance plus the ledger entries the worker has not compacted
+# into it yet. The miniapp reads and checks balances through this function
+# (see shared/wallet.py); VOLATILE so each call sees rows committed since the
+# calling statement started, e.g. after waiting on a users row lock.
+WALLET_AVAILABLE_DDL = """
+CREATE OR REPLACE FUNCTION wallet_available(p_user_id INTEGER) RETURNS DOUBLE PRECISION
+LANGUAGE sql VOLATILE AS $$
+    SELECT COALESCE(u.wallet_balance, 0) + COALESCE(
+        (SELECT sum(l.amount) FROM wallet_ledger l
+         WHERE l.user_id = u.id AND l.compacted_at IS NULL), 0)
+    FROM users u WHERE u.id = p_user_id
+$$
+"""
+
+event.listen(
+    WalletLedgerEntry.__table__,
+    "after_create",
+    DDL(WALLET_AVAILABLE_DDL).execute_if(dialect="postgresql"),
+)
+
+
+class PlatformStats(Base):
+    __tablename__ = "platform_stats"
+
+    # Single row (id 1), seeded by a full recount and kept current by folding
+    # in platform_stats_deltas; see shared/stats.py.
+    id = Column(Integer, primary_key=True)
+    total_users = Column(Integer, nullable=False, default=0)
+    total_models = Column(Integer, nullable=False, default=0)
+    pending_models = Column(Integer, nullable=False, default=0)
+    held_escrows = Column(Integer, nullable=False, default=0)
+    disputed_escrows = Column(Integer, nullable=False, default=0)
+    total_volume = Column(Float, nullable=False, default=0.0)
+    refreshed_at = Column(DateTime, default=utcnow, nullable=False)
+
+
+class PlatformStatsDelta(Base):
+    __tablename__ = "platform_stats_deltas"
+
+    # Appended by the triggers below; an append-only table keeps every write
+    # off the single platform_stats row.
+    id = Column(BigInteger, primary_key=True)
+    total_users = Column(Integer, nullable=False, server_default="0")
+    total_models = Column(Integer, nullable=False, server_default="0")
+    pending_models = Column(Integer, nullable=False, server_default="0")
+    held_escrows = Column(Integer, nullable=False, server_default="0")
+    disputed_escrows = Column(Integer, nullable=False, server_default="0")
+    total_volume = Column(Float, nullable=False, server_default="0")
+
+
+# table -> (column whose updates can move a counter, {counter: what one row
+# adds to it}). {row} is OLD or NEW.
+_STATS_COUNTERS = {
+    "users": (
+        "role",
+        {
+            "total_users": "1",
+            "total_models": "CASE WHEN {row}.role = 'model' THEN 1 ELSE 0 END",
+        },
+    ),
+    "model_profiles": (
+        "verification_status",
+        {"pending_models": "CASE WHEN {row}.verification_status = 'submitted' THEN 1 ELSE 0 END"},
+    ),
+    "escrow_accounts": (
+        "status",
+        {
+            "held_escrows": "CASE WHEN {row}.status = 'held' THEN 1 ELSE 0 END",
+            "disputed_escrows": "CASE WHEN {row}.status = 'disputed' THEN 1 ELSE 0 END",
+        },
+    ),
+    "transactions": ("amount", {"total_volume": "COALESCE({row}.amount, 0)"}),
+}
+
+
+def _stats_trigger_ddl(table: str, column: str, counters: dict) -> list:
+    declare = "".join(f"    d_{name} DOUBLE PRECISION := 0;\n" for name in counters)
+    added = "".join(f"        d_{name} := d_{name} + {expr.format(row='NEW')};\n" for name, expr in counters.items())
+    removed = "".join(f"        d_{name} := d_{name} - {expr.format(row='OLD')};\n" for name, expr in counters.items())
+    changed = " OR ".join(f"d_{name} <> 0" for name in counters)
+    return [
+        f"""
+CREATE OR REPLACE FUNCTION platform_stats_{table}() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+{declare}BEGIN
+    -- Set by maintenance that moves rows without changing them (partitions.py).
+    IF current_setting('app.moving_rows', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+{added}    END IF;
+    IF TG_OP <> 'INSERT' THEN
+{removed}    END IF;
+    IF {changed} THEN
+        INSERT INTO platform_stats_deltas ({", ".join(counters)})
+        VALUES ({", ".join(f"d_{name}" for name in counters)});
+    END IF;
+    RETURN NULL;
+END
+$$
+""",
+        f"CREATE OR REPLACE TRIGGER platform_stats AFTER INSERT OR DELETE OR UPDATE OF {column} "
+        f"ON {table} FOR EACH ROW EXECUTE FUNCTION platform_stats_{table}()",
+    ]
+
+
+# Every write that moves a counter, from the bots or the miniapp, records its
+# delta in the same transaction. Detaching an expired partition fires no
+# trigger, so archived months stay in total_volume.
+PLATFORM_STATS_DDL = [
+    statement
+    for table, (column, counters) in _STATS_COUNTERS.items()
+    for statement in _stats_trigger_ddl(table, column, counters)
+]
+
+
+def _create_triggers(metadata, connection, **kw) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    for statement in TRANSACTION_REFS_DDL + PLATFORM_STATS_DDL:
+        connection.exec_driver_sql(statement)
+
+
 class AdminAction(Base):
     __tablename__ = "admin_actions"
+    # Partitioned like transactions.
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     admin_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     action_type = Column(String)
     target_user_id = Column(Integer, ForeignKey("users.id"))
     target_type = Column(String)
     target_id = Column(Integer)
     details = Column(JSONB)
+    created_at = Column(DateTime, default=utcnow, server_default=func.now(), primary_key=True)
+
+    __mapper_args__ = {"primary_key": [id]}
+
+Index(
+    "idx_admin_actions_target",
+    AdminAction.target_type,
+    AdminAction.target_id,
+    AdminAction.action_type,
+)
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    chat_id = Column(BigInteger)
+    message = Column(Text, nullable=False)
+    reply_markup = Column(JSONB(none_as_null=True))
+    priority = Column(Integer, default=10, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    available_at = Column(DateTime, default=utcnow, nullable=False)
+    locked_until = Column(DateTime)
+    sent_at = Column(DateTime)
     created_at = Column(DateTime, default=utcnow)
+
+Index(
+    "idx_outbox_pending",
+    NotificationOutbox.priority,
+    NotificationOutbox.id,
+    postgresql_where=NotificationOutbox.status == "pending",
+)
+Index(
+    "idx_outbox_sending",
+    NotificationOutbox.locked_until,
+    postgresql_where=NotificationOutbox.status == "sending",
+)
+
+
+class WebhookEvent(Base):
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    transaction_ref = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    available_at = Column(DateTime, default=utcnow, nullable=False)
+    locked_until = Column(DateTime)
+    received_at = Column(DateTime, default=utcnow, nullable=False)
+    processed_at = Column(DateTime)
+
+Index(
+    "idx_webhook_events_queue",
+    WebhookEvent.status,
+    WebhookEvent.id,
+    postgresql_where=WebhookEvent.status.in_(("pending", "processing")),
+)
+
+
+def _create_initial_partitions(table, connection, **kw) -> None:
+    # Fresh databases (create_all) get the current month and a default
+    # partition; the worker creates later months ahead of time.
+    if connection.dialect.name != "postgresql":
+        return
+    connection.exec_driver_sql(month_partition_ddl(table.name, month_start(utcnow())))
+    connection.exec_driver_sql(default_partition_ddl(table.name))
+
+
+for _partitioned in (Transaction.__table__, AdminAction.__table__):
+    event.listen(_partitioned, "after_create", _create_initial_partitions)
+
+# After every table exists: the triggers write to tables other than their own.
+event.listen(Base.metadata, "after_create", _create_triggers)
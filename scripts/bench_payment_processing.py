@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+from pathlib import Path
+import secrets
+import statistics
+import sys
+import time
+
+from sqlalchemy import delete, event, func, select
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from models import (  # noqa: E402
+    ClientProfile,
+    ContentPurchase,
+    DigitalContent,
+    EscrowAccount,
+    NotificationOutbox,
+    Session,
+    Transaction,
+    User,
+)
+from shared.db import AsyncSessionLocal, engine  # noqa: E402
+from shared.payment_processor import process_transaction  # noqa: E402
+from shared.transactions import create_transaction  # noqa: E402
+
+ESCROW_TYPES = ("session", "content", "access_fee", "extension")
+
+
+class RoundTripCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._bump)
+        for name in ("begin", "commit", "rollback"):
+            event.listen(sync_engine, name, self._bump)
+
+    def _bump(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+async def seed(count: int) -> dict:
+    tag = secrets.token_hex(3)
+    base_tg = 9_000_000_000 + secrets.randbelow(10**8)
+    async with AsyncSessionLocal() as db:
+        client = User(telegram_id=base_tg, username=f"bench_client_{tag}", role="client")
+        model = User(telegram_id=base_tg + 1, username=f"bench_model_{tag}", role="model")
+        db.add_all([client, model])
+        await db.flush()
+        content = DigitalContent(model_id=model.id, content_type="photo", title="bench", price=10)
+        db.add(content)
+        await db.flush()
+
+        refs: dict[str, list[str]] = {escrow_type: [] for escrow_type in ESCROW_TYPES}
+        for _ in range(count):
+            session = Session(
+                session_ref=f"bench_{secrets.token_hex(4)}",
+                client_id=client.id,
+                model_id=model.id,
+                status="pending_payment",
+            )
+            db.add(session)
+            await db.flush()
+            for escrow_type in ESCROW_TYPES:
+                metadata = {"escrow_type": escrow_type, "model_id": model.id}
+                if escrow_type in {"session", "extension"}:
+                    metadata["session_id"] = session.id
+                if escrow_type == "access_fee":
+                    metadata = {"escrow_type": escrow_type, "client_id": client.id}
+                transaction = await create_transaction(
+                    db,
+                    user_id=client.id,
+                    transaction_type=escrow_type,
+                    amount=10,
+                    metadata=metadata,
+                )
+                await db.flush()
+                if escrow_type == "content":
+                    db.add(
+                        ContentPurchase(
+                            content_id=content.id,
+                            client_id=client.id,
+                            transaction_id=transaction.id,
+                            price_paid=10,
+                        )
+                    )
+                refs[escrow_type].append(transaction.transaction_ref)
+        outbox_floor = await db.scalar(select(func.coalesce(func.max(NotificationOutbox.id), 0)))
+        await db.commit()
+        return {
+            "refs": refs,
+            "user_ids": [client.id, model.id],
+            "content_id": content.id,
+            "outbox_floor": outbox_floor,
+        }
+
+
+async def cleanup(seeded: dict) -> None:
+    user_ids = seeded["user_ids"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(NotificationOutbox).where(NotificationOutbox.id > seeded["outbox_floor"]))
+        await db.execute(delete(ContentPurchase).where(ContentPurchase.client_id.in_(user_ids)))
+        await db.execute(delete(Session).where(Session.client_id.in_(user_ids)))
+        await db.execute(delete(ClientProfile).where(ClientProfile.user_id.in_(user_ids)))
+        await db.execute(delete(EscrowAccount).where(EscrowAccount.payer_id.in_(user_ids)))
+        await db.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+        await db.execute(delete(DigitalContent).where(DigitalContent.id == seeded["content_id"]))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure database round-trips and latency of process_transaction per escrow type. "
+            "Writes (and then deletes) benchmark rows, so point DATABASE_URL at a scratch database."
+        )
+    )
+    parser.add_argument("--count", type=int, default=20, help="Transactions per escrow type.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+    args = parser.parse_args()
+
+    seeded = await seed(args.count)
+    counter = RoundTripCounter()
+    try:
+        print(f"{'escrow type':<12} {'trips/txn':>9} {'p50 ms':>8} {'max ms':>8} {'errors':>6}")
+        for escrow_type in ESCROW_TYPES:
+            trips: list[int] = []
+            latencies: list[float] = []
+            errors = 0
+            for ref in seeded["refs"][escrow_type]:
+                before = counter.count
+                started = time.perf_counter()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await process_transaction(
+                            db, transaction_ref=ref, provider="paystack", payload={}
+                        )
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+                trips.append(counter.count - before)
+            print(
+                f"{escrow_type:<12} {statistics.mean(trips):>9.1f} "
+                f"{statistics.median(latencies):>8.1f} {max(latencies):>8.1f} {errors:>6}"
+            )
+    finally:
+        if not args.keep:
+            await cleanup(seeded)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
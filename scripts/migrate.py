@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from shared.db import engine  # noqa: E402
+from shared.migrations import MigrationRunner  # noqa: E402
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply numbered migrations from migrations/.")
+    parser.add_argument("--dry-run", action="store_true", help="print statements without running them")
+    parser.add_argument("--list", action="store_true", help="show pending migrations and exit")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--lock-timeout", default="5s", help="per-statement lock_timeout")
+    parser.add_argument("--statement-timeout", default="60s", help="per-statement statement_timeout")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = _parse_args()
+    runner = MigrationRunner(
+        engine, lock_timeout=args.lock_timeout, statement_timeout=args.statement_timeout
+    )
+    try:
+        if args.list:
+            pending = await runner.pending()
+            for migration in pending:
+                print(f"{migration.version:04d} {migration.name}")
+            print(f"{len(pending)} pending")
+            return
+        applied = await runner.run(dry_run=args.dry_run, target=args.target)
+        if args.dry_run:
+            print(f"{len(applied)} migrations would run")
+        else:
+            print(f"✅ {len(applied)} migrations applied")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+from collections import Counter
+import hashlib
+import hmac
+import json
+from pathlib import Path
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from shared.config import settings  # noqa: E402
+from shared.webhook_capture import iter_captured_events, percentile  # noqa: E402
+
+PATHS = {"paystack": "/webhooks/paystack", "flutterwave": "/webhooks/flutterwave"}
+
+
+def synthetic_event(provider: str, reference: str) -> dict:
+    event_id = random.randint(10**8, 10**9)
+    if provider == "paystack":
+        payload = {
+            "event": "charge.success",
+            "data": {"id": event_id, "reference": reference, "status": "success"},
+        }
+    else:
+        payload = {
+            "event": "charge.completed",
+            "data": {"id": event_id, "tx_ref": reference, "status": "successful"},
+        }
+    return {"provider": provider, "body": json.dumps(payload)}
+
+
+def signed_request(event: dict) -> tuple[str, bytes, dict]:
+    provider = event["provider"]
+    body = event["body"].encode("utf-8")
+    headers = {"content-type": "application/json"}
+    # Captured signatures are re-issued so a capture from one environment can
+    # be replayed against another.
+    if provider == "paystack":
+        if not settings.paystack_secret_key:
+            raise RuntimeError("PAYSTACK_SECRET_KEY is required to sign Paystack events")
+        headers["x-paystack-signature"] = hmac.new(
+            settings.paystack_secret_key.encode("utf-8"), body, hashlib.sha512
+        ).hexdigest()
+    else:
+        if not settings.flutterwave_webhook_hash:
+            raise RuntimeError("FLUTTERWAVE_WEBHOOK_HASH is required to sign Flutterwave events")
+        headers["verif-hash"] = settings.flutterwave_webhook_hash
+    return PATHS[provider], body, headers
+
+
+async def replay(client: httpx.AsyncClient, events: list[dict], concurrency: int) -> None:
+    queue: asyncio.Queue = asyncio.Queue()
+    for event in events:
+        queue.put_nowait(signed_request(event))
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def worker() -> None:
+        while not queue.empty():
+            path, body, headers = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, content=body, headers=headers)
+                outcome = f"{response.status_code} {response.json().get('status', '')}".strip()
+            except (httpx.HTTPError, ValueError) as exc:
+                outcome = type(exc).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[outcome] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+
+    print(f"requests:   {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:        {percentile(latencies, pct) * 1000:.1f} ms")
+    print(f"max:        {max(latencies, default=0) * 1000:.1f} ms")
+    for outcome, count in statuses.most_common():
+        print(f"  {outcome}: {count}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Replay captured or synthetic payment webhooks against api.py."
+    )
+    parser.add_argument(
+        "--capture",
+        nargs="*",
+        default=[],
+        help="Capture segment files or directories (WEBHOOK_CAPTURE_DIR).",
+    )
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic events.")
+    parser.add_argument("--provider", choices=sorted(PATHS), default="paystack")
+    parser.add_argument(
+        "--ref",
+        action="append",
+        default=[],
+        help="Transaction reference for synthetic events (repeatable). Random when omitted.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Deliver every event this many times to mimic a provider retry storm.",
+    )
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--url",
+        help="Base URL of a running API. Without it the app is driven in-process over ASGI.",
+    )
+    args = parser.parse_args()
+
+    events = list(iter_captured_events(args.capture))
+    for index in range(args.synthetic):
+        reference = args.ref[index % len(args.ref)] if args.ref else f"loadtest-{uuid.uuid4().hex[:12]}"
+        events.append(synthetic_event(args.provider, reference))
+    if not events:
+        parser.error("nothing to replay; pass --capture and/or --synthetic")
+    events = [event for event in events for _ in range(max(1, args.repeat))]
+    random.shuffle(events)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            await replay(client, events, args.concurrency)
+        return
+
+    from api import app
+
+    # ASGITransport does not run the lifespan, so start it here to get the
+    # same consumer pool and shutdown flushes as a real deployment.
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            await replay(client, events, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -47,8 +47,11 @@ async def main():
             await conn.execute(text("DELETE FROM content_purchases"))
             await conn.execute(text("DELETE FROM sessions"))
 
-            # Client profiles reference escrow_accounts; delete them first.
+            # Client profiles and wallet ledger rows reference escrow_accounts;
+            # delete them first. Balances include uncompacted ledger rows, so
+            # they would otherwise come back after the reset below.
             await conn.execute(text("DELETE FROM client_profiles"))
+            await conn.execute(text("DELETE FROM wallet_ledger"))
             await conn.execute(text("DELETE FROM escrow_accounts"))
             await conn.execute(text("DELETE FROM transactions"))
 
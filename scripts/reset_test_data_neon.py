@@ -36,7 +36,9 @@ def normalize_asyncpg_url(url: str) -> str:
 RESET_SQL = r"""
 BEGIN;
 
--- 0) Zero all wallet balances (keeps accounts but wipes balances).
+-- 0) Zero all wallet balances (keeps accounts but wipes balances). Balances
+--    include uncompacted wallet_ledger rows, which also reference escrows.
+DELETE FROM wallet_ledger;
 UPDATE users SET wallet_balance = 0;
 
 -- 1) Remove *all* session bookings and their payment artifacts.
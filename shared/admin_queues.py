@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from models import AdminAction, DigitalContent, EscrowAccount, ModelProfile, Transaction
+
+PAGE_SIZE = 20
+CALLBACK_PREFIX = "admin"
+# Lines carry user-supplied text (titles, display names, tx hashes); capped so
+# a full page always fits Telegram's 4096-character message limit.
+MAX_LINE_CHARS = 120
+
+# Admin review queues, oldest first. Pages are addressed by keyset cursors on
+# id, so each page costs one indexed range scan however long the queue gets.
+# Rows come with the user they display joined in: a page is one statement.
+
+
+class QueueCursor(NamedTuple):
+    queue: str
+    after: Optional[int] = None
+    before: Optional[int] = None
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_after: Optional[int] = None
+    prev_before: Optional[int] = None
+
+
+def queue_callback(queue: str, *, after: Optional[int] = None, before: Optional[int] = None) -> str:
+    if after is not None:
+        return f"{CALLBACK_PREFIX}:{queue}:a:{after}"
+    if before is not None:
+        return f"{CALLBACK_PREFIX}:{queue}:b:{before}"
+    return f"{CALLBACK_PREFIX}:{queue}"
+
+
+def parse_queue_callback(data: str) -> Optional[QueueCursor]:
+    parts = data.split(":")
+    if len(parts) == 2 and parts[0] == CALLBACK_PREFIX:
+        return QueueCursor(parts[1])
+    if len(parts) != 4 or parts[0] != CALLBACK_PREFIX or parts[2] not in ("a", "b"):
+        return None
+    try:
+        cursor = int(parts[3])
+    except ValueError:
+        return None
+    if parts[2] == "a":
+        return QueueCursor(parts[1], after=cursor)
+    return QueueCursor(parts[1], before=cursor)
+
+
+def pending_models_query():
+    return (
+        select(ModelProfile)
+        .options(joinedload(ModelProfile.user))
+        .where(ModelProfile.verification_status == "submitted")
+    )
+
+
+def pending_content_query():
+    rejected = (
+        select(AdminAction.id)
+        .where(
+            AdminAction.target_type == "digital_content",
+            AdminAction.target_id == DigitalContent.id,
+            AdminAction.action_type == "reject_content",
+        )
+        .exists()
+    )
+    return (
+        select(DigitalContent)
+        .options(joinedload(DigitalContent.model))
+        .where(DigitalContent.is_active.is_(False), ~rejected)
+    )
+
+
+def pending_crypto_query():
+    return select(Transaction).where(
+        Transaction.payment_provider == "crypto",
+        Transaction.status == "pending_review",
+    )
+
+
+def escrows_query(status: str):
+    return select(EscrowAccount).where(EscrowAccount.status == status)
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query,
+    id_column,
+    *,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+) -> Page:
+    # One extra row tells whether another page exists in that direction.
+    if before is not None:
+        rows = (
+            await db.execute(query.where(id_column < before).order_by(id_column.desc()).limit(limit + 1))
+        ).scalars().all()
+        items = list(reversed(rows[:limit]))
+        has_prev, has_next = len(rows) > limit, True
+    else:
+        if after is not None:
+            query = query.where(id_column > after)
+        rows = (await db.execute(query.order_by(id_column).limit(limit + 1))).scalars().all()
+        items = list(rows[:limit])
+        has_prev, has_next = after is not None, len(rows) > limit
+    if not items:
+        return Page([])
+    return Page(
+        items,
+        next_after=getattr(items[-1], id_column.key) if has_next else None,
+        prev_before=getattr(items[0], id_column.key) if has_prev else None,
+    )
+
+
+def pager_buttons(queue: str, page: Page) -> List[InlineKeyboardButton]:
+    buttons = []
+    if page.prev_before is not None:
+        buttons.append(
+            InlineKeyboardButton(text="⬅️ Prev", callback_data=queue_callback(queue, before=page.prev_before))
+        )
+    if page.next_after is not None:
+        buttons.append(
+            InlineKeyboardButton(text="Next ➡️", callback_data=queue_callback(queue, after=page.next_after))
+        )
+    return buttons
+
+
+def clip_line(line: str, limit: int = MAX_LINE_CHARS) -> str:
+    # Newlines in user text would break the numbered layout.
+    line = " ".join(line.split())
+    return line if len(line) <= limit else line[: limit - 1] + "…"
+
+
+def render_page(
+    queue: str,
+    page: Page,
+    title: str,
+    empty_text: str,
+    rows: Sequence[Tuple[str, List[InlineKeyboardButton]]],
+) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """One message per page: a numbered line and a row of action buttons per item."""
+    if not rows:
+        return empty_text, None
+    lines = [title, ""] + [f"{number}. {clip_line(line)}" for number, (line, _) in enumerate(rows, 1)]
+    keyboard = [buttons for _, buttons in rows]
+    if pager := pager_buttons(queue, page):
+        keyboard.append(pager)
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -0,0 +1,158 @@
+import dataclasses
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ClientProfile, ModelProfile, User
+from shared.cache import LRUTTLCache
+from shared.config import settings
+from shared.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    """What bot handlers check before acting for a user; `id` is users.id."""
+
+    id: int
+    telegram_id: int
+    public_id: Optional[str]
+    role: str
+    status: Optional[str]
+    verification_status: Optional[str] = None
+    has_client_profile: bool = False
+    access_fee_paid: bool = False
+
+    @property
+    def is_verified_model(self) -> bool:
+        return self.role == "model" and self.verification_status == "approved"
+
+
+async def load_auth_context(db: AsyncSession, telegram_id: int) -> Optional[AuthContext]:
+    row = (
+        await db.execute(
+            select(
+                User.id,
+                User.telegram_id,
+                User.public_id,
+                User.role,
+                User.status,
+                ModelProfile.verification_status,
+                ClientProfile.id.label("client_profile_id"),
+                ClientProfile.access_fee_paid,
+            )
+            .outerjoin(ModelProfile, ModelProfile.user_id == User.id)
+            .outerjoin(ClientProfile, ClientProfile.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+            .limit(1)
+        )
+    ).first()
+    if row is None:
+        return None
+    return AuthContext(
+        id=row.id,
+        telegram_id=row.telegram_id,
+        public_id=row.public_id,
+        role=row.role,
+        status=row.status,
+        verification_status=row.verification_status,
+        has_client_profile=row.client_profile_id is not None,
+        access_fee_paid=bool(row.access_fee_paid),
+    )
+
+
+class AuthContextCache:
+    def __init__(
+        self,
+        ttl_seconds: int,
+        local_ttl_seconds: float,
+        max_entries: int,
+        prefix: str = "auth:ctx:",
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._local: LRUTTLCache[AuthContext] = LRUTTLCache(max_entries, local_ttl_seconds)
+        self._stats = {"hits": 0, "misses": 0, "redis_errors": 0}
+
+    async def get(self, telegram_id: int) -> Optional[AuthContext]:
+        context = self._local.get(telegram_id)
+        if context is None:
+            context = await self._redis_get(telegram_id)
+            if context is not None:
+                self._local.set(telegram_id, context)
+        self._stats["hits" if context is not None else "misses"] += 1
+        return context
+
+    async def set(self, context: AuthContext) -> None:
+        # Users still onboarding pick their role in the miniapp, which cannot
+        # invalidate this cache; always read them fresh.
+        if context.role == "unassigned":
+            return
+        self._local.set(context.telegram_id, context)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                self.prefix + str(context.telegram_id),
+                json.dumps(dataclasses.asdict(context)),
+                ex=self.ttl_seconds,
+            )
+        except RedisError as exc:
+            self._stats["redis_errors"] += 1
+            logger.warning("Auth cache write failed: %s", exc)
+
+    async def invalidate(self, telegram_id: Optional[int]) -> None:
+        # Call after the change has committed, or a concurrent read may cache
+        # the old row again.
+        if telegram_id is None:
+            return
+        self._local.pop(telegram_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.prefix + str(telegram_id))
+        except RedisError as exc:
+            self._stats["redis_errors"] += 1
+            logger.warning("Failed to invalidate auth context %s: %s", telegram_id, exc)
+
+    async def invalidate_users(self, db: AsyncSession, user_ids: Iterable[int]) -> int:
+        """Invalidate by users.id, for callers (the miniapp) that lack telegram ids."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        telegram_ids = (
+            await db.execute(select(User.telegram_id).where(User.id.in_(user_ids)))
+        ).scalars().all()
+        for telegram_id in telegram_ids:
+            await self.invalidate(telegram_id)
+        return len(telegram_ids)
+
+    async def _redis_get(self, telegram_id: int) -> Optional[AuthContext]:
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self.prefix + str(telegram_id))
+        except RedisError as exc:
+            self._stats["redis_errors"] += 1
+            logger.warning("Auth cache falling back to the database: %s", exc)
+            return None
+        return AuthContext(**json.loads(raw)) if raw else None
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, local_entries=len(self._local))
+
+
+auth_contexts = AuthContextCache(
+    settings.auth_cache_ttl_seconds,
+    settings.auth_cache_local_seconds,
+    settings.auth_cache_max_entries,
+)
@@ -0,0 +1,90 @@
+import logging
+from typing import Any, Dict
+
+from aiogram import Bot, __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiohttp import ClientSession, TraceConfig
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from shared.config import settings
+from shared.telegram_dispatcher import DispatcherRequestMiddleware, outbound
+
+logger = logging.getLogger(__name__)
+
+_STATS: Dict[str, int] = {
+    "bots_created": 0,
+    "bots_reused": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+}
+
+
+async def _on_connection_create_end(session: Any, ctx: Any, params: Any) -> None:
+    _STATS["connections_created"] += 1
+
+
+async def _on_connection_reuseconn(session: Any, ctx: Any, params: Any) -> None:
+    _STATS["connections_reused"] += 1
+
+
+class PooledAiohttpSession(AiohttpSession):
+    # Same as AiohttpSession.create_session, plus a trace config so we can
+    # count fresh TLS connections vs keep-alive reuse.
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            trace_config = TraceConfig()
+            trace_config.on_connection_create_end.append(_on_connection_create_end)
+            trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+                trace_configs=[trace_config],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+
+_SESSION: PooledAiohttpSession | None = None
+_BOTS: Dict[str, Bot] = {}
+
+
+def _get_session() -> PooledAiohttpSession:
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = PooledAiohttpSession(limit=settings.bot_pool_limit)
+        # Every send made through a pooled bot (including message.answer in
+        # handlers) is rate limited by the outbound dispatcher.
+        _SESSION.middleware(DispatcherRequestMiddleware(outbound))
+    return _SESSION
+
+
+def get_bot(token: str) -> Bot:
+    bot = _BOTS.get(token)
+    if bot is not None:
+        _STATS["bots_reused"] += 1
+        return bot
+    # Every token shares one aiohttp session, so the user and admin bots
+    # reuse the same keep-alive connections to api.telegram.org.
+    bot = Bot(token=token, session=_get_session())
+    _BOTS[token] = bot
+    _STATS["bots_created"] += 1
+    return bot
+
+
+async def close_bots() -> None:
+    global _SESSION
+    logger.info("Bot pool stats at shutdown: %s", pool_stats())
+    await outbound.close()
+    _BOTS.clear()
+    if _SESSION is not None:
+        session, _SESSION = _SESSION, None
+        await session.close()
+
+
+def pool_stats() -> Dict[str, int]:
+    return dict(_STATS, active_bots=len(_BOTS))
@@ -26,6 +26,12 @@ def _get_int_with_default(value: Optional[str], default: int) -> int:
     return int(value)
 
 
+def _get_float_with_default(value: Optional[str], default: float) -> float:
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
 def _get_str(value: Optional[str]) -> Optional[str]:
     if value is None or value == "":
         return None
@@ -107,10 +113,79 @@ class Settings:
         os.getenv("BOT_USERNAME")
     )
     webapp_url: Optional[str] = _get_str(os.getenv("WEBAPP_URL"))
+    # Max simultaneous connections to api.telegram.org shared by all bots in a process.
+    bot_pool_limit: int = _get_int_with_default(os.getenv("BOT_POOL_LIMIT"), 100)
+
+    # Outbound Telegram rate limits (messages per second)
+    telegram_send_concurrency: int = _get_int_with_default(os.getenv("TELEGRAM_SEND_CONCURRENCY"), 8)
+    telegram_global_rate: float = _get_float_with_default(os.getenv("TELEGRAM_GLOBAL_RATE"), 30.0)
+    telegram_chat_rate: float = _get_float_with_default(os.getenv("TELEGRAM_CHAT_RATE"), 1.0)
+    telegram_group_rate: float = _get_float_with_default(os.getenv("TELEGRAM_GROUP_RATE"), 20 / 60)
+    telegram_max_retries: int = _get_int_with_default(os.getenv("TELEGRAM_MAX_RETRIES"), 3)
+
+    # Notification outbox (drained by the worker)
+    outbox_batch_size: int = _get_int_with_default(os.getenv("OUTBOX_BATCH_SIZE"), 100)
+    outbox_poll_seconds: float = _get_float_with_default(os.getenv("OUTBOX_POLL_SECONDS"), 1.0)
+    outbox_max_attempts: int = _get_int_with_default(os.getenv("OUTBOX_MAX_ATTEMPTS"), 5)
+    # Claimed rows not marked within this long are handed to another drainer.
+    outbox_lease_seconds: int = _get_int_with_default(os.getenv("OUTBOX_LEASE_SECONDS"), 300)
+    # Prometheus /metrics for the worker (port 0 disables it).
+    worker_metrics_host: str = os.getenv("WORKER_METRICS_HOST", "0.0.0.0")
+    worker_metrics_port: int = _get_int_with_default(os.getenv("WORKER_METRICS_PORT"), 9102)
+    # Rows a worker replica claims per transaction (FOR UPDATE SKIP LOCKED).
+    worker_batch_size: int = _get_int_with_default(os.getenv("WORKER_BATCH_SIZE"), 100)
+    # How often the worker folds wallet ledger entries into users.wallet_balance.
+    wallet_compact_seconds: float = _get_float_with_default(
+        os.getenv("WALLET_COMPACT_SECONDS"), 10.0
+    )
+    # Monthly partitions of transactions/admin_actions: the worker keeps this
+    # many months created ahead and, when retention is set (0 keeps
+    # everything), moves older months into the archive schema.
+    partition_months_ahead: int = _get_int_with_default(os.getenv("PARTITION_MONTHS_AHEAD"), 3)
+    transactions_retention_months: int = _get_int_with_default(
+        os.getenv("TRANSACTIONS_RETENTION_MONTHS"), 0
+    )
+    admin_actions_retention_months: int = _get_int_with_default(
+        os.getenv("ADMIN_ACTIONS_RETENTION_MONTHS"), 0
+    )
+    partition_archive_schema: str = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+    partition_maintenance_seconds: float = _get_float_with_default(
+        os.getenv("PARTITION_MAINTENANCE_SECONDS"), 3600.0
+    )
+    # How often the worker folds the deltas recorded by the platform stats
+    # triggers into the row admin /stats reads.
+    stats_refresh_seconds: float = _get_float_with_default(
+        os.getenv("STATS_REFRESH_SECONDS"), 10.0
+    )
+    # Worker deadline scheduler: new rows are picked up every refresh, and the
+    # whole deadline set is reloaded every resync to catch edited rows.
+    worker_deadline_refresh_seconds: float = _get_float_with_default(
+        os.getenv("WORKER_DEADLINE_REFRESH_SECONDS"), 15.0
+    )
+    worker_deadline_resync_seconds: float = _get_float_with_default(
+        os.getenv("WORKER_DEADLINE_RESYNC_SECONDS"), 600.0
+    )
 
     # Database & cache
     database_url: Optional[str] = _get_str(os.getenv("DATABASE_URL"))
+    # Optional read replica for listings and stats; reads stay on the primary
+    # for this many seconds after a user's own write.
+    database_read_url: Optional[str] = _get_str(os.getenv("DATABASE_READ_URL"))
+    read_your_writes_seconds: float = _get_float_with_default(
+        os.getenv("READ_YOUR_WRITES_SECONDS"), 5.0
+    )
+    db_pool_size: int = _get_int_with_default(os.getenv("DB_POOL_SIZE"), 5)
+    db_max_overflow: int = _get_int_with_default(os.getenv("DB_MAX_OVERFLOW"), 10)
+    db_pool_timeout: float = _get_float_with_default(os.getenv("DB_POOL_TIMEOUT"), 30.0)
+    # Neon closes idle connections server-side; recycle before that happens.
+    db_pool_recycle: int = _get_int_with_default(os.getenv("DB_POOL_RECYCLE"), 1800)
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Set when DATABASE_URL points at PgBouncer (or Neon's -pooler host) in
+    # transaction mode; disables asyncpg's prepared statement caches.
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    db_statement_cache_size: int = _get_int_with_default(os.getenv("DB_STATEMENT_CACHE_SIZE"), 100)
     redis_url: Optional[str] = _get_str(os.getenv("REDIS_URL"))
+    redis_socket_timeout: float = _get_float_with_default(os.getenv("REDIS_SOCKET_TIMEOUT"), 1.0)
 
     # Webhook base URLs (public)
     user_bot_webhook_base_url: Optional[str] = _get_str(
@@ -135,6 +210,11 @@ class Settings:
     main_gallery_channel_id: Optional[int] = _get_int(os.getenv("MAIN_GALLERY_CHANNEL_ID"))
     model_dashboard_channel_id: Optional[int] = _get_int(os.getenv("MODEL_DASHBOARD_CHANNEL_ID"))
     escrow_log_channel_id: Optional[int] = _get_int(os.getenv("ESCROW_LOG_CHANNEL_ID"))
+    # Escrow log lines are batched into one digest per window (0 disables batching).
+    escrow_log_window_seconds: float = _get_float_with_default(
+        os.getenv("ESCROW_LOG_WINDOW_SECONDS"), 5.0
+    )
+    escrow_log_max_lines: int = _get_int_with_default(os.getenv("ESCROW_LOG_MAX_LINES"), 25)
 
     # Payments
     paystack_secret_key: Optional[str] = _get_str(os.getenv("PAYSTACK_SECRET_KEY"))
@@ -142,6 +222,50 @@ class Settings:
     flutterwave_secret_key: Optional[str] = _get_str(os.getenv("FLUTTERWAVE_SECRET_KEY"))
     flutterwave_public_key: Optional[str] = _get_str(os.getenv("FLUTTERWAVE_PUBLIC_KEY"))
     flutterwave_webhook_hash: Optional[str] = _get_str(os.getenv("FLUTTERWAVE_WEBHOOK_HASH"))
+    # Ack-fast mode: verified webhooks are queued in webhook_events and
+    # processed by a consumer pool instead of inside the request.
+    webhook_async_mode: bool = os.getenv("WEBHOOK_ASYNC_MODE", "false").lower() == "true"
+    webhook_consumer_concurrency: int = _get_int_with_default(
+        os.getenv("WEBHOOK_CONSUMER_CONCURRENCY"), 4
+    )
+    webhook_consumer_poll_seconds: float = _get_float_with_default(
+        os.getenv("WEBHOOK_CONSUMER_POLL_SECONDS"), 0.5
+    )
+    webhook_event_lease_seconds: int = _get_int_with_default(
+        os.getenv("WEBHOOK_EVENT_LEASE_SECONDS"), 300
+    )
+    webhook_event_max_attempts: int = _get_int_with_default(
+        os.getenv("WEBHOOK_EVENT_MAX_ATTEMPTS"), 10
+    )
+    # Duplicate deliveries are dropped before touching the database.
+    webhook_dedupe_ttl_seconds: int = _get_int_with_default(
+        os.getenv("WEBHOOK_DEDUPE_TTL_SECONDS"), 86400
+    )
+    webhook_dedupe_max_entries: int = _get_int_with_default(
+        os.getenv("WEBHOOK_DEDUPE_MAX_ENTRIES"), 10000
+    )
+    # How long a delivery being processed blocks its retries (answered 409).
+    webhook_dedupe_in_flight_seconds: int = _get_int_with_default(
+        os.getenv("WEBHOOK_DEDUPE_IN_FLIGHT_SECONDS"), 30
+    )
+    # Per-user auth context (role, status, verification, access fee) for bot
+    # handlers. Redis entries are shared and invalidated on every change the
+    # bots make; the in-process copy is kept briefly since other processes
+    # cannot clear it. The miniapp clears entries it changes through the user
+    # bot's POST /internal/auth-cache/invalidate.
+    auth_cache_ttl_seconds: int = _get_int_with_default(os.getenv("AUTH_CACHE_TTL_SECONDS"), 60)
+    auth_cache_local_seconds: float = _get_float_with_default(
+        os.getenv("AUTH_CACHE_LOCAL_SECONDS"), 10.0
+    )
+    auth_cache_max_entries: int = _get_int_with_default(os.getenv("AUTH_CACHE_MAX_ENTRIES"), 10000)
+    # Opt-in capture of verified webhook deliveries for scripts/replay_webhooks.py.
+    webhook_capture_dir: Optional[str] = _get_str(os.getenv("WEBHOOK_CAPTURE_DIR"))
+    webhook_capture_segment_bytes: int = _get_int_with_default(
+        os.getenv("WEBHOOK_CAPTURE_SEGMENT_BYTES"), 16 * 1024 * 1024
+    )
+    webhook_capture_max_segments: int = _get_int_with_default(
+        os.getenv("WEBHOOK_CAPTURE_MAX_SEGMENTS"), 20
+    )
     # Crypto payments (manual approval)
     crypto_wallet_address: Optional[str] = _get_str(os.getenv("CRYPTO_WALLET_ADDRESS"))
     crypto_network: Optional[str] = _get_str(os.getenv("CRYPTO_NETWORK"))
@@ -152,6 +276,9 @@ class Settings:
 
     # Monitoring
     sentry_dsn: Optional[str] = _get_str(os.getenv("SENTRY_DSN"))
+    slow_query_ms: float = _get_float_with_default(os.getenv("SLOW_QUERY_MS"), 250.0)
+    # Raise instead of logging when a handler exceeds its declared query budget.
+    query_budget_strict: bool = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
 
     # Supabase storage
     supabase_url: Optional[str] = _get_url_with_slash(os.getenv("SUPABASE_URL"))
@@ -165,6 +292,8 @@ class Settings:
     # Security
     secret_key: Optional[str] = _get_str(os.getenv("SECRET_KEY"))
     encryption_key: Optional[str] = _get_str(os.getenv("ENCRYPTION_KEY"))
+    # Required as X-Internal-Token on /internal/* routes; unset disables them.
+    internal_api_token: Optional[str] = _get_str(os.getenv("INTERNAL_API_TOKEN"))
 
 
 settings = Settings()
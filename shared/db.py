@@ -1,13 +1,171 @@
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from shared.cache import LRUTTLCache
 from shared.config import settings
+from shared.metrics import registry
+from shared.query_stats import instrument
+
+logger = logging.getLogger(__name__)
 
 if not settings.database_url:
     raise RuntimeError("DATABASE_URL is required")
 
-engine = create_async_engine(settings.database_url, echo=False)
-AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+pool_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for (or opening) a pooled database connection.",
+)
+pool_invalidations = registry.counter(
+    "db_pool_invalidations_total", "Connections discarded after a disconnect error."
+)
+
+
+# Concurrent checkouts wait in separate greenlets and interleave, so the
+# recursion depth has to follow each caller rather than live on the pool.
+_checkout_depth: ContextVar[int] = ContextVar("db_pool_checkout_depth", default=0)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        # QueuePool._do_get can recurse; only the outermost call is timed.
+        token = _checkout_depth.set(_checkout_depth.get() + 1)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _checkout_depth.reset(token)
+            if not _checkout_depth.get():
+                pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+def _connect_args() -> Dict[str, Any]:
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode hands each transaction to an arbitrary
+        # server connection, so named prepared statements must be unique and
+        # never reused across transactions.
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": settings.db_statement_cache_size}
+
+
+def _create_engine(url: str):
+    created = create_async_engine(
+        url,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(),
+    )
+    event.listen(created.sync_engine, "handle_error", _invalidate_only_broken_connection)
+    instrument(created.sync_engine)
+    return created
+
+
+def _invalidate_only_broken_connection(context) -> None:
+    # By default a disconnect marks every pooled connection stale. Neon drops
+    # idle connections one at a time, so only the failing one is discarded;
+    # pre-ping catches any others at checkout.
+    if context.is_disconnect:
+        context.invalidate_pool_on_disconnect = False
+        pool_invalidations.inc()
+
+
+class PrimarySession(Session):
+    pass
+
+
+engine = _create_engine(settings.database_url)
+AsyncSessionLocal = sessionmaker(
+    engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=PrimarySession
+)
+
+# Optional replica for read-only call sites; without one, reads use the primary.
+read_engine = _create_engine(settings.database_read_url) if settings.database_read_url else None
+ReadSessionLocal = sessionmaker(
+    read_engine or engine, expire_on_commit=False, class_=AsyncSession
+)
+
+# Telegram id of the user the current handler is serving (set by
+# shared.middlewares.ActorMiddleware). Commits on the primary made on their
+# behalf pin their reads to the primary for the read-your-writes window.
+current_actor: ContextVar[Optional[int]] = ContextVar("db_current_actor", default=None)
+_recent_writers: LRUTTLCache[bool] = LRUTTLCache(
+    max_entries=10000, ttl_seconds=settings.read_your_writes_seconds
+)
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _note_flush(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _note_dml(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _note_commit(session) -> None:
+    if session.info.pop("wrote", False):
+        actor = current_actor.get()
+        if actor is not None:
+            _recent_writers.set(actor, True)
+
+
+def read_session() -> AsyncSession:
+    actor = current_actor.get()
+    if read_engine is None or (actor is not None and _recent_writers.get(actor)):
+        return AsyncSessionLocal()
+    return ReadSessionLocal()
+
+
+def handle_db_error(exc: DBAPIError) -> None:
+    # The failing connection has already been invalidated by the
+    # handle_error hook; the rest of the pool stays usable.
+    logger.warning(
+        "Database error (%s, connection invalidated=%s): %s",
+        type(exc.orig or exc).__name__,
+        exc.connection_invalidated,
+        exc,
+    )
+
+
+def pool_stats() -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkouts": pool_checkout_seconds.count(),
+        "checkout_wait_seconds_total": round(pool_checkout_seconds.sum(), 6),
+        "invalidations": int(pool_invalidations.value()),
+        "read_replica": _replica_stats(),
+    }
+
+
+def _replica_stats() -> Optional[Dict[str, int]]:
+    if read_engine is None:
+        return None
+    pool = read_engine.sync_engine.pool
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
 
 
 async def get_db_session():
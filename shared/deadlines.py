@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from shared.time_utils import utcnow
+
+DeadlineKey = Tuple[str, Hashable]
+
+
+class DeadlineScheduler:
+    def __init__(self) -> None:
+        self._heap: List[Tuple[datetime, DeadlineKey]] = []
+        # Latest deadline per key; heap entries that disagree with it are stale
+        # and skipped when popped.
+        self._due: Dict[DeadlineKey, datetime] = {}
+        self._wake = asyncio.Event()
+        self._stats: Dict[str, float] = {
+            "fired": 0,
+            "last_lateness_seconds": 0.0,
+            "max_lateness_seconds": 0.0,
+            "total_lateness_seconds": 0.0,
+        }
+
+    def schedule(self, kind: str, key: Hashable, due_at: datetime) -> None:
+        item = (kind, key)
+        if self._due.get(item) == due_at:
+            return
+        self._due[item] = due_at
+        heapq.heappush(self._heap, (due_at, item))
+        if self._heap[0][1] == item:
+            self._wake.set()
+
+    def discard(self, kind: str, key: Hashable) -> None:
+        self._due.pop((kind, key), None)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._due.clear()
+
+    def next_due(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Tuple[str, Hashable, datetime]]:
+        now = now or utcnow()
+        due: List[Tuple[str, Hashable, datetime]] = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            due_at, item = heapq.heappop(self._heap)
+            del self._due[item]
+            due.append((item[0], item[1], due_at))
+            self._record_lateness((now - due_at).total_seconds())
+        return due
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _record_lateness(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        self._stats["fired"] += 1
+        self._stats["last_lateness_seconds"] = seconds
+        self._stats["max_lateness_seconds"] = max(self._stats["max_lateness_seconds"], seconds)
+        self._stats["total_lateness_seconds"] += seconds
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def wait(self, max_seconds: float) -> None:
+        # Sleep until the earliest deadline, max_seconds, or wake(), whichever
+        # comes first.
+        next_due = self.next_due()
+        timeout = max_seconds
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, (next_due - utcnow()).total_seconds()))
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def stats(self) -> Dict[str, float]:
+        fired = self._stats["fired"]
+        return dict(
+            self._stats,
+            pending=len(self._due),
+            avg_lateness_seconds=self._stats["total_lateness_seconds"] / fired if fired else 0.0,
+        )
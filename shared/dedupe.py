@@ -0,0 +1,103 @@
+import logging
+from enum import Enum
+from typing import Any, Dict
+
+from redis.exceptions import RedisError
+
+from shared.cache import LRUTTLCache
+from shared.config import settings
+from shared.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_dedupe_key(provider: str, payload: dict[str, Any], transaction_ref: str) -> str:
+    data = payload.get("data") or {}
+    event = payload.get("event") or payload.get("event.type") or ""
+    event_id = data.get("id") or transaction_ref
+    return f"{provider}:{event}:{event_id}"
+
+
+class Claim(str, Enum):
+    NEW = "new"
+    IN_FLIGHT = "in_flight"
+    DONE = "done"
+
+
+_STAT_KEYS = {Claim.NEW: "misses", Claim.IN_FLIGHT: "in_flight", Claim.DONE: "hits"}
+
+
+class EventDeduper:
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        in_flight_seconds: int = 30,
+        prefix: str = "dedupe:webhook:",
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.in_flight_seconds = in_flight_seconds
+        self.prefix = prefix
+        self._local: LRUTTLCache[Claim] = LRUTTLCache(max_entries, ttl_seconds)
+        self._stats = {"hits": 0, "in_flight": 0, "misses": 0, "redis_errors": 0}
+
+    async def claim(self, key: str) -> Claim:
+        # A new claim only lives for in_flight_seconds, so a worker that dies
+        # mid-processing does not swallow the provider's retries; complete()
+        # extends it to the full TTL once the event is handled.
+        state = await self._claim(key)
+        self._stats[_STAT_KEYS[state]] += 1
+        return state
+
+    async def _claim(self, key: str) -> Claim:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                added = await redis.set(
+                    self.prefix + key, Claim.IN_FLIGHT.value, nx=True, ex=self.in_flight_seconds
+                )
+                if added:
+                    return Claim.NEW
+                state = await redis.get(self.prefix + key)
+                return Claim.DONE if state == Claim.DONE.value.encode() else Claim.IN_FLIGHT
+            except RedisError as exc:
+                self._stats["redis_errors"] += 1
+                logger.warning("Dedupe falling back to local cache: %s", exc)
+        state = self._local.get(key)
+        if state is not None:
+            return state
+        self._local.set(key, Claim.IN_FLIGHT, self.in_flight_seconds)
+        return Claim.NEW
+
+    async def complete(self, key: str) -> None:
+        self._local.set(key, Claim.DONE)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(self.prefix + key, Claim.DONE.value, ex=self.ttl_seconds)
+        except RedisError as exc:
+            self._stats["redis_errors"] += 1
+            logger.warning("Failed to complete dedupe key %s: %s", key, exc)
+
+    async def release(self, key: str) -> None:
+        # Forget a claim whose processing did not finish so the provider's
+        # retry is not dropped.
+        self._local.pop(key)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.prefix + key)
+        except RedisError as exc:
+            logger.warning("Failed to release dedupe key %s: %s", key, exc)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, local_entries=len(self._local))
+
+
+webhook_deduper = EventDeduper(
+    settings.webhook_dedupe_ttl_seconds,
+    settings.webhook_dedupe_max_entries,
+    settings.webhook_dedupe_in_flight_seconds,
+)
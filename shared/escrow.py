@@ -6,11 +6,13 @@ from typing import Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from models import EscrowAccount, Transaction, User
+from models import EscrowAccount, Transaction
 from shared.config import settings
 from shared.notifications import send_escrow_log
 from shared.time_utils import utcnow
+from shared.wallet import LedgerEntry, credit_wallet, record_entries
 
 
 def generate_escrow_ref(prefix: str = "esc") -> str:
@@ -36,6 +38,32 @@ async def create_escrow(
     transaction: Optional[Transaction],
     release_condition: str,
     auto_release_hours: Optional[int] = 24,
+) -> EscrowAccount:
+    escrow = build_escrow(
+        escrow_type=escrow_type,
+        related_id=related_id,
+        payer_id=payer_id,
+        receiver_id=receiver_id,
+        amount=amount,
+        transaction=transaction,
+        release_condition=release_condition,
+        auto_release_hours=auto_release_hours,
+    )
+    db.add(escrow)
+    await db.flush()
+    return escrow
+
+
+def build_escrow(
+    *,
+    escrow_type: str,
+    related_id: Optional[int],
+    payer_id: int,
+    receiver_id: Optional[int],
+    amount: float,
+    transaction: Optional[Transaction],
+    release_condition: str,
+    auto_release_hours: Optional[int] = 24,
 ) -> EscrowAccount:
     if settings.manual_release_only:
         auto_release_hours = None
@@ -44,7 +72,7 @@ async def create_escrow(
     if auto_release_hours:
         auto_release_at = utcnow() + timedelta(hours=auto_release_hours)
 
-    escrow = EscrowAccount(
+    return EscrowAccount(
         escrow_ref=generate_escrow_ref(escrow_type[:3]),
         escrow_type=escrow_type,
         related_id=related_id,
@@ -59,9 +87,38 @@ async def create_escrow(
         release_condition=release_condition,
         release_condition_met=False,
     )
-    db.add(escrow)
-    await db.flush()
-    return escrow
+
+
+def apply_release(
+    locked: EscrowAccount, *, reason: Optional[str] = None
+) -> Optional[LedgerEntry]:
+    # Marks a locked, held escrow released and returns the wallet credit it
+    # owes; the caller records it with record_entries and commits.
+    locked.status = "released"
+    locked.released_at = utcnow()
+    locked.release_condition_met = True
+    if reason:
+        locked.dispute_reason = reason
+    if locked.receiver_id and locked.receiver_payout:
+        return LedgerEntry(locked.receiver_id, locked.receiver_payout, "escrow_release", locked.id)
+    return None
+
+
+def release_log_message(escrow: EscrowAccount, reason: Optional[str] = None) -> str:
+    message = f"Escrow released: {escrow.escrow_ref} ({escrow.escrow_type}) amount {escrow.amount}"
+    if reason:
+        message = f"{message} reason={reason}"
+    return message
+
+
+async def get_escrow_with_parties(db: AsyncSession, escrow_ref: str) -> Optional[EscrowAccount]:
+    # Payer and receiver are joined in, so notifying both costs no extra query.
+    result = await db.execute(
+        select(EscrowAccount)
+        .options(joinedload(EscrowAccount.payer), joinedload(EscrowAccount.receiver))
+        .where(EscrowAccount.escrow_ref == escrow_ref)
+    )
+    return result.scalar_one_or_none()
 
 
 async def release_escrow(
@@ -70,10 +127,14 @@ async def release_escrow(
     *,
     reason: Optional[str] = None,
 ) -> tuple[EscrowAccount, bool]:
+    # The caller's escrow is normally already loaded in this session; without
+    # populate_existing the locked read would keep its stale status and two
+    # concurrent calls could both release it.
     result = await db.execute(
         select(EscrowAccount)
         .where(EscrowAccount.id == escrow.id)
         .with_for_update()
+        .execution_options(populate_existing=True)
     )
     locked = result.scalar_one_or_none()
     if not locked:
@@ -81,25 +142,13 @@ async def release_escrow(
     if locked.status not in {"held", "disputed"}:
         return locked, False
 
-    locked.status = "released"
-    locked.released_at = utcnow()
-    locked.release_condition_met = True
-    if reason:
-        locked.dispute_reason = reason
-
-    if locked.receiver_id and locked.receiver_payout:
-        user = await db.get(User, locked.receiver_id)
-        if user:
-            user.wallet_balance = (user.wallet_balance or 0) + locked.receiver_payout
+    credit = apply_release(locked, reason=reason)
+    if credit is not None:
+        await record_entries(db, [credit])
 
     await db.commit()
     await db.refresh(locked)
-    message = (
-        f"Escrow released: {locked.escrow_ref} ({locked.escrow_type}) amount {locked.amount}"
-    )
-    if reason:
-        message = f"{message} reason={reason}"
-    await send_escrow_log(message)
+    await send_escrow_log(release_log_message(locked, reason))
     return locked, True
 
 
@@ -113,6 +162,7 @@ async def refund_escrow(
         select(EscrowAccount)
         .where(EscrowAccount.id == escrow.id)
         .with_for_update()
+        .execution_options(populate_existing=True)
     )
     locked = result.scalar_one_or_none()
     if not locked:
@@ -126,10 +176,10 @@ async def refund_escrow(
     if reason:
         locked.dispute_reason = reason
 
-    if locked.payer_id:
-        user = await db.get(User, locked.payer_id)
-        if user:
-            user.wallet_balance = (user.wallet_balance or 0) + (locked.amount or 0)
+    if locked.payer_id and locked.amount:
+        await credit_wallet(
+            db, locked.payer_id, locked.amount, entry_type="escrow_refund", escrow_id=locked.id
+        )
 
     await db.commit()
     await db.refresh(locked)
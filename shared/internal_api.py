@@ -0,0 +1,28 @@
+import hmac
+from typing import Optional
+
+from aiohttp import web
+
+from shared.config import settings
+
+# /internal/* routes expose pool and cache state and let the miniapp clear
+# cached auth contexts. They need INTERNAL_API_TOKEN as X-Internal-Token and
+# answer 404 otherwise, so they look absent to anyone probing the bots.
+INTERNAL_PREFIX = "/internal/"
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+
+def internal_token_ok(token: Optional[str]) -> bool:
+    expected = settings.internal_api_token
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(expected, token)
+
+
+@web.middleware
+async def internal_token_middleware(request: web.Request, handler):
+    if request.path.startswith(INTERNAL_PREFIX) and not internal_token_ok(
+        request.headers.get(INTERNAL_TOKEN_HEADER)
+    ):
+        raise web.HTTPNotFound()
+    return await handler(request)
@@ -0,0 +1,37 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from shared.db import current_actor
+from shared.query_stats import track
+
+
+class ActorMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        token = current_actor.set(user.id if user else None)
+        try:
+            return await handler(event, data)
+        finally:
+            current_actor.reset(token)
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    # Registered as inner middleware so the resolved handler is known.
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        label = getattr(callback, "__qualname__", type(event).__name__)
+        with track(label):
+            return await handler(event, data)
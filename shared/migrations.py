@@ -0,0 +1,268 @@
+import asyncio
+import importlib.util
+import logging
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+# Arbitrary constant; only one runner may apply migrations at a time.
+ADVISORY_LOCK_ID = 7_461_231_001
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[["MigrationOps"], Awaitable[None]]
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(directory.glob("*.py")):
+        match = _FILENAME.match(path.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise RuntimeError(f"Duplicate migration version {version:04d}: {path.name}")
+        spec = importlib.util.spec_from_file_location(f"migrations.m{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations[version] = Migration(version, match.group(2), module.upgrade)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _is_lock_timeout(exc: DBAPIError) -> bool:
+    return "lock timeout" in str(exc.orig or exc)
+
+
+class MigrationOps:
+    """Online-safe schema operations handed to each migration's upgrade()."""
+
+    def __init__(
+        self,
+        conn: AsyncConnection,
+        *,
+        dry_run: bool = False,
+        lock_timeout: str = "5s",
+        statement_timeout: str = "60s",
+        attempts: int = 5,
+    ) -> None:
+        # The connection is in autocommit mode: every statement is its own
+        # short transaction, so no lock is held between steps.
+        self.conn = conn
+        self.dry_run = dry_run
+        self.lock_timeout = lock_timeout
+        self.statement_timeout = statement_timeout
+        self.attempts = attempts
+
+    async def _set_timeouts(self, statement_timeout: Optional[str] = None) -> None:
+        await self.conn.execute(text(f"SET lock_timeout = '{self.lock_timeout}'"))
+        await self.conn.execute(
+            text(f"SET statement_timeout = '{statement_timeout or self.statement_timeout}'")
+        )
+
+    async def _with_retry(self, action: Callable[[], Awaitable[Any]], label: str) -> Any:
+        # Failing fast on a lock and retrying keeps DDL from queueing behind a
+        # long transaction while every new query queues behind the DDL.
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await action()
+            except DBAPIError as exc:
+                if not _is_lock_timeout(exc) or attempt == self.attempts:
+                    raise
+                logger.warning("%s: lock timeout, retrying (%s/%s)", label, attempt, self.attempts)
+                await asyncio.sleep(attempt * 2)
+
+    async def scalar(self, sql: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await self.conn.scalar(text(sql), params or {})
+
+    async def column_type(self, table: str, column: str) -> Optional[str]:
+        return await self.scalar(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column",
+            {"table": table, "column": column},
+        )
+
+    async def column_exists(self, table: str, column: str) -> bool:
+        return await self.column_type(table, column) is not None
+
+    async def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> int:
+        if self.dry_run:
+            print(f"  {sql}")
+            return 0
+
+        async def run() -> int:
+            await self._set_timeouts()
+            result = await self.conn.execute(text(sql), params or {})
+            return result.rowcount
+
+        return await self._with_retry(run, sql)
+
+    async def atomic(self, statements: Sequence[str]) -> None:
+        # For swaps that must be seen all at once; keep them to catalog-only
+        # statements so the locks they take are held only briefly.
+        if self.dry_run:
+            print("  BEGIN")
+            for sql in statements:
+                print(f"    {sql}")
+            print("  COMMIT")
+            return
+
+        async def run() -> None:
+            # The runner's own connection autocommits, so use a second one.
+            async with self.conn.engine.begin() as conn:
+                await conn.execute(text(f"SET LOCAL lock_timeout = '{self.lock_timeout}'"))
+                await conn.execute(text(f"SET LOCAL statement_timeout = '{self.statement_timeout}'"))
+                for sql in statements:
+                    await conn.execute(text(sql))
+
+        await self._with_retry(run, statements[0])
+
+    async def create_table(self, table) -> None:
+        if self.dry_run:
+            print(f"  CREATE TABLE IF NOT EXISTS {table.name} (from models)")
+            return
+
+        async def run() -> None:
+            await self._set_timeouts()
+            await self.conn.run_sync(table.create, checkfirst=True)
+
+        await self._with_retry(run, f"create {table.name}")
+
+    async def create_index(self, name: str, definition: str, *, unique: bool = False) -> None:
+        state = await self.scalar(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name",
+            {"name": name},
+        )
+        if state:
+            return
+        create = f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {definition}"
+        drop = f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+        if self.dry_run:
+            if state is False:
+                print(f"  {drop}")
+            print(f"  {create}")
+            return
+
+        async def run() -> None:
+            # The build itself may take long; only waiting on locks is bounded.
+            await self._set_timeouts(statement_timeout="0")
+            # An interrupted or timed-out concurrent build leaves an invalid index.
+            await self.conn.execute(text(drop))
+            await self.conn.execute(text(create))
+
+        await self._with_retry(run, create)
+
+    async def backfill(
+        self,
+        table: str,
+        set_clause: str,
+        where: str,
+        *,
+        batch_size: int = 1000,
+        max_load: float = 0.5,
+    ) -> int:
+        # Updates batch_size rows per transaction and sleeps between batches
+        # so the backfill uses at most max_load of the database's time. Rows
+        # locked by other transactions are waited for (bounded by
+        # lock_timeout and retried), never skipped, and it only stops once a
+        # batch finds nothing left to update.
+        sql = (
+            f"UPDATE {table} SET {set_clause} WHERE id IN ("
+            f"SELECT id FROM {table} WHERE {where} LIMIT :batch FOR UPDATE)"
+        )
+        if self.dry_run:
+            print(f"  {sql}  -- batches of {batch_size}")
+            return 0
+        total = 0
+        while True:
+            started = time.perf_counter()
+            updated = await self.execute(sql, {"batch": batch_size})
+            if not updated:
+                return total
+            total += updated
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(elapsed * (1 - max_load) / max_load)
+
+
+class MigrationRunner:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        migrations: Optional[Sequence[Migration]] = None,
+        **ops_options: Any,
+    ) -> None:
+        self.engine = engine
+        self.migrations = list(migrations) if migrations is not None else load_migrations()
+        self.ops_options = ops_options
+
+    async def _ensure_table(self, conn: AsyncConnection) -> None:
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "applied_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                "duration_ms INTEGER)"
+            )
+        )
+
+    async def applied_versions(self, conn: AsyncConnection) -> set[int]:
+        exists = await conn.scalar(text("SELECT to_regclass('schema_migrations') IS NOT NULL"))
+        if not exists:
+            return set()
+        rows = await conn.execute(text("SELECT version FROM schema_migrations"))
+        return {row[0] for row in rows}
+
+    async def pending(self) -> List[Migration]:
+        async with self.engine.connect() as conn:
+            applied = await self.applied_versions(conn)
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    async def run(self, *, dry_run: bool = False, target: Optional[int] = None) -> List[Migration]:
+        applied: List[Migration] = []
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            try:
+                if not dry_run:
+                    await self._ensure_table(conn)
+                done = await self.applied_versions(conn)
+                ops = MigrationOps(conn, dry_run=dry_run, **self.ops_options)
+                for migration in self.migrations:
+                    if migration.version in done:
+                        continue
+                    if target is not None and migration.version > target:
+                        break
+                    print(f"{'[dry-run] ' if dry_run else ''}{migration.version:04d} {migration.name}")
+                    started = time.perf_counter()
+                    await migration.upgrade(ops)
+                    if not dry_run:
+                        await conn.execute(
+                            text(
+                                "INSERT INTO schema_migrations (version, name, duration_ms) "
+                                "VALUES (:version, :name, :duration)"
+                            ),
+                            {
+                                "version": migration.version,
+                                "name": migration.name,
+                                "duration": int((time.perf_counter() - started) * 1000),
+                            },
+                        )
+                    applied.append(migration)
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+        return applied
@@ -1,43 +1,159 @@
-from typing import Optional
+import asyncio
+from typing import List, Optional
 
 import logging
-from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 
+from shared.bot_pool import get_bot
 from shared.config import settings
+from shared.telegram_dispatcher import Priority, outbound_priority
 
 logger = logging.getLogger(__name__)
 
 
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def digest_chunks(lines: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[range]:
+    """Index ranges of consecutive lines that fit in one message each."""
+    chunks: List[range] = []
+    start, size = 0, 0
+    for index, line in enumerate(lines):
+        length = min(len(line), limit)
+        # +1 for the joining newline.
+        if index > start and size + length + 1 > limit:
+            chunks.append(range(start, index))
+            start, size = index, 0
+        size += length + (1 if index > start else 0)
+    if lines:
+        chunks.append(range(start, len(lines)))
+    return chunks
+
+
+def pack_digest(lines: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    return ["\n".join(lines[index][:limit] for index in chunk) for chunk in digest_chunks(lines, limit)]
+
+
+async def send_escrow_digest(lines: List[str]) -> None:
+    if not lines or not settings.escrow_log_channel_id or not settings.user_bot_token:
+        return
+    bot = get_bot(settings.user_bot_token)
+    with outbound_priority(Priority.BULK):
+        for text in pack_digest(lines):
+            await bot.send_message(settings.escrow_log_channel_id, text)
+
+
+class EscrowLogBuffer:
+    def __init__(self, window_seconds: float, max_lines: int) -> None:
+        self.window_seconds = window_seconds
+        self.max_lines = max(1, max_lines)
+        self._lines: List[str] = []
+        self._size = 0
+        self._timer: Optional[asyncio.Task] = None
+
+    async def add(self, line: str) -> None:
+        self._lines.append(line)
+        self._size += len(line) + 1
+        if (
+            self.window_seconds <= 0
+            or len(self._lines) >= self.max_lines
+            or self._size >= TELEGRAM_MESSAGE_LIMIT
+        ):
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        timer, self._timer = self._timer, None
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        lines, self._lines, self._size = self._lines, [], 0
+        if not lines:
+            return
+        try:
+            await send_escrow_digest(lines)
+        except Exception as exc:
+            logger.warning("Failed to send escrow log digest (%s lines): %s", len(lines), exc)
+
+
+_escrow_log = EscrowLogBuffer(
+    settings.escrow_log_window_seconds,
+    settings.escrow_log_max_lines,
+)
+
+
 async def send_escrow_log(message: str) -> None:
     if not settings.escrow_log_channel_id or not settings.user_bot_token:
         return
-    bot = Bot(token=settings.user_bot_token)
-    try:
-        await bot.send_message(settings.escrow_log_channel_id, message)
-    finally:
-        await bot.session.close()
+    # Lines are coalesced into one digest per window instead of one message each.
+    await _escrow_log.add(message)
 
 
-async def send_user_message(telegram_id: int, message: str) -> None:
+async def flush_escrow_log() -> None:
+    await _escrow_log.flush()
+
+
+async def send_user_message(
+    telegram_id: int,
+    message: str,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
     if not settings.user_bot_token:
         return
-    bot = Bot(token=settings.user_bot_token)
-    try:
+    bot = get_bot(settings.user_bot_token)
+    with outbound_priority(priority):
         await bot.send_message(telegram_id, message)
-    finally:
-        await bot.session.close()
 
 
-async def send_admin_message(message: str, reply_markup: InlineKeyboardMarkup | None = None) -> None:
+async def send_admin_message(
+    message: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
     if not settings.admin_bot_token or not settings.admin_telegram_ids:
         return
-    bot = Bot(token=settings.admin_bot_token)
-    try:
-        for admin_id in settings.admin_telegram_ids:
-            try:
-                await bot.send_message(admin_id, message, reply_markup=reply_markup)
-            except Exception as exc:
-                logger.warning("Failed to send admin message to %s: %s", admin_id, exc)
-    finally:
-        await bot.session.close()
+    await broadcast_to_admins(
+        settings.admin_bot_token, message, reply_markup=reply_markup, priority=priority
+    )
+
+
+async def send_admin_chat_message(
+    admin_id: int,
+    message: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
+    if not settings.admin_bot_token:
+        return
+    bot = get_bot(settings.admin_bot_token)
+    with outbound_priority(priority):
+        await bot.send_message(admin_id, message, reply_markup=reply_markup)
+
+
+async def broadcast_to_admins(
+    token: str,
+    message: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
+    bot = get_bot(token)
+
+    async def _send(admin_id: int) -> None:
+        try:
+            await bot.send_message(admin_id, message, reply_markup=reply_markup)
+        except Exception as exc:
+            logger.warning("Failed to send admin message to %s: %s", admin_id, exc)
+
+    # The outbound dispatcher paces these, so fan out instead of awaiting
+    # each admin in turn.
+    with outbound_priority(priority):
+        await asyncio.gather(*(_send(admin_id) for admin_id in settings.admin_telegram_ids))
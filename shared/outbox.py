@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import Row, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import NotificationOutbox
+from shared.config import settings
+from shared.notifications import (
+    digest_chunks,
+    send_admin_chat_message,
+    send_escrow_digest,
+    send_user_message,
+)
+from shared.telegram_dispatcher import Priority
+from shared.time_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_USER = "user"
+CHANNEL_ADMIN = "admin"
+CHANNEL_ESCROW_LOG = "escrow_log"
+
+
+# The enqueue helpers only add rows to the caller's session, so the message is
+# committed (or rolled back) together with the state change it describes.
+# Every helper sets the same columns so rows added together are flushed as a
+# single multi-row INSERT.
+def enqueue_user_message(
+    db: AsyncSession,
+    telegram_id: int,
+    message: str,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
+    db.add(
+        NotificationOutbox(
+            channel=CHANNEL_USER,
+            chat_id=telegram_id,
+            message=message,
+            reply_markup=None,
+            priority=int(priority),
+        )
+    )
+
+
+def enqueue_admin_message(
+    db: AsyncSession,
+    message: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    *,
+    priority: Priority = Priority.DEFAULT,
+) -> None:
+    # One row per admin, so a failed delivery is retried for that admin only.
+    markup = reply_markup.model_dump(mode="json", exclude_none=True) if reply_markup else None
+    for admin_id in settings.admin_telegram_ids:
+        db.add(
+            NotificationOutbox(
+                channel=CHANNEL_ADMIN,
+                chat_id=admin_id,
+                message=message,
+                reply_markup=markup,
+                priority=int(priority),
+            )
+        )
+
+
+def enqueue_escrow_log(db: AsyncSession, message: str) -> None:
+    db.add(
+        NotificationOutbox(
+            channel=CHANNEL_ESCROW_LOG,
+            chat_id=None,
+            message=message,
+            reply_markup=None,
+            priority=int(Priority.BULK),
+        )
+    )
+
+
+def _priority(value: Optional[int]) -> Priority:
+    try:
+        return Priority(value)
+    except ValueError:
+        return Priority.DEFAULT
+
+
+async def _deliver(row: Row) -> None:
+    priority = _priority(row.priority)
+    if row.channel == CHANNEL_USER:
+        await send_user_message(row.chat_id, row.message, priority=priority)
+    elif row.channel == CHANNEL_ADMIN:
+        reply_markup = (
+            InlineKeyboardMarkup.model_validate(row.reply_markup) if row.reply_markup else None
+        )
+        # Rows queued before admin messages were split per admin have no chat_id.
+        admin_ids = [row.chat_id] if row.chat_id is not None else settings.admin_telegram_ids
+        for admin_id in admin_ids:
+            await send_admin_chat_message(admin_id, row.message, reply_markup, priority=priority)
+    else:
+        raise ValueError(f"Unknown outbox channel: {row.channel}")
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(300, 2 ** attempts))
+
+
+async def claim_outbox(db: AsyncSession, batch_size: int) -> List[Row]:
+    now = utcnow()
+    # SKIP LOCKED lets several drainers share the table; the lease marks the
+    # rows as taken once this short transaction commits. A 'sending' row whose
+    # lease expired belongs to a drainer that died mid-send.
+    claimable = (
+        select(NotificationOutbox.id)
+        .where(
+            ((NotificationOutbox.status == "pending") & (NotificationOutbox.available_at <= now))
+            | ((NotificationOutbox.status == "sending") & (NotificationOutbox.locked_until < now))
+        )
+        .order_by(NotificationOutbox.priority, NotificationOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(claimable.scalar_subquery()))
+        .values(
+            status="sending",
+            attempts=NotificationOutbox.attempts + 1,
+            locked_until=now + timedelta(seconds=settings.outbox_lease_seconds),
+        )
+        .returning(
+            NotificationOutbox.id,
+            NotificationOutbox.channel,
+            NotificationOutbox.chat_id,
+            NotificationOutbox.message,
+            NotificationOutbox.reply_markup,
+            NotificationOutbox.priority,
+            NotificationOutbox.attempts,
+        )
+    )
+    rows = sorted(result.all(), key=lambda row: (row.priority, row.id))
+    await db.commit()
+    return rows
+
+
+async def _record_outcomes(db: AsyncSession, rows: Sequence[Row], outcomes: Sequence[Any]) -> None:
+    now = utcnow()
+    sent_ids = [row.id for row, outcome in zip(rows, outcomes) if not isinstance(outcome, BaseException)]
+    if sent_ids:
+        await db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=now, last_error=None, locked_until=None)
+        )
+    for row, outcome in zip(rows, outcomes):
+        if not isinstance(outcome, BaseException):
+            continue
+        values: Dict[str, Any] = {
+            "last_error": f"{type(outcome).__name__}: {outcome}",
+            "locked_until": None,
+        }
+        if row.attempts >= settings.outbox_max_attempts:
+            values["status"] = "failed"
+            logger.error("Outbox message %s failed permanently: %s", row.id, values["last_error"])
+        else:
+            values.update(status="pending", available_at=now + _retry_delay(row.attempts))
+            logger.warning("Outbox message %s failed, will retry: %s", row.id, values["last_error"])
+        await db.execute(
+            update(NotificationOutbox).where(NotificationOutbox.id == row.id).values(**values)
+        )
+    await db.commit()
+
+
+async def drain_outbox(db: AsyncSession, *, batch_size: Optional[int] = None) -> int:
+    # Claim, send and record run as separate steps so no transaction (or
+    # row lock) is held while the dispatcher paces the sends.
+    rows = await claim_outbox(db, batch_size or settings.outbox_batch_size)
+    if not rows:
+        return 0
+
+    # Escrow log rows in the batch go out as digest messages, each row
+    # marked by the outcome of the message that carried it; everything else
+    # is sent individually.
+    log_rows = [row for row in rows if row.channel == CHANNEL_ESCROW_LOG]
+    other_rows = [row for row in rows if row.channel != CHANNEL_ESCROW_LOG]
+    lines = [row.message for row in log_rows]
+    chunks = digest_chunks(lines)
+    deliveries = [_deliver(row) for row in other_rows]
+    deliveries += [send_escrow_digest(lines[chunk.start : chunk.stop]) for chunk in chunks]
+    results = await asyncio.gather(*deliveries, return_exceptions=True)
+    outcomes = list(results[: len(other_rows)])
+    for chunk, result in zip(chunks, results[len(other_rows) :]):
+        outcomes += [result] * len(chunk)
+    await _record_outcomes(db, other_rows + log_rows, outcomes)
+    return len(rows)
@@ -0,0 +1,179 @@
+import logging
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month on created_at.
+PARTITIONED_TABLES = ("transactions", "admin_actions")
+LOCK_TIMEOUT = "5s"
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+_MONTH_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def _month_bound(month: datetime) -> str:
+    return f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def month_partition_ddl(table: str, month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"{_month_bound(month)}"
+    )
+
+
+def _month_filter(month: datetime) -> str:
+    return f"created_at >= '{month:%Y-%m-%d}' AND created_at < '{add_months(month, 1):%Y-%m-%d}'"
+
+
+def default_partition_ddl(table: str) -> str:
+    # Catches rows outside every monthly range (e.g. the worker was down for
+    # months) instead of failing the insert.
+    return f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+
+
+async def list_partitions(conn, table: str) -> List[Tuple[str, Optional[datetime]]]:
+    """(name, upper bound) per partition; the upper bound is None for DEFAULT."""
+    rows = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound or "")
+        partitions.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+
+async def _run_ddl(engine: AsyncEngine, *statements: str) -> bool:
+    # All statements run in one transaction: either every step lands or none.
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            for statement in statements:
+                await conn.execute(text(statement))
+        return True
+    except DBAPIError as exc:
+        # Usually a lock timeout behind a long transaction; the next run retries.
+        logger.warning("Partition maintenance failed (%s): %s", statements[-1], exc.orig or exc)
+        return False
+
+
+async def _create_month(
+    engine: AsyncEngine, table: str, month: datetime, default: Optional[str]
+) -> bool:
+    if default is not None:
+        async with engine.connect() as conn:
+            stranded = await conn.scalar(
+                text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {_month_filter(month)})")
+            )
+        if stranded:
+            # Postgres refuses a new range while the default partition holds
+            # rows for it, so they move into the new partition before it is
+            # attached, all in one transaction. The rows are unchanged, so the
+            # triggers on transactions (models.py) skip the delete.
+            name = partition_name(table, month)
+            logger.warning("Moving %s rows for %s out of %s", table, f"{month:%Y-%m}", default)
+            return await _run_ddl(
+                engine,
+                "SET LOCAL app.moving_rows = 'on'",
+                f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+                f"WITH moved AS (DELETE FROM {default} WHERE {_month_filter(month)} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved",
+                f"ALTER TABLE {table} ATTACH PARTITION {name} {_month_bound(month)}",
+            )
+    return await _run_ddl(engine, month_partition_ddl(table, month))
+
+
+async def ensure_partitions(
+    engine: AsyncEngine, table: str, now: datetime, months_ahead: int
+) -> List[str]:
+    async with engine.connect() as conn:
+        partitions = await list_partitions(conn, table)
+    covered = max((upper for _, upper in partitions if upper is not None), default=None)
+    default = next((name for name, upper in partitions if upper is None), None)
+    last = add_months(month_start(now), months_ahead)
+    # Continue from the newest existing range so no gap is left behind.
+    month = min(covered, month_start(now)) if covered else month_start(now)
+    created = []
+    while month <= last:
+        if covered is None or month >= covered:
+            if await _create_month(engine, table, month, default):
+                created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+
+async def _detached_partitions(conn, table: str, cutoff: datetime) -> List[str]:
+    """Expired partitions of `table` left detached in the current schema."""
+    rows = await conn.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = CAST(current_schema() AS regnamespace) "
+            "AND relkind = 'r' AND NOT relispartition "
+            "AND (relname = :legacy OR relname LIKE :months)"
+        ),
+        {"legacy": f"{table}_legacy", "months": f"{table}\\_y%"},
+    )
+    names = []
+    for (name,) in rows:
+        match = _MONTH_SUFFIX.search(name)
+        month = datetime(int(match[1]), int(match[2]), 1) if match else None
+        if month is not None and name == partition_name(table, month):
+            if add_months(month, 1) <= cutoff:
+                names.append(name)
+        elif name == f"{table}_legacy":
+            # The legacy partition (migration 0013) only ever held the oldest rows.
+            names.append(name)
+    return sorted(names)
+
+
+async def archive_expired_partitions(
+    engine: AsyncEngine, table: str, now: datetime, retention_months: int, archive_schema: str
+) -> List[str]:
+    # Old months are detached and moved aside whole rather than deleted row
+    # by row; the archive schema can be dumped and dropped at leisure.
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now), -retention_months)
+    async with engine.connect() as conn:
+        partitions = await list_partitions(conn, table)
+        detached = await _detached_partitions(conn, table, cutoff)
+    expired = [name for name, upper in partitions if upper is not None and upper <= cutoff]
+    archived = []
+    for name in detached + expired:
+        if name in expired and not await _run_ddl(
+            engine, f"ALTER TABLE {table} DETACH PARTITION {name}"
+        ):
+            continue
+        # A partition that was detached but not moved (the move failed last
+        # run) is picked up again by _detached_partitions next time.
+        if await _run_ddl(
+            engine,
+            f"CREATE SCHEMA IF NOT EXISTS {archive_schema}",
+            f"ALTER TABLE {name} SET SCHEMA {archive_schema}",
+        ):
+            archived.append(name)
+    return archived
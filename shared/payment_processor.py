@@ -1,11 +1,9 @@
 from typing import Any, Optional
 
-from aiogram import Bot
-from sqlalchemy import select
+from sqlalchemy import Row, func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from bot.content_flow import confirm_content_purchase
-from bot.session_flow import create_session_with_escrow
 from models import (
     ClientProfile,
     ContentPurchase,
@@ -13,15 +11,74 @@ from models import (
     EscrowAccount,
     Session,
     Transaction,
+    TransactionRef,
     User,
 )
-from shared.escrow import create_escrow
-from shared.notifications import send_escrow_log, send_admin_message
+from shared.auth_context import auth_contexts
+from shared.escrow import build_escrow
+from shared.bot_pool import get_bot
 from shared.config import settings
-from shared.notifications import send_user_message
+from shared.outbox import enqueue_admin_message, enqueue_escrow_log, enqueue_user_message
+from shared.telegram_dispatcher import Priority
 from shared.time_utils import utcnow
 
 
+async def _load_payment_context(
+    db: AsyncSession, transaction_ref: str, payload_escrow_type: Optional[str]
+) -> Optional[Row]:
+    # Everything process_transaction touches is fetched in one statement. Each
+    # join is gated on the escrow type so only the rows that type needs come
+    # back, and the transaction row is locked so concurrent deliveries of the
+    # same event serialise here. The ref is looked up in transaction_refs,
+    # where it is unique, and its created_at limits the scan of the
+    # partitioned transactions table to one month.
+    metadata = Transaction.metadata_json
+    escrow_type = func.coalesce(metadata["escrow_type"].astext, literal(payload_escrow_type))
+    client = aliased(User, name="client")
+    payer = aliased(User, name="payer")
+    model = aliased(User, name="model")
+    result = await db.execute(
+        select(Transaction, Session, client, ContentPurchase, DigitalContent, ClientProfile, payer, model)
+        .select_from(TransactionRef)
+        .join(
+            Transaction,
+            (Transaction.id == TransactionRef.transaction_id)
+            & (Transaction.created_at == TransactionRef.created_at),
+        )
+        .outerjoin(
+            Session,
+            (escrow_type == "session") & (Session.id == metadata["session_id"].as_integer()),
+        )
+        .outerjoin(client, client.id == Session.client_id)
+        .outerjoin(
+            ContentPurchase,
+            (escrow_type == "content") & (ContentPurchase.transaction_id == Transaction.id),
+        )
+        .outerjoin(DigitalContent, DigitalContent.id == ContentPurchase.content_id)
+        .outerjoin(
+            ClientProfile,
+            (escrow_type == "access_fee")
+            & (
+                ClientProfile.user_id
+                == func.coalesce(metadata["client_id"].as_integer(), Transaction.user_id)
+            ),
+        )
+        .outerjoin(
+            payer,
+            escrow_type.in_(("content", "access_fee")) & (payer.id == Transaction.user_id),
+        )
+        .outerjoin(
+            model,
+            (escrow_type == "extension") & (model.id == metadata["model_id"].as_integer()),
+        )
+        .where(TransactionRef.transaction_ref == transaction_ref)
+        .order_by(ClientProfile.id)
+        .limit(1)
+        .with_for_update(of=Transaction)
+    )
+    return result.first()
+
+
 async def process_transaction(
     db: AsyncSession,
     *,
@@ -29,136 +86,147 @@ async def process_transaction(
     provider: str,
     payload: dict[str, Any],
 ) -> Optional[EscrowAccount]:
-    result = await db.execute(
-        select(Transaction).where(Transaction.transaction_ref == transaction_ref)
-    )
-    transaction = result.scalar_one_or_none()
-    if not transaction:
+    payload_escrow_type = (payload.get("metadata") or {}).get("escrow_type")
+    row = await _load_payment_context(db, transaction_ref, payload_escrow_type)
+    if row is None:
         return None
+    transaction = row.Transaction
     if transaction.status == "completed":
         return None
 
     metadata = transaction.metadata_json or {}
-    escrow_type = metadata.get("escrow_type") or payload.get("metadata", {}).get("escrow_type")
+    escrow_type = metadata.get("escrow_type") or payload_escrow_type
     if not escrow_type:
         return None
 
+    # Nothing below talks to the database until the final commit, which
+    # flushes every change (escrow, status updates, outbox rows) together.
     transaction.status = "completed"
     transaction.payment_provider = provider
     transaction.completed_at = utcnow()
-    await db.flush()
+    amount = transaction.amount or 0
 
     escrow: Optional[EscrowAccount] = None
+    stale_telegram_id: Optional[int] = None
     if escrow_type == "session":
         session_id = metadata.get("session_id")
         model_id = metadata.get("model_id")
-        if not session_id or not model_id:
-            return None
-        session = await db.get(Session, session_id)
-        if not session:
+        session = row.Session
+        if not session_id or not model_id or not session:
             return None
-        escrow = await create_session_with_escrow(
-            db,
-            session=session,
-            transaction=transaction,
+        escrow = build_escrow(
+            escrow_type="session",
+            related_id=session.id,
             payer_id=transaction.user_id,
             receiver_id=model_id,
-            amount=transaction.amount or 0,
+            amount=amount,
+            transaction=transaction,
+            release_condition="both_confirmed",
+            auto_release_hours=24,
         )
+        session.escrow = escrow
         session.status = "paid"
-        client = await db.get(User, session.client_id)
-        if client:
-            await send_user_message(
-                client.telegram_id,
+        if row.client:
+            enqueue_user_message(
+                db,
+                row.client.telegram_id,
                 f"Payment received for session {session.session_ref}. Waiting for model to start.",
+                priority=Priority.PAYMENT,
             )
     elif escrow_type == "content":
-        result = await db.execute(
-            select(ContentPurchase).where(ContentPurchase.transaction_id == transaction.id)
-        )
-        purchase = result.scalar_one_or_none()
-        if not purchase:
-            return None
-        content = await db.get(DigitalContent, purchase.content_id)
-        if not content:
+        purchase = row.ContentPurchase
+        content = row.DigitalContent
+        if not purchase or not content:
             return None
-        escrow = await confirm_content_purchase(
-            db,
-            purchase=purchase,
-            transaction=transaction,
+        escrow = build_escrow(
+            escrow_type="content",
+            related_id=purchase.content_id,
             payer_id=transaction.user_id,
             receiver_id=content.model_id,
-            amount=transaction.amount or 0,
+            amount=amount,
+            transaction=transaction,
+            release_condition="content_delivered",
+            auto_release_hours=24,
         )
-        content.total_sales += 1
-        content.total_revenue += transaction.amount or 0
-        buyer = await db.get(User, transaction.user_id)
-        if buyer:
-            await send_user_message(
-                buyer.telegram_id,
+        purchase.escrow = escrow
+        purchase.status = "paid"
+        content.total_sales = DigitalContent.total_sales + 1
+        content.total_revenue = DigitalContent.total_revenue + amount
+        if row.payer:
+            enqueue_user_message(
+                db,
+                row.payer.telegram_id,
                 f"Payment received. Content #{content.id} awaiting admin approval for release.",
+                priority=Priority.PAYMENT,
             )
     elif escrow_type == "access_fee":
         client_id = metadata.get("client_id") or transaction.user_id
-        result = await db.execute(
-            select(ClientProfile).where(ClientProfile.user_id == client_id)
-        )
-        profile = result.scalar_one_or_none()
+        profile = row.ClientProfile
         if not profile:
+            # First payment from this client: the escrow references the
+            # profile id, so the new profile has to be inserted first.
             profile = ClientProfile(user_id=client_id)
             db.add(profile)
             await db.flush()
-        escrow = await create_escrow(
-            db,
+        escrow = build_escrow(
             escrow_type="access_fee",
             related_id=profile.id,
             payer_id=client_id,
             receiver_id=None,
-            amount=transaction.amount or 0,
+            amount=amount,
             transaction=transaction,
             release_condition="access_granted",
             auto_release_hours=None,
         )
         profile.access_fee_paid = False
-        profile.access_fee_escrow_id = escrow.id
-        client = await db.get(User, transaction.user_id)
-        if client:
-            await send_user_message(
-                client.telegram_id,
+        profile.access_fee_escrow = escrow
+        stale_telegram_id = row.payer.telegram_id if row.payer else None
+        if row.payer:
+            enqueue_user_message(
+                db,
+                row.payer.telegram_id,
                 "Access fee received. Awaiting admin approval to unlock gallery.",
+                priority=Priority.PAYMENT,
             )
     elif escrow_type == "extension":
         session_id = metadata.get("session_id")
         model_id = metadata.get("model_id")
         if not session_id or not model_id:
             return None
-        escrow = await create_escrow(
-            db,
+        escrow = build_escrow(
             escrow_type="extension",
             related_id=session_id,
             payer_id=transaction.user_id,
             receiver_id=model_id,
-            amount=transaction.amount or 0,
+            amount=amount,
             transaction=transaction,
             release_condition="session_complete",
             auto_release_hours=24,
         )
-        model = await db.get(User, model_id)
-        if model:
-            await send_user_message(
-                model.telegram_id,
+        if row.model:
+            enqueue_user_message(
+                db,
+                row.model.telegram_id,
                 f"Session extension paid for session {session_id}.",
+                priority=Priority.PAYMENT,
             )
 
-    await db.commit()
     if escrow:
-        await send_escrow_log(
-            f"Escrow created: {escrow.escrow_ref} ({escrow.escrow_type}) amount {escrow.amount}"
+        db.add(escrow)
+        enqueue_escrow_log(
+            db,
+            f"Escrow created: {escrow.escrow_ref} ({escrow.escrow_type}) amount {escrow.amount}",
         )
-        await send_admin_message(
+        enqueue_admin_message(
+            db,
             f"Escrow approval needed:\n{escrow.escrow_ref}\nType: {escrow.escrow_type}\nAmount: {escrow.amount}",
             reply_markup=_admin_console_keyboard(),
+            priority=Priority.PAYMENT,
         )
+    # Notifications are written to the outbox in this same transaction and
+    # sent by the worker, so the webhook only waits for the commit.
+    await db.commit()
+    await auth_contexts.invalidate(stale_telegram_id)
     return escrow
 
 
@@ -178,7 +246,7 @@ def _admin_console_keyboard():
 async def _deliver_content_to_buyer(buyer: User, content: DigitalContent) -> bool:
     if not settings.user_bot_token or not content.telegram_file_id:
         return False
-    bot = Bot(token=settings.user_bot_token)
+    bot = get_bot(settings.user_bot_token)
     try:
         caption = f"{content.title}\n{content.description}"
         if content.content_type == "photo":
@@ -188,5 +256,3 @@ async def _deliver_content_to_buyer(buyer: User, content: DigitalContent) -> boo
         return True
     except Exception:
         return False
-    finally:
-        await bot.session.close()
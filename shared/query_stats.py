@@ -0,0 +1,141 @@
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from shared.config import settings
+from shared.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+handler_queries = registry.histogram(
+    "db_handler_queries",
+    "SQL statements issued per bot handler or API route.",
+    ["handler"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+handler_db_seconds = registry.histogram(
+    "db_handler_seconds", "Time spent executing SQL per bot handler or API route.", ["handler"]
+)
+slow_queries = registry.counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ["handler"]
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryStats:
+    label: str
+    statements: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+
+    def add(self, other: "QueryStats") -> None:
+        self.statements += other.statements
+        self.seconds += other.seconds
+        self.rows += other.rows
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+        stats.rows += max(cursor.rowcount, 0)
+    if elapsed * 1000 >= settings.slow_query_ms:
+        label = stats.label if stats else "-"
+        slow_queries.inc(handler=label)
+        logger.warning(
+            "Slow query in %s (%.1f ms): %s", label, elapsed * 1000, " ".join(statement.split())[:500]
+        )
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute does not run for a failed statement; drop its
+    # start time so the next statement on this connection is timed right.
+    if context.connection is not None and context.execution_context is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+@contextmanager
+def track(label: str, *, observe: bool = True) -> Iterator[QueryStats]:
+    stats = QueryStats(label)
+    parent = _current.get()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        # Nested blocks also count towards the enclosing handler.
+        if parent is not None:
+            parent.add(stats)
+        if observe:
+            handler_queries.observe(stats.statements, handler=stats.label)
+            handler_db_seconds.observe(stats.seconds, handler=stats.label)
+
+
+def check_budget(stats: QueryStats, max_queries: int, strict: Optional[bool] = None) -> None:
+    if stats.statements <= max_queries:
+        return
+    message = (
+        f"{stats.label} issued {stats.statements} queries "
+        f"(budget {max_queries}, {stats.rows} rows, {stats.seconds * 1000:.1f} ms)"
+    )
+    if settings.query_budget_strict if strict is None else strict:
+        raise QueryBudgetExceeded(message)
+    logger.warning("Query budget exceeded: %s", message)
+
+
+def query_budget(max_queries: int):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # QueryStatsMiddleware already reports a registered handler under
+            # this label; only the budget is checked here then.
+            enclosing = _current.get()
+            observe = enclosing is None or enclosing.label != func.__qualname__
+            with track(func.__qualname__, observe=observe) as stats:
+                result = await func(*args, **kwargs)
+            check_budget(stats, max_queries)
+            return result
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, label: str = "block") -> Iterator[QueryStats]:
+    with track(label) as stats:
+        yield stats
+    check_budget(stats, max_queries, strict=True)
@@ -0,0 +1,30 @@
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS: Optional[Redis] = None
+
+
+def get_redis() -> Optional[Redis]:
+    global _REDIS
+    if not settings.redis_url:
+        return None
+    if _REDIS is None:
+        _REDIS = Redis.from_url(
+            settings.redis_url,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+        )
+    return _REDIS
+
+
+async def close_redis() -> None:
+    global _REDIS
+    if _REDIS is not None:
+        client, _REDIS = _REDIS, None
+        await client.aclose()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, exists, func, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import EscrowAccount, ModelProfile, PlatformStats, PlatformStatsDelta, Transaction, User
+from shared.time_utils import utcnow
+
+STATS_ROW_ID = 1
+STAT_FIELDS = (
+    "total_users",
+    "total_models",
+    "pending_models",
+    "held_escrows",
+    "disputed_escrows",
+    "total_volume",
+)
+
+
+def platform_stats_query():
+    """Every counter in one statement: one FILTERed aggregate per table."""
+    users = select(
+        func.count().label("total_users"),
+        func.count().filter(User.role == "model").label("total_models"),
+    ).subquery()
+    models = (
+        select(func.count().label("pending_models"))
+        .where(ModelProfile.verification_status == "submitted")
+        .subquery()
+    )
+    escrows = (
+        select(
+            func.count().filter(EscrowAccount.status == "held").label("held_escrows"),
+            func.count().filter(EscrowAccount.status == "disputed").label("disputed_escrows"),
+        )
+        .where(EscrowAccount.status.in_(("held", "disputed")))
+        .subquery()
+    )
+    volume = select(
+        func.coalesce(func.sum(Transaction.amount), 0).label("total_volume")
+    ).subquery()
+    return select(users, models, escrows, volume).select_from(
+        users.join(models, true()).join(escrows, true()).join(volume, true())
+    )
+
+
+async def compute_platform_stats(db: AsyncSession) -> Dict[str, Any]:
+    return dict((await db.execute(platform_stats_query())).one()._mapping)
+
+
+async def refresh_platform_stats(db: AsyncSession) -> PlatformStats:
+    """Recount everything into the cached row; only needed to seed it."""
+    # One snapshot for the counts and the deltas they already include: a
+    # delta committed after it is neither counted nor deleted, so the next
+    # fold adds it.
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    values = await compute_platform_stats(db)
+    values["refreshed_at"] = utcnow()
+    await db.execute(delete(PlatformStatsDelta))
+    upsert = pg_insert(PlatformStats).values(id=STATS_ROW_ID, **values)
+    await db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[PlatformStats.id],
+            set_={name: upsert.excluded[name] for name in values},
+        )
+    )
+    await db.commit()
+    # Detached, so callers can read it after the session expired its state.
+    return PlatformStats(id=STATS_ROW_ID, **values)
+
+
+def _total(column):
+    return select(func.coalesce(func.sum(column), 0)).scalar_subquery()
+
+
+async def fold_platform_stats(db: AsyncSession, batch_size: int) -> Optional[int]:
+    """Add up to batch_size pending deltas to the cached row and commit.
+
+    Returns how many were folded, or None while the row is not seeded yet
+    (the deltas are then kept for after the seed).
+    """
+    claim = (
+        select(PlatformStatsDelta.id)
+        .order_by(PlatformStatsDelta.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    seeded = exists().where(PlatformStats.id == STATS_ROW_ID)
+    folded = (
+        delete(PlatformStatsDelta)
+        .where(PlatformStatsDelta.id.in_(claim.scalar_subquery()), seeded)
+        .returning(*(getattr(PlatformStatsDelta, name) for name in STAT_FIELDS))
+        .cte("folded")
+    )
+    # The CTE runs once however often it is referenced.
+    count = await db.scalar(
+        update(PlatformStats)
+        .where(PlatformStats.id == STATS_ROW_ID)
+        .values(
+            {name: getattr(PlatformStats, name) + _total(folded.c[name]) for name in STAT_FIELDS}
+            | {"refreshed_at": utcnow()}
+        )
+        .returning(select(func.count()).select_from(folded).scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return count
+
+
+async def cached_platform_stats(db: AsyncSession) -> Optional[PlatformStats]:
+    return await db.get(PlatformStats, STATS_ROW_ID)
+
+
+def stats_age_seconds(stats: PlatformStats, now: Optional[datetime] = None) -> float:
+    return max(0.0, ((now or utcnow()) - stats.refreshed_at).total_seconds())
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m"
+    return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m"
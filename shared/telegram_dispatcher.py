@@ -0,0 +1,342 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Iterator, NamedTuple, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+ChatId = Union[int, str, None]
+
+
+class Priority(IntEnum):
+    # Lower values are sent first.
+    PAYMENT = 0
+    DEFAULT = 10
+    BULK = 20
+
+
+_PRIORITY: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.DEFAULT)
+
+
+@contextmanager
+def outbound_priority(priority: Priority) -> Iterator[None]:
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class DispatcherClosed(RuntimeError):
+    pass
+
+
+class _Request(NamedTuple):
+    # Ordered by (priority, seq); seq is unique, so later fields never compare.
+    priority: int
+    seq: int
+    chat_id: ChatId
+    call: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    attempt: int = 0
+    # Let out of its chat's parking by the release timer.
+    released: bool = False
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        return self.wait_time(now) == 0.0 and self.tokens >= self.capacity
+
+
+class OutboundDispatcher:
+    MAX_CHAT_BUCKETS = 10_000
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        global_rate: float,
+        chat_rate: float,
+        group_rate: float,
+        max_retries: int,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: list[asyncio.Task] = []
+        # Requests whose chat bucket is not ready wait here, in order, instead
+        # of in a worker; one timer per chat lets the next one back out.
+        self._parked: Dict[Union[int, str], list[_Request]] = {}
+        self._timers: Dict[Union[int, str], asyncio.TimerHandle] = {}
+        self._stats = {"sent": 0, "failed": 0, "retried": 0}
+
+    def _ensure_workers(self) -> asyncio.PriorityQueue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._queue is None:
+            if self._loop is not None:
+                self._abandon(self._loop)
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self._queue
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        *,
+        chat_id: ChatId = None,
+        priority: Optional[Priority] = None,
+    ) -> Any:
+        queue = self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        if priority is None:
+            priority = _PRIORITY.get()
+        await queue.put(_Request(int(priority), next(self._seq), chat_id, call, future))
+        return await future
+
+    async def close(self) -> None:
+        if self._loop is not None and self._loop is not asyncio.get_running_loop():
+            self._abandon(self._loop)
+        else:
+            pending = self._drain_queue()
+            workers, self._workers = self._workers, []
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            for task in workers:
+                task.cancel()
+            if workers:
+                await asyncio.gather(*workers, return_exceptions=True)
+            for future in pending:
+                if not future.done():
+                    future.set_exception(DispatcherClosed("Dispatcher closed before the request was sent"))
+        self._queue = None
+        self._loop = None
+
+    def _drain_queue(self) -> list[asyncio.Future]:
+        futures = []
+        while self._queue is not None and not self._queue.empty():
+            futures.append(self._queue.get_nowait().future)
+        for requests in self._parked.values():
+            futures.extend(request.future for request in requests)
+        self._parked.clear()
+        return futures
+
+    def _abandon(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Workers and waiters of another event loop can only be touched from
+        # that loop; once it is closed they are gone with it.
+        pending = self._drain_queue()
+        workers, self._workers = self._workers, []
+        timers, self._timers = list(self._timers.values()), {}
+        if loop.is_closed():
+            return
+        for task in workers:
+            loop.call_soon_threadsafe(task.cancel)
+        for timer in timers:
+            loop.call_soon_threadsafe(timer.cancel)
+        for future in pending:
+            loop.call_soon_threadsafe(future.cancel)
+
+    def stats(self) -> Dict[str, int]:
+        depth = self._queue.qsize() if self._queue is not None else 0
+        parked = sum(len(requests) for requests in self._parked.values())
+        return dict(self._stats, queued=depth, parked=parked, chat_buckets=len(self._chats))
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            request = await queue.get()
+            try:
+                if request.future.done():
+                    # Caller gave up (cancelled) while the request was queued.
+                    self._rearm(request.chat_id)
+                    continue
+                if not self._take_chat_token(request):
+                    continue
+                await self._send(request)
+            finally:
+                queue.task_done()
+
+    def _take_chat_token(self, request: _Request) -> bool:
+        """Take the request's chat token, or park the request and return False."""
+        chat_id = request.chat_id
+        if chat_id is None:
+            return True
+        bucket = self._chat_bucket(chat_id)
+        wait = bucket.wait_time(time.monotonic())
+        # Requests for a chat with others parked queue up behind them.
+        if wait > 0 or (chat_id in self._parked and not request.released):
+            self._park(request, wait)
+            return False
+        bucket.take()
+        self._rearm(chat_id)
+        return True
+
+    def _park(self, request: _Request, wait: float) -> None:
+        heapq.heappush(self._parked.setdefault(request.chat_id, []), request._replace(released=False))
+        if request.chat_id not in self._timers:
+            self._arm(request.chat_id, wait)
+
+    def _arm(self, chat_id: Union[int, str], wait: float) -> None:
+        assert self._loop is not None
+        self._timers[chat_id] = self._loop.call_later(wait, self._release, chat_id)
+
+    def _rearm(self, chat_id: ChatId) -> None:
+        # The next parked request is let out once the chat bucket refills.
+        if chat_id in self._parked and chat_id not in self._timers:
+            self._arm(chat_id, self._chat_bucket(chat_id).wait_time(time.monotonic()))
+
+    def _release(self, chat_id: Union[int, str]) -> None:
+        self._timers.pop(chat_id, None)
+        parked = self._parked.get(chat_id)
+        if not parked or self._queue is None:
+            return
+        request = heapq.heappop(parked)
+        if not parked:
+            del self._parked[chat_id]
+        self._queue.put_nowait(request._replace(released=True))
+
+    async def _send(self, request: _Request) -> None:
+        future = request.future
+        # Only the global bucket holds a worker; it is shared by every chat.
+        await self._acquire_global()
+        try:
+            result = await request.call()
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(DispatcherClosed("Dispatcher closed while sending"))
+            raise
+        except TelegramRetryAfter as exc:
+            attempt = request.attempt + 1
+            now = time.monotonic()
+            if request.chat_id is None:
+                self._global.block(now, exc.retry_after)
+            else:
+                self._chat_bucket(request.chat_id).block(now, exc.retry_after)
+            if attempt > self.max_retries:
+                self._fail(future, exc)
+                return
+            self._stats["retried"] += 1
+            logger.warning(
+                "Telegram flood control for chat %s; retrying in %ss (attempt %s/%s)",
+                request.chat_id,
+                exc.retry_after,
+                attempt,
+                self.max_retries,
+            )
+            retry = request._replace(attempt=attempt, released=False)
+            if request.chat_id is None:
+                self._queue.put_nowait(retry)
+            else:
+                # Waits out retry_after parked, not in this worker.
+                self._park(retry, exc.retry_after)
+        except Exception as exc:
+            self._fail(future, exc)
+        else:
+            self._stats["sent"] += 1
+            if not future.done():
+                future.set_result(result)
+
+    def _fail(self, future: asyncio.Future, exc: BaseException) -> None:
+        self._stats["failed"] += 1
+        if not future.done():
+            future.set_exception(exc)
+
+    async def _acquire_global(self) -> None:
+        while True:
+            wait = self._global.wait_time(time.monotonic())
+            if wait <= 0:
+                self._global.take()
+                return
+            await asyncio.sleep(wait)
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.MAX_CHAT_BUCKETS:
+                self._prune_buckets()
+            # Negative ids and @usernames are groups/channels, which Telegram
+            # limits far more tightly than private chats.
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, 1.0)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, bucket in self._chats.items() if bucket.is_idle(now)]:
+            del self._chats[key]
+
+
+class DispatcherRequestMiddleware(BaseRequestMiddleware):
+    def __init__(self, dispatcher: OutboundDispatcher) -> None:
+        self.dispatcher = dispatcher
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Any:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            # getFile, setWebhook, answerCallbackQuery etc. are not subject
+            # to the per-chat send limits.
+            return await make_request(bot, method)
+        return await self.dispatcher.submit(
+            lambda: make_request(bot, method),
+            chat_id=chat_id,
+        )
+
+
+outbound = OutboundDispatcher(
+    concurrency=settings.telegram_send_concurrency,
+    global_rate=settings.telegram_global_rate,
+    chat_rate=settings.telegram_chat_rate,
+    group_rate=settings.telegram_group_rate,
+    max_retries=settings.telegram_max_retries,
+)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import User, WalletLedgerEntry
+from shared.time_utils import utcnow
+
+# Balances are users.wallet_balance plus the ledger entries the worker has not
+# compacted into it yet, as computed by the wallet_available() SQL function
+# (models.py) that the miniapp reads and debits through too. Credits only
+# insert ledger rows; debits lock the users row and lower wallet_balance
+# directly, so a balance check anywhere sees them at once. The miniapp still
+# adjusts users.wallet_balance, so compaction adds deltas rather than
+# overwriting it.
+
+
+class LedgerEntry(NamedTuple):
+    user_id: int
+    amount: float
+    entry_type: str
+    escrow_id: Optional[int] = None
+
+
+async def record_entries(db: AsyncSession, entries: Iterable[LedgerEntry]) -> None:
+    rows = [entry._asdict() for entry in entries]
+    if rows:
+        # Inserts only: credits to a busy user never wait on its users row.
+        await db.execute(insert(WalletLedgerEntry), rows)
+
+
+async def credit_wallet(
+    db: AsyncSession,
+    user_id: int,
+    amount: float,
+    *,
+    entry_type: str,
+    escrow_id: Optional[int] = None,
+) -> None:
+    await record_entries(db, [LedgerEntry(user_id, amount, entry_type, escrow_id)])
+
+
+async def wallet_balance(db: AsyncSession, user_id: int) -> Optional[float]:
+    return await db.scalar(select(func.wallet_available(user_id)))
+
+
+async def debit_wallet(
+    db: AsyncSession,
+    user_id: int,
+    amount: float,
+    *,
+    entry_type: str = "debit",
+    escrow_id: Optional[int] = None,
+) -> Optional[float]:
+    # Debits must see every credit, so they serialize on the users row. The
+    # balance is read after the lock is granted, otherwise a compaction that
+    # committed while we waited would be counted twice.
+    locked = await db.scalar(select(User.id).where(User.id == user_id).with_for_update())
+    if locked is None:
+        return None
+    balance = await wallet_balance(db, user_id)
+    if balance < amount:
+        return None
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(wallet_balance=func.coalesce(User.wallet_balance, 0) - amount)
+    )
+    # Kept in the ledger for history only; the stored balance already has it.
+    await db.execute(
+        insert(WalletLedgerEntry).values(
+            user_id=user_id,
+            amount=-amount,
+            entry_type=entry_type,
+            escrow_id=escrow_id,
+            compacted_at=utcnow(),
+        )
+    )
+    return balance - amount
+
+
+async def compact_wallets(db: AsyncSession, batch_size: int) -> int:
+    """Fold up to batch_size ledger entries into users.wallet_balance and commit."""
+    claim = (
+        select(WalletLedgerEntry.id)
+        .where(WalletLedgerEntry.compacted_at.is_(None))
+        .order_by(WalletLedgerEntry.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    # Marking entries instead of tracking a high-water id means an entry whose
+    # transaction commits late is still picked up by a later run.
+    marked = (
+        await db.execute(
+            update(WalletLedgerEntry)
+            .where(WalletLedgerEntry.id.in_(claim.scalar_subquery()))
+            .values(compacted_at=utcnow())
+            .returning(WalletLedgerEntry.id, WalletLedgerEntry.user_id, WalletLedgerEntry.amount)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    if not marked:
+        await db.commit()
+        return 0
+
+    deltas: dict[int, float] = defaultdict(float)
+    for _, user_id, amount in marked:
+        deltas[user_id] += amount
+    user_ids = sorted(deltas)
+
+    # Lock in id order so concurrent compactions cannot deadlock.
+    await db.execute(select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update())
+    conn = await db.connection()
+    await conn.execute(
+        update(User)
+        .where(User.id == bindparam("user_id"))
+        .values(wallet_balance=func.coalesce(User.wallet_balance, 0) + bindparam("delta")),
+        [{"user_id": user_id, "delta": deltas[user_id]} for user_id in user_ids],
+    )
+    await db.commit()
+    return len(marked)
@@ -0,0 +1,95 @@
+import asyncio
+import gzip
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from shared.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Headers worth keeping for a replay; everything else is proxy noise.
+CAPTURED_HEADERS = ("content-type", "user-agent", "x-paystack-signature", "verif-hash")
+
+
+class WebhookCaptureLog:
+    def __init__(self, directory: str, segment_bytes: int, max_segments: int) -> None:
+        self.directory = Path(directory)
+        self.segment_bytes = max(1024, segment_bytes)
+        self.max_segments = max(1, max_segments)
+        self._segment: Optional[Path] = None
+        self._written = 0
+        self._sequence = 0
+        self._lock = asyncio.Lock()
+
+    async def append(self, provider: str, headers: Dict[str, str], body: bytes) -> None:
+        record = {
+            "provider": provider,
+            "received_at": time.time(),
+            "headers": {
+                key: value for key, value in headers.items() if key.lower() in CAPTURED_HEADERS
+            },
+            "body": body.decode("utf-8", errors="replace"),
+        }
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write, line)
+            except OSError as exc:
+                logger.warning("Failed to capture %s webhook: %s", provider, exc)
+
+    def _write(self, line: bytes) -> None:
+        if self._segment is None or self._written + len(line) > self.segment_bytes:
+            self._rotate()
+        # Each append is its own gzip member, so a segment cut short by a
+        # crash is still readable up to the last complete line.
+        with gzip.open(self._segment, "ab") as handle:
+            handle.write(line)
+        self._written += len(line)
+
+    def _rotate(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        self._segment = self.directory / f"webhooks-{stamp}-{self._sequence:04d}.jsonl.gz"
+        self._written = 0
+        segments = sorted(self.directory.glob("webhooks-*.jsonl.gz"))
+        for old in segments[: max(0, len(segments) - self.max_segments + 1)]:
+            old.unlink(missing_ok=True)
+
+
+def iter_captured_events(paths: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    files: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        files.extend(sorted(path.glob("webhooks-*.jsonl.gz")) if path.is_dir() else [path])
+    for path in files:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile) as exc:
+            logger.warning("Stopped reading truncated capture segment %s: %s", path, exc)
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+webhook_capture: Optional[WebhookCaptureLog] = (
+    WebhookCaptureLog(
+        settings.webhook_capture_dir,
+        settings.webhook_capture_segment_bytes,
+        settings.webhook_capture_max_segments,
+    )
+    if settings.webhook_capture_dir
+    else None
+)
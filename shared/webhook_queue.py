@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import WebhookEvent
+from shared.config import settings
+from shared.db import AsyncSessionLocal
+from shared.payment_processor import process_transaction
+from shared.time_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_webhook_event(
+    db: AsyncSession,
+    *,
+    provider: str,
+    transaction_ref: str,
+    payload: dict[str, Any],
+) -> WebhookEvent:
+    event = WebhookEvent(provider=provider, transaction_ref=transaction_ref, payload=payload)
+    db.add(event)
+    await db.commit()
+    return event
+
+
+async def claim_webhook_event(db: AsyncSession) -> Optional[WebhookEvent]:
+    now = utcnow()
+    # A 'processing' row whose lease expired belongs to a consumer that died
+    # mid-event, so it is handed out again.
+    claimable = (
+        select(WebhookEvent.id)
+        .where(
+            ((WebhookEvent.status == "pending") & (WebhookEvent.available_at <= now))
+            | ((WebhookEvent.status == "processing") & (WebhookEvent.locked_until < now))
+        )
+        .order_by(WebhookEvent.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id == claimable)
+        .values(
+            status="processing",
+            attempts=WebhookEvent.attempts + 1,
+            locked_until=now + timedelta(seconds=settings.webhook_event_lease_seconds),
+        )
+        .returning(WebhookEvent)
+    )
+    event = result.scalar_one_or_none()
+    await db.commit()
+    return event
+
+
+async def _finish_event(event_id: int, *, error: Optional[BaseException], attempts: int) -> None:
+    now = utcnow()
+    values: Dict[str, Any] = {"locked_until": None}
+    if error is None:
+        values.update(status="done", processed_at=now, last_error=None)
+    else:
+        values["last_error"] = f"{type(error).__name__}: {error}"
+        if attempts >= settings.webhook_event_max_attempts:
+            values["status"] = "failed"
+        else:
+            values.update(
+                status="pending",
+                available_at=now + timedelta(seconds=min(600, 2 ** attempts)),
+            )
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(WebhookEvent).where(WebhookEvent.id == event_id).values(**values))
+        await db.commit()
+
+
+class WebhookConsumerPool:
+    def __init__(self, concurrency: int, poll_seconds: float) -> None:
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self._tasks: list[asyncio.Task] = []
+        self._stats: Dict[str, float] = {
+            "processed": 0,
+            "failed": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+        }
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_once(self) -> bool:
+        async with AsyncSessionLocal() as db:
+            event = await claim_webhook_event(db)
+        if event is None:
+            return False
+
+        error: Optional[BaseException] = None
+        try:
+            async with AsyncSessionLocal() as db:
+                await process_transaction(
+                    db,
+                    transaction_ref=event.transaction_ref,
+                    provider=event.provider,
+                    payload=event.payload or {},
+                )
+        except Exception as exc:
+            error = exc
+            self._stats["failed"] += 1
+            logger.warning("Webhook event %s failed: %s", event.id, exc)
+        else:
+            lag = (utcnow() - event.received_at).total_seconds()
+            self._stats["processed"] += 1
+            self._stats["last_lag_seconds"] = lag
+            self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+        await _finish_event(event.id, error=error, attempts=event.attempts)
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                handled = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Webhook consumer error: %s", exc)
+                handled = False
+            if not handled:
+                await asyncio.sleep(self.poll_seconds)
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._stats, consumers=len(self._tasks))
+
+
+async def webhook_queue_depth(db: AsyncSession) -> Dict[str, Any]:
+    result = await db.execute(
+        select(func.count(), func.min(WebhookEvent.received_at)).where(
+            WebhookEvent.status.in_(("pending", "processing"))
+        )
+    )
+    depth, oldest = result.one()
+    oldest_age = (utcnow() - oldest).total_seconds() if oldest else 0.0
+    return {"depth": depth, "oldest_age_seconds": oldest_age}
+
+
+consumer_pool = WebhookConsumerPool(
+    settings.webhook_consumer_concurrency,
+    settings.webhook_consumer_poll_seconds,
+)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import secrets
+import unittest
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Tuple, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from models import Base
+from shared.query_stats import instrument
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+requires_database = unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL not set")
+
+T = TypeVar("T")
+
+
+def make_engine(**kwargs: Any) -> AsyncEngine:
+    # Every test drives its own event loop, so connections are never pooled.
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool, **kwargs)
+    instrument(engine.sync_engine)
+    return engine
+
+
+async def create_tables(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def run_with_engine(scenario: Callable[[AsyncEngine], Awaitable[T]]) -> T:
+    """Run `scenario(engine)` in a fresh event loop against the full schema."""
+
+    async def wrapper() -> T:
+        engine = make_engine()
+        try:
+            await create_tables(engine)
+            return await scenario(engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(wrapper())
+
+
+@asynccontextmanager
+async def scratch_schema(prefix: str) -> AsyncIterator[Tuple[AsyncEngine, str]]:
+    """An empty schema (plus any `<schema>_*` it creates), dropped afterwards."""
+    schema = f"{prefix}_{secrets.token_hex(4)}"
+    admin = make_engine()
+    engine = make_engine(connect_args={"server_settings": {"search_path": schema}})
+    async with admin.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    try:
+        yield engine, schema
+    finally:
+        async with admin.begin() as conn:
+            names = await conn.execute(
+                text("SELECT nspname FROM pg_namespace WHERE nspname = :schema OR nspname LIKE :prefix"),
+                {"schema": schema, "prefix": f"{schema}\\_%"},
+            )
+            for (name,) in names.all():
+                await conn.execute(text(f"DROP SCHEMA {name} CASCADE"))
+        await engine.dispose()
+        await admin.dispose()
+
+
+def telegram_id_block(size: int = 1000) -> int:
+    """First of `size` consecutive telegram ids no other test run is likely to use."""
+    return 7_000_000_000 + secrets.randbelow(2_000_000_000 // size) * size
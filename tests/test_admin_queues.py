@@ -0,0 +1,195 @@
+import secrets
+import unittest
+
+from aiogram.types import InlineKeyboardButton
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import requires_database, run_with_engine, telegram_id_block
+from models import DigitalContent, EscrowAccount, ModelProfile, User
+from shared.admin_queues import (
+    MAX_LINE_CHARS,
+    PAGE_SIZE,
+    Page,
+    QueueCursor,
+    escrows_query,
+    fetch_page,
+    parse_queue_callback,
+    pending_content_query,
+    pending_models_query,
+    queue_callback,
+    render_page,
+)
+from shared.escrow import get_escrow_with_parties
+from shared.query_stats import assert_query_budget
+
+
+def page_ids(page) -> list:
+    return [item.id for item in page.items]
+
+
+class QueueCallbackTests(unittest.TestCase):
+    def test_round_trip(self):
+        for kwargs in ({}, {"after": 41}, {"before": 7}):
+            data = queue_callback("disputes", **kwargs)
+            self.assertLessEqual(len(data.encode()), 64)
+            self.assertEqual(parse_queue_callback(data), QueueCursor("disputes", **kwargs))
+
+    def test_rejects_other_callbacks(self):
+        for data in ("admin:approve_model:12", "admin:disputes:a:x", "user:disputes", ""):
+            self.assertIsNone(parse_queue_callback(data))
+
+
+class RenderPageTests(unittest.TestCase):
+    def test_unbounded_user_text_still_fits_one_message(self):
+        title = "Title\nwith lines " + "x" * 5000
+        rows = [
+            (f"{title} · by {'n' * 500} · 0x{'f' * 3000}", [])
+            for _ in range(PAGE_SIZE)
+        ]
+        page = Page(list(range(PAGE_SIZE)), next_after=40, prev_before=21)
+        text, _ = render_page("pending_content", page, "Pending content approvals:", "None.", rows)
+        lines = text.split("\n")
+        self.assertLessEqual(len(text), 4096)
+        self.assertEqual(len(lines), PAGE_SIZE + 2)
+        self.assertTrue(all(len(line) <= MAX_LINE_CHARS + 4 for line in lines))
+        self.assertTrue(lines[-1].endswith("…"))
+
+    def test_full_page_is_one_message(self):
+        rows = [
+            (
+                f"esc_{number:012d} · content · 125000.0",
+                [
+                    InlineKeyboardButton(text=f"{number} {action}", callback_data=f"admin:{action}:{number}")
+                    for action in ("Review", "Approve", "Reject")
+                ],
+            )
+            for number in range(1, PAGE_SIZE + 1)
+        ]
+        page = Page(list(range(PAGE_SIZE)), next_after=40, prev_before=21)
+        text, markup = render_page("pending_content", page, "Pending content approvals:", "None.", rows)
+        self.assertTrue(text.startswith("Pending content approvals:"))
+        self.assertIn(f"{PAGE_SIZE}. esc_", text)
+        self.assertLessEqual(len(text), 4096)
+        self.assertEqual(len(markup.inline_keyboard), PAGE_SIZE + 1)
+        self.assertLessEqual(sum(len(row) for row in markup.inline_keyboard), 100)
+        self.assertEqual(
+            [button.callback_data for button in markup.inline_keyboard[-1]],
+            [queue_callback("pending_content", before=21), queue_callback("pending_content", after=40)],
+        )
+
+    def test_empty_page(self):
+        self.assertEqual(
+            render_page("disputes", Page([]), "Disputes:", "No active disputes.", []),
+            ("No active disputes.", None),
+        )
+
+
+@requires_database
+class KeysetPaginationTests(unittest.TestCase):
+    def test_pages_forward_and_back(self):
+        status = f"queue_{secrets.token_hex(4)}"
+
+        async def scenario(engine):
+            async with AsyncSession(engine) as db:
+                payer = User(telegram_id=telegram_id_block(), role="client")
+                db.add(payer)
+                await db.flush()
+                escrows = [
+                    EscrowAccount(
+                        escrow_ref=f"{status}_{index}",
+                        escrow_type="session",
+                        payer_id=payer.id,
+                        amount=1,
+                        platform_fee=0,
+                        status=status,
+                    )
+                    for index in range(5)
+                ]
+                db.add_all(escrows)
+                await db.flush()
+                ids = [escrow.id for escrow in escrows]
+                await db.commit()
+
+                query = escrows_query(status)
+                first = await fetch_page(db, query, EscrowAccount.id, limit=2)
+                second = await fetch_page(db, query, EscrowAccount.id, after=first.next_after, limit=2)
+                last = await fetch_page(db, query, EscrowAccount.id, after=second.next_after, limit=2)
+                back = await fetch_page(db, query, EscrowAccount.id, before=second.prev_before, limit=2)
+            return ids, first, second, last, back
+
+        ids, first, second, last, back = run_with_engine(scenario)
+        self.assertEqual(page_ids(first), ids[:2])
+        self.assertIsNone(first.prev_before)
+        self.assertEqual(page_ids(second), ids[2:4])
+        self.assertEqual((second.prev_before, second.next_after), (ids[2], ids[3]))
+        self.assertEqual(page_ids(last), ids[4:])
+        self.assertIsNone(last.next_after)
+        self.assertEqual(page_ids(back), ids[:2])
+        self.assertIsNone(back.prev_before)
+        self.assertEqual(back.next_after, ids[1])
+
+
+@requires_database
+class ListingQueryCountTests(unittest.TestCase):
+    rows = 15
+
+    def test_listings_load_their_users_in_one_statement(self):
+        escrow_ref = f"parties_{secrets.token_hex(6)}"
+
+        async def scenario(engine):
+            counts = {}
+            async with AsyncSession(engine) as db:
+                base_tg = telegram_id_block()
+                users = [User(telegram_id=base_tg + index, role="model") for index in range(self.rows)]
+                db.add_all(users)
+                await db.flush()
+                for user in users:
+                    db.add(ModelProfile(user_id=user.id, verification_status="submitted"))
+                    db.add(DigitalContent(model_id=user.id, title="t", price=1, is_active=False))
+                db.add(
+                    EscrowAccount(
+                        escrow_ref=escrow_ref,
+                        escrow_type="session",
+                        payer_id=users[0].id,
+                        receiver_id=users[1].id,
+                        amount=1,
+                        platform_fee=0,
+                    )
+                )
+                expected_parties = (users[0].telegram_id, users[1].telegram_id)
+                await db.commit()
+
+            for limit in (3, self.rows):
+                async with AsyncSession(engine) as db:
+                    with assert_query_budget(1, "pending_models") as stats:
+                        page = await fetch_page(db, pending_models_query(), ModelProfile.id, limit=limit)
+                        [item.user.telegram_id for item in page.items]
+                    counts[("models", len(page.items))] = stats.statements
+                async with AsyncSession(engine) as db:
+                    with assert_query_budget(1, "pending_content") as stats:
+                        page = await fetch_page(db, pending_content_query(), DigitalContent.id, limit=limit)
+                        [content.model.telegram_id for content in page.items]
+                    counts[("content", len(page.items))] = stats.statements
+            async with AsyncSession(engine) as db:
+                with assert_query_budget(1, "escrow_parties") as stats:
+                    escrow = await get_escrow_with_parties(db, escrow_ref)
+                    parties = (escrow.payer.telegram_id, escrow.receiver.telegram_id)
+                counts[("escrow", 1)] = stats.statements
+            return counts, parties, expected_parties
+
+        counts, parties, expected_parties = run_with_engine(scenario)
+        self.assertEqual(
+            counts,
+            {
+                ("models", 3): 1,
+                ("models", self.rows): 1,
+                ("content", 3): 1,
+                ("content", self.rows): 1,
+                ("escrow", 1): 1,
+            },
+        )
+        self.assertEqual(parties, expected_parties)
+
+
+if __name__ == "__main__":
+    unittest.main()
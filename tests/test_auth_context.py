@@ -0,0 +1,92 @@
+import unittest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import requires_database, run_with_engine, telegram_id_block
+from models import ClientProfile, ModelProfile, User
+from shared.auth_context import AuthContext, AuthContextCache, load_auth_context
+from shared.config import settings
+from shared.query_stats import assert_query_budget
+
+
+def _context(telegram_id: int, role: str = "client", **fields) -> AuthContext:
+    return AuthContext(
+        id=telegram_id, telegram_id=telegram_id, public_id=None, role=role, status="active", **fields
+    )
+
+
+@unittest.skipIf(settings.redis_url, "exercises the in-process cache only")
+class AuthContextCacheTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AuthContextCache(ttl_seconds=60, local_ttl_seconds=10, max_entries=100)
+
+    async def test_hit_until_invalidated(self):
+        await self.cache.set(_context(1, access_fee_paid=True))
+        self.assertTrue((await self.cache.get(1)).access_fee_paid)
+        await self.cache.invalidate(1)
+        self.assertIsNone(await self.cache.get(1))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "redis_errors": 0, "local_entries": 0})
+
+    async def test_unassigned_users_are_not_cached(self):
+        await self.cache.set(_context(2, role="unassigned", verification_status="submitted"))
+        self.assertIsNone(await self.cache.get(2))
+
+    async def test_verified_model(self):
+        self.assertTrue(_context(3, role="model", verification_status="approved").is_verified_model)
+        self.assertFalse(_context(3, role="model", verification_status="submitted").is_verified_model)
+        self.assertFalse(_context(3, verification_status="approved").is_verified_model)
+
+
+@requires_database
+class LoadAuthContextTests(unittest.TestCase):
+    def test_one_query_covers_role_verification_and_access_fee(self):
+        base_tg = telegram_id_block()
+
+        async def scenario(engine):
+            async with AsyncSession(engine) as db:
+                model = User(telegram_id=base_tg, role="model", status="active")
+                client = User(telegram_id=base_tg + 1, role="client", status="banned")
+                db.add_all([model, client])
+                await db.flush()
+                db.add(ModelProfile(user_id=model.id, verification_status="approved"))
+                db.add(ClientProfile(user_id=client.id, access_fee_paid=True))
+                await db.commit()
+            async with AsyncSession(engine) as db:
+                with assert_query_budget(1, "load_auth_context"):
+                    model_context = await load_auth_context(db, base_tg)
+                client_context = await load_auth_context(db, base_tg + 1)
+                missing = await load_auth_context(db, base_tg + 2)
+            return model_context, client_context, missing
+
+        model_context, client_context, missing = run_with_engine(scenario)
+        self.assertTrue(model_context.is_verified_model)
+        self.assertFalse(model_context.has_client_profile)
+        self.assertEqual(client_context.status, "banned")
+        self.assertTrue(client_context.has_client_profile)
+        self.assertTrue(client_context.access_fee_paid)
+        self.assertIsNone(client_context.verification_status)
+        self.assertIsNone(missing)
+
+    @unittest.skipIf(settings.redis_url, "exercises the in-process cache only")
+    def test_invalidate_users_by_id(self):
+        base_tg = telegram_id_block()
+        cache = AuthContextCache(ttl_seconds=60, local_ttl_seconds=10, max_entries=100)
+
+        async def scenario(engine):
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                users = [User(telegram_id=base_tg + index, role="client") for index in range(2)]
+                db.add_all(users)
+                await db.commit()
+                for user in users:
+                    await cache.set(_context(user.telegram_id))
+                invalidated = await cache.invalidate_users(db, [users[0].id, -1])
+            return invalidated, await cache.get(base_tg), await cache.get(base_tg + 1)
+
+        invalidated, first, second = run_with_engine(scenario)
+        self.assertEqual(invalidated, 1)
+        self.assertIsNone(first)
+        self.assertIsNotNone(second)
+
+
+if __name__ == "__main__":
+    unittest.main()
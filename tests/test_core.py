@@ -1,10 +1,23 @@
+import asyncio
+import dataclasses
 import re
 import unittest
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
 
 from bot.content_flow import parse_content_args
-from shared.config import _get_kv_map, _get_str_list
-from shared.escrow import calculate_fees
+from bot.session_flow import start_session
+from shared.bot_pool import get_bot, pool_stats
+from shared.cache import LRUTTLCache
+from shared.config import _get_kv_map, _get_str_list, settings
+from shared.dedupe import Claim, EventDeduper, webhook_dedupe_key
+from models import Session, Transaction
+from shared.escrow import build_escrow, calculate_fees
 from shared.id_utils import generate_public_id
+from shared.internal_api import internal_token_middleware
+from shared.notifications import digest_chunks, pack_digest
 from shared.transactions import generate_transaction_ref
 
 
@@ -29,6 +42,37 @@ class CoreTests(unittest.TestCase):
         self.assertEqual(platform_fee, 200)
         self.assertEqual(receiver, 800)
 
+    def test_start_session_sets_scheduled_end(self):
+        class FakeDB:
+            async def commit(self):
+                pass
+
+            async def refresh(self, obj):
+                pass
+
+        session = Session(duration_minutes=30)
+        asyncio.run(start_session(FakeDB(), session))
+        self.assertEqual(session.status, "active")
+        self.assertEqual((session.scheduled_end - session.started_at).total_seconds(), 1800)
+
+    def test_build_escrow_links_through_relationship(self):
+        transaction = Transaction(id=7, amount=1000)
+        session = Session(id=3)
+        escrow = build_escrow(
+            escrow_type="session",
+            related_id=session.id,
+            payer_id=1,
+            receiver_id=2,
+            amount=1000,
+            transaction=transaction,
+            release_condition="both_confirmed",
+        )
+        session.escrow = escrow
+        self.assertIsNone(escrow.id)
+        self.assertEqual(escrow.transaction_id, 7)
+        self.assertEqual(escrow.receiver_payout, 800)
+        self.assertIs(session.escrow, escrow)
+
     def test_parse_content_args_success(self):
         parsed = parse_content_args("photo 2500 Summer Vibes | Teaser pack")
         self.assertEqual(
@@ -53,6 +97,92 @@ class CoreTests(unittest.TestCase):
         mapping = _get_kv_map("TRC20=addr1;BTC=addr2,ETH=addr3")
         self.assertEqual(mapping, {"TRC20": "addr1", "BTC": "addr2", "ETH": "addr3"})
 
+    def test_get_bot_reuses_instance_and_session(self):
+        user_bot = get_bot("111:user-token")
+        self.assertIs(get_bot("111:user-token"), user_bot)
+        admin_bot = get_bot("222:admin-token")
+        self.assertIs(admin_bot.session, user_bot.session)
+        self.assertGreaterEqual(pool_stats()["bots_reused"], 1)
+
+    def test_pack_digest_respects_message_limit(self):
+        lines = [f"Escrow released: esc_{i:04d}" for i in range(10)]
+        messages = pack_digest(lines, limit=60)
+        self.assertEqual("\n".join(messages).split("\n"), lines)
+        self.assertTrue(all(len(message) <= 60 for message in messages))
+        self.assertEqual(pack_digest(["x" * 100], limit=60), ["x" * 60])
+
+    def test_digest_chunks_cover_every_line_once(self):
+        lines = ["a" * 25, "b" * 25, "c" * 100, "d" * 5]
+        self.assertEqual(digest_chunks(lines, limit=60), [range(0, 2), range(2, 3), range(3, 4)])
+        self.assertEqual(digest_chunks([], limit=60), [])
+
+    def test_lru_ttl_cache_evicts_oldest(self):
+        cache = LRUTTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertFalse(cache.add("a", 5))
+
+    def test_webhook_dedupe_key_prefers_event_id(self):
+        payload = {"event": "charge.success", "data": {"id": 42, "reference": "txn_1"}}
+        self.assertEqual(webhook_dedupe_key("paystack", payload, "txn_1"), "paystack:charge.success:42")
+        self.assertEqual(webhook_dedupe_key("flutterwave", {}, "txn_2"), "flutterwave::txn_2")
+
+    def test_event_deduper_local_fallback(self):
+        deduper = EventDeduper(ttl_seconds=60, max_entries=10)
+
+        async def run():
+            first = await deduper.claim("paystack::txn_1")
+            second = await deduper.claim("paystack::txn_1")
+            await deduper.release("paystack::txn_1")
+            third = await deduper.claim("paystack::txn_1")
+            await deduper.complete("paystack::txn_1")
+            fourth = await deduper.claim("paystack::txn_1")
+            return first, second, third, fourth
+
+        self.assertEqual(asyncio.run(run()), (Claim.NEW, Claim.IN_FLIGHT, Claim.NEW, Claim.DONE))
+        self.assertEqual(deduper.stats()["hits"], 1)
+        self.assertEqual(deduper.stats()["in_flight"], 1)
+        self.assertEqual(deduper.stats()["misses"], 2)
+
+    def test_event_deduper_in_flight_claim_expires(self):
+        deduper = EventDeduper(ttl_seconds=60, max_entries=10, in_flight_seconds=0)
+
+        async def run():
+            return await deduper.claim("paystack::txn_1"), await deduper.claim("paystack::txn_1")
+
+        # A claim that was never completed (crashed worker) does not block retries.
+        self.assertEqual(asyncio.run(run()), (Claim.NEW, Claim.NEW))
+
+    def test_internal_routes_need_the_token(self):
+        async def ok(request):
+            return web.json_response({})
+
+        async def run():
+            app = web.Application(middlewares=[internal_token_middleware])
+            app.router.add_get("/internal/db-pool", ok)
+            app.router.add_get("/health", ok)
+            async with TestClient(TestServer(app)) as client:
+                statuses = [
+                    (await client.get("/internal/db-pool", headers=headers)).status
+                    for headers in ({}, {"X-Internal-Token": "wrong"}, {"X-Internal-Token": "secret"})
+                ]
+                statuses.append((await client.get("/health")).status)
+                return statuses
+
+        with mock.patch(
+            "shared.internal_api.settings", dataclasses.replace(settings, internal_api_token="secret")
+        ):
+            self.assertEqual(asyncio.run(run()), [404, 404, 200, 200])
+        # No token configured: the routes are off.
+        with mock.patch(
+            "shared.internal_api.settings", dataclasses.replace(settings, internal_api_token=None)
+        ):
+            self.assertEqual(asyncio.run(run())[:3], [404, 404, 404])
+
 
 if __name__ == "__main__":
     unittest.main()
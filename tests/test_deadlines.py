@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+from datetime import timedelta
+
+from shared.deadlines import DeadlineScheduler
+from shared.time_utils import utcnow
+
+
+class DeadlineSchedulerTests(unittest.TestCase):
+    def test_pop_due_in_deadline_order(self):
+        scheduler = DeadlineScheduler()
+        now = utcnow()
+        scheduler.schedule("escrow", 1, now - timedelta(seconds=5))
+        scheduler.schedule("session", 2, now - timedelta(seconds=10))
+        scheduler.schedule("escrow", 3, now + timedelta(minutes=5))
+        due = scheduler.pop_due(now)
+        self.assertEqual([(kind, key) for kind, key, _ in due], [("session", 2), ("escrow", 1)])
+        self.assertEqual(scheduler.next_due(), now + timedelta(minutes=5))
+        self.assertEqual(scheduler.stats()["max_lateness_seconds"], 10.0)
+
+    def test_reschedule_and_discard_drop_stale_entries(self):
+        scheduler = DeadlineScheduler()
+        now = utcnow()
+        scheduler.schedule("session", 1, now - timedelta(seconds=1))
+        scheduler.schedule("session", 1, now + timedelta(minutes=10))
+        scheduler.schedule("escrow", 2, now - timedelta(seconds=1))
+        scheduler.discard("escrow", 2)
+        self.assertEqual(scheduler.pop_due(now), [])
+        self.assertEqual(len(scheduler), 1)
+
+
+class DeadlineWaitTests(unittest.IsolatedAsyncioTestCase):
+    async def test_wait_returns_at_next_deadline(self):
+        scheduler = DeadlineScheduler()
+        scheduler.schedule("escrow", 1, utcnow() + timedelta(milliseconds=50))
+        started = asyncio.get_running_loop().time()
+        await scheduler.wait(5)
+        self.assertLess(asyncio.get_running_loop().time() - started, 1)
+        self.assertEqual(len(scheduler.pop_due()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from db_helpers import requires_database, run_with_engine
+from models import (
+    AdminAction,
+    ClientProfile,
+    ContentPurchase,
+    DigitalContent,
+    ModelProfile,
+    Session,
+    Transaction,
+)
+
+
+def _rejected_content():
+    return (
+        select(AdminAction.id)
+        .where(
+            AdminAction.target_type == "digital_content",
+            AdminAction.target_id == DigitalContent.id,
+            AdminAction.action_type == "reject_content",
+        )
+        .exists()
+    )
+
+
+# Query shapes taken from the bot handlers, with the index each should use.
+HOT_QUERIES = [
+    (
+        "idx_transactions_pending_review",
+        select(Transaction).where(
+            Transaction.payment_provider == "crypto", Transaction.status == "pending_review"
+        ),
+    ),
+    ("idx_content_purchases_transaction", select(ContentPurchase).where(ContentPurchase.transaction_id == 1)),
+    ("idx_content_purchases_escrow", select(ContentPurchase).where(ContentPurchase.escrow_id == 1)),
+    ("idx_model_profiles_user", select(ModelProfile).where(ModelProfile.user_id == 1)),
+    (
+        "idx_model_profiles_submitted",
+        select(ModelProfile).where(ModelProfile.verification_status == "submitted"),
+    ),
+    ("idx_client_profiles_user", select(ClientProfile).where(ClientProfile.user_id == 1)),
+    (
+        "idx_client_profiles_access_fee_escrow",
+        select(ClientProfile).where(ClientProfile.access_fee_escrow_id == 1),
+    ),
+    (
+        "idx_digital_content_model",
+        select(DigitalContent).where(DigitalContent.is_active.is_(True), DigitalContent.model_id == 1),
+    ),
+    (
+        "idx_digital_content_pending",
+        select(DigitalContent).where(DigitalContent.is_active.is_(False)).order_by(DigitalContent.id),
+    ),
+    ("idx_sessions_status", select(Session).where(Session.status == "pending")),
+    (
+        "idx_admin_actions_target",
+        select(DigitalContent).where(DigitalContent.is_active.is_(False), ~_rejected_content()),
+    ),
+]
+
+
+@requires_database
+class IndexUsageTests(unittest.TestCase):
+    def test_planner_uses_hot_indexes(self):
+        async def explain_all(engine):
+            plans = {}
+            async with engine.begin() as conn:
+                # Empty test tables always favour a sequential scan; this
+                # checks the index is applicable to the query shape.
+                await conn.execute(text("SET LOCAL enable_seqscan = off"))
+                for index_name, query in HOT_QUERIES:
+                    sql = query.compile(
+                        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+                    )
+                    rows = await conn.execute(text(f"EXPLAIN {sql}"))
+                    # On partitioned tables the plan names each partition's index.
+                    names = await conn.execute(
+                        text("SELECT relid::text FROM pg_partition_tree(CAST(:name AS regclass))"),
+                        {"name": index_name},
+                    )
+                    plans[index_name] = (
+                        "\n".join(row[0] for row in rows),
+                        {index_name, *names.scalars()},
+                    )
+            return plans
+
+        for index_name, (plan, names) in run_with_engine(explain_all).items():
+            with self.subTest(index=index_name):
+                self.assertTrue(any(name in plan for name in names), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from shared.metrics import Registry
+
+
+class MetricsTests(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        registry = Registry()
+        errors = registry.counter("worker_errors_total", "Errors.", ["job", "error"])
+        duration = registry.histogram("job_seconds", "Durations.", ["job"], buckets=(0.1, 1.0))
+        errors.inc(job="outbox", error="Timeout")
+        errors.inc(job="outbox", error="Timeout")
+        duration.observe(0.05, job="outbox")
+        duration.observe(0.5, job="outbox")
+        duration.observe(3, job="outbox")
+
+        text = registry.render()
+        self.assertIn("# TYPE worker_errors_total counter", text)
+        self.assertIn('worker_errors_total{job="outbox",error="Timeout"} 2', text)
+        self.assertIn('job_seconds_bucket{job="outbox",le="0.1"} 1', text)
+        self.assertIn('job_seconds_bucket{job="outbox",le="1"} 2', text)
+        self.assertIn('job_seconds_bucket{job="outbox",le="+Inf"} 3', text)
+        self.assertIn('job_seconds_count{job="outbox"} 3', text)
+
+    def test_register_returns_existing_metric(self):
+        registry = Registry()
+        first = registry.gauge("overdue", "Overdue.", ["kind"])
+        self.assertIs(registry.gauge("overdue", "Overdue.", ["kind"]), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
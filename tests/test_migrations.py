@@ -0,0 +1,118 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy import text
+
+from db_helpers import requires_database, scratch_schema
+from shared.migrations import MigrationOps, MigrationRunner, load_migrations
+
+
+def _write(directory: Path, name: str, body: str) -> None:
+    (directory / name).write_text(body)
+
+
+class LoadMigrationsTests(unittest.TestCase):
+    def test_repo_migrations_are_numbered_in_order(self):
+        versions = [migration.version for migration in load_migrations()]
+        self.assertEqual(versions, list(range(1, len(versions) + 1)))
+
+    def test_duplicate_versions_are_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _write(Path(tmp), "0001_first.py", "async def upgrade(op):\n    pass\n")
+            _write(Path(tmp), "0001_second.py", "async def upgrade(op):\n    pass\n")
+            with self.assertRaises(RuntimeError):
+                load_migrations(Path(tmp))
+
+    def test_ignores_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _write(Path(tmp), "0002_b.py", "async def upgrade(op):\n    pass\n")
+            _write(Path(tmp), "0001_a.py", "async def upgrade(op):\n    pass\n")
+            _write(Path(tmp), "helpers.py", "")
+            self.assertEqual([m.name for m in load_migrations(Path(tmp))], ["a", "b"])
+
+
+STEPS = {
+    "0001_items.py": """
+async def upgrade(op):
+    await op.execute("CREATE TABLE items (id SERIAL PRIMARY KEY, value INTEGER, doubled INTEGER)")
+    await op.execute("INSERT INTO items (value) SELECT generate_series(1, 250)")
+""",
+    "0002_doubled.py": """
+async def upgrade(op):
+    await op.backfill(
+        "items", "doubled = value * 2", "doubled IS NULL", batch_size=100
+    )
+    await op.create_index("idx_items_doubled", "items (doubled)")
+""",
+}
+
+
+@requires_database
+class MigrationRunnerTests(unittest.TestCase):
+    def test_applies_each_version_once(self):
+        async def scenario(directory: Path):
+            async with scratch_schema("migration_test") as (engine, _):
+                runner = MigrationRunner(engine, load_migrations(directory))
+                dry = await runner.run(dry_run=True)
+                pending_after_dry = await runner.pending()
+                first = await runner.run()
+                second = await runner.run()
+                async with engine.connect() as conn:
+                    doubled = await conn.scalar(
+                        text("SELECT count(*) FROM items WHERE doubled = value * 2")
+                    )
+                    versions = (
+                        await conn.execute(text("SELECT version FROM schema_migrations ORDER BY 1"))
+                    ).scalars().all()
+                    index_valid = await conn.scalar(
+                        text(
+                            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c "
+                            "ON c.oid = i.indexrelid WHERE c.relname = 'idx_items_doubled'"
+                        )
+                    )
+                return dry, pending_after_dry, first, second, doubled, versions, index_valid
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, body in STEPS.items():
+                _write(Path(tmp), name, body)
+            dry, pending, first, second, doubled, versions, index_valid = asyncio.run(
+                scenario(Path(tmp))
+            )
+
+        self.assertEqual(len(dry), 2)
+        self.assertEqual(len(pending), 2)
+        self.assertEqual([m.version for m in first], [1, 2])
+        self.assertEqual(second, [])
+        self.assertEqual(doubled, 250)
+        self.assertEqual(versions, [1, 2])
+        self.assertTrue(index_valid)
+
+    def test_backfill_waits_for_locked_rows(self):
+        async def scenario():
+            async with scratch_schema("migration_test") as (engine, _):
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text("CREATE TABLE items (id SERIAL PRIMARY KEY, value INTEGER, doubled INTEGER)")
+                    )
+                    await conn.execute(text("INSERT INTO items (value) SELECT generate_series(1, 250)"))
+                async with engine.connect() as holder, engine.connect() as conn:
+                    # Another transaction holds the first rows a batch would pick.
+                    await holder.execute(text("SELECT id FROM items WHERE id <= 10 FOR UPDATE"))
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    ops = MigrationOps(conn)
+                    backfill = asyncio.create_task(
+                        ops.backfill("items", "doubled = value * 2", "doubled IS NULL", batch_size=100)
+                    )
+                    await asyncio.sleep(0.5)
+                    await holder.rollback()
+                    updated = await backfill
+                    missing = await conn.scalar(text("SELECT count(*) FROM items WHERE doubled IS NULL"))
+                return updated, missing
+
+        self.assertEqual(asyncio.run(scenario()), (250, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import dataclasses
+import unittest
+from unittest import mock
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import create_tables, requires_database, scratch_schema
+from models import NotificationOutbox
+from shared.config import settings
+from shared.outbox import (
+    claim_outbox,
+    drain_outbox,
+    enqueue_admin_message,
+    enqueue_escrow_log,
+    enqueue_user_message,
+)
+
+
+@requires_database
+class OutboxDrainTests(unittest.TestCase):
+    def test_sends_outside_the_claim_and_retries_failed_admins(self):
+        sent, reclaimed = [], []
+
+        async def scenario():
+            async with scratch_schema("outbox_test") as (engine, _):
+                await create_tables(engine)
+                admins = dataclasses.replace(settings, admin_telegram_ids=(101, 102))
+                with mock.patch("shared.outbox.settings", admins):
+                    async with AsyncSession(engine) as db:
+                        enqueue_user_message(db, 55, "hello")
+                        enqueue_admin_message(db, "approve?")
+                        await db.commit()
+
+                async def send_user(chat_id, message, **kwargs):
+                    # The lease is committed: a second drainer gets nothing.
+                    async with AsyncSession(engine) as other:
+                        reclaimed.extend(await claim_outbox(other, 10))
+                    sent.append(chat_id)
+
+                async def send_admin(admin_id, message, reply_markup=None, **kwargs):
+                    if admin_id == 102:
+                        raise RuntimeError("bot was blocked by the user")
+                    sent.append(admin_id)
+
+                with mock.patch("shared.outbox.send_user_message", send_user), mock.patch(
+                    "shared.outbox.send_admin_chat_message", send_admin
+                ):
+                    async with AsyncSession(engine) as db:
+                        drained = await drain_outbox(db, batch_size=10)
+                async with AsyncSession(engine) as db:
+                    rows = (
+                        await db.execute(
+                            select(
+                                NotificationOutbox.chat_id,
+                                NotificationOutbox.status,
+                                NotificationOutbox.attempts,
+                                NotificationOutbox.locked_until,
+                            ).order_by(NotificationOutbox.chat_id)
+                        )
+                    ).all()
+                return drained, rows
+
+        drained, rows = asyncio.run(scenario())
+        self.assertEqual(drained, 3)
+        self.assertEqual(sorted(sent), [55, 101])
+        self.assertEqual(reclaimed, [])
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [(55, "sent", 1, None), (101, "sent", 1, None), (102, "pending", 1, None)],
+        )
+
+    def test_failed_digest_part_retries_only_its_rows(self):
+        digests = []
+
+        async def scenario():
+            async with scratch_schema("outbox_test") as (engine, _):
+                await create_tables(engine)
+                async with AsyncSession(engine) as db:
+                    # Two lines per 4096-char message: three digest parts.
+                    for index in range(6):
+                        enqueue_escrow_log(db, f"{index}:" + "x" * 1800)
+                    await db.commit()
+
+                async def send_digest(lines):
+                    digests.append([line.split(":")[0] for line in lines])
+                    if len(digests) == 2:
+                        raise RuntimeError("timeout")
+
+                with mock.patch("shared.outbox.send_escrow_digest", send_digest):
+                    async with AsyncSession(engine) as db:
+                        await drain_outbox(db, batch_size=10)
+                async with AsyncSession(engine) as db:
+                    return (
+                        await db.execute(select(NotificationOutbox.status).order_by(NotificationOutbox.id))
+                    ).scalars().all()
+
+        statuses = asyncio.run(scenario())
+        self.assertEqual(digests, [["0", "1"], ["2", "3"], ["4", "5"]])
+        self.assertEqual(statuses, ["sent", "sent", "pending", "pending", "sent", "sent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
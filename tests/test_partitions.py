@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from sqlalchemy import text
+
+from db_helpers import requires_database, scratch_schema
+from shared.partitions import (
+    add_months,
+    archive_expired_partitions,
+    ensure_partitions,
+    list_partitions,
+    month_partition_ddl,
+    month_start,
+    partition_name,
+)
+
+
+class PartitionNamingTests(unittest.TestCase):
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(datetime(2026, 11, 1), 2), datetime(2027, 1, 1))
+        self.assertEqual(add_months(datetime(2026, 1, 1), -1), datetime(2025, 12, 1))
+
+    def test_month_start(self):
+        self.assertEqual(month_start(datetime(2026, 3, 17, 8, 30, 5, 12)), datetime(2026, 3, 1))
+
+    def test_partition_ddl_covers_one_month(self):
+        month = datetime(2026, 12, 1)
+        self.assertEqual(partition_name("transactions", month), "transactions_y2026m12")
+        self.assertIn("FROM ('2026-12-01') TO ('2027-01-01')", month_partition_ddl("transactions", month))
+
+
+@requires_database
+class PartitionMaintenanceTests(unittest.TestCase):
+    def test_creates_ahead_and_archives_expired_months(self):
+        async def scenario():
+            async with scratch_schema("partition_test") as (engine, schema):
+                archive = f"{schema}_archive"
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text(
+                            "CREATE TABLE events (id serial, created_at timestamp NOT NULL) "
+                            "PARTITION BY RANGE (created_at)"
+                        )
+                    )
+                    await conn.execute(text("CREATE TABLE events_default PARTITION OF events DEFAULT"))
+                created = await ensure_partitions(engine, "events", datetime(2026, 3, 15), 2)
+                again = await ensure_partitions(engine, "events", datetime(2026, 3, 20), 2)
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text("INSERT INTO events (created_at) VALUES ('2026-03-02'), ('2026-05-09')")
+                    )
+                archived = await archive_expired_partitions(
+                    engine, "events", datetime(2026, 5, 15), 1, archive
+                )
+                async with engine.connect() as conn:
+                    remaining = sorted(name for name, _ in await list_partitions(conn, "events"))
+                    live_rows = await conn.scalar(text("SELECT count(*) FROM events"))
+                    archived_rows = await conn.scalar(
+                        text(f"SELECT count(*) FROM {archive}.events_y2026m03")
+                    )
+                return created, again, archived, remaining, live_rows, archived_rows
+
+        created, again, archived, remaining, live_rows, archived_rows = asyncio.run(scenario())
+        self.assertEqual(created, ["events_y2026m03", "events_y2026m04", "events_y2026m05"])
+        self.assertEqual(again, [])
+        self.assertEqual(archived, ["events_y2026m03"])
+        self.assertEqual(remaining, ["events_default", "events_y2026m04", "events_y2026m05"])
+        self.assertEqual(live_rows, 1)
+        self.assertEqual(archived_rows, 1)
+
+    def test_rows_in_default_move_into_the_new_month(self):
+        async def scenario():
+            async with scratch_schema("partition_test") as (engine, _):
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text(
+                            "CREATE TABLE events (id serial, created_at timestamp NOT NULL, "
+                            "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+                        )
+                    )
+                    await conn.execute(text("CREATE TABLE events_default PARTITION OF events DEFAULT"))
+                    # The worker was down: rows for March landed in the default partition.
+                    await conn.execute(
+                        text("INSERT INTO events (created_at) VALUES ('2026-03-02'), ('2026-06-09')")
+                    )
+                created = await ensure_partitions(engine, "events", datetime(2026, 3, 15), 1)
+                async with engine.connect() as conn:
+                    march = await conn.scalar(text("SELECT count(*) FROM events_y2026m03"))
+                    default = await conn.scalar(text("SELECT count(*) FROM events_default"))
+                return created, march, default
+
+        created, march, default = asyncio.run(scenario())
+        self.assertEqual(created, ["events_y2026m03", "events_y2026m04"])
+        self.assertEqual((march, default), (1, 1))
+
+    def test_failed_move_is_not_reported_and_is_retried(self):
+        async def scenario():
+            async with scratch_schema("partition_test") as (engine, schema):
+                archive = f"{schema}_archive"
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text(
+                            "CREATE TABLE events (id serial, created_at timestamp NOT NULL) "
+                            "PARTITION BY RANGE (created_at)"
+                        )
+                    )
+                    await conn.execute(text(month_partition_ddl("events", datetime(2026, 3, 1))))
+                    # Blocks the move after the detach succeeds.
+                    await conn.execute(text(f"CREATE SCHEMA {archive}"))
+                    await conn.execute(text(f"CREATE TABLE {archive}.events_y2026m03 (id int)"))
+                first = await archive_expired_partitions(
+                    engine, "events", datetime(2026, 5, 15), 1, archive
+                )
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"DROP TABLE {archive}.events_y2026m03"))
+                second = await archive_expired_partitions(
+                    engine, "events", datetime(2026, 5, 15), 1, archive
+                )
+                async with engine.connect() as conn:
+                    moved = await conn.scalar(
+                        text("SELECT to_regclass(:name) IS NOT NULL"),
+                        {"name": f"{archive}.events_y2026m03"},
+                    )
+                return first, second, moved
+
+        first, second, moved = asyncio.run(scenario())
+        self.assertEqual(first, [])
+        self.assertEqual(second, ["events_y2026m03"])
+        self.assertTrue(moved)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import secrets
+import unittest
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import requires_database, run_with_engine, telegram_id_block
+from models import EscrowAccount, ModelProfile, PlatformStats, PlatformStatsDelta, Transaction, User
+from shared.query_stats import assert_query_budget
+from shared.stats import (
+    STAT_FIELDS,
+    cached_platform_stats,
+    compute_platform_stats,
+    fold_platform_stats,
+    format_age,
+    refresh_platform_stats,
+    stats_age_seconds,
+)
+from shared.time_utils import utcnow
+
+
+class FormatAgeTests(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(format_age(42.7), "42s")
+        self.assertEqual(format_age(185), "3m")
+        self.assertEqual(format_age(2 * 3600 + 5 * 60), "2h 5m")
+
+
+@requires_database
+class PlatformStatsTests(unittest.TestCase):
+    async def _seed(self, engine) -> int:
+        base_tg = telegram_id_block()
+        async with AsyncSession(engine) as db:
+            client = User(telegram_id=base_tg, role="client")
+            model = User(telegram_id=base_tg + 1, role="model")
+            db.add_all([client, model])
+            await db.flush()
+            db.add(ModelProfile(user_id=model.id, verification_status="submitted"))
+            for status in ("held", "held", "disputed", "released"):
+                db.add(
+                    EscrowAccount(
+                        escrow_ref=f"stats_{secrets.token_hex(6)}",
+                        escrow_type="session",
+                        payer_id=client.id,
+                        amount=5,
+                        platform_fee=1,
+                        status=status,
+                    )
+                )
+            db.add(Transaction(transaction_ref=f"stats_{secrets.token_hex(6)}", user_id=client.id, amount=12.5))
+            await db.commit()
+        return base_tg
+
+    async def _separate_counts(self, db) -> dict:
+        async def count(model, *where):
+            return await db.scalar(select(func.count()).select_from(model).where(*where))
+
+        return {
+            "total_users": await count(User),
+            "total_models": await count(User, User.role == "model"),
+            "pending_models": await count(ModelProfile, ModelProfile.verification_status == "submitted"),
+            "held_escrows": await count(EscrowAccount, EscrowAccount.status == "held"),
+            "disputed_escrows": await count(EscrowAccount, EscrowAccount.status == "disputed"),
+            "total_volume": await db.scalar(select(func.coalesce(func.sum(Transaction.amount), 0))),
+        }
+
+    def test_single_query_matches_separate_counts(self):
+        async def scenario(engine):
+            await self._seed(engine)
+            async with AsyncSession(engine) as db:
+                with assert_query_budget(1, "platform_stats"):
+                    combined = await compute_platform_stats(db)
+                return combined, await self._separate_counts(db)
+
+        combined, expected = run_with_engine(scenario)
+        self.assertEqual(set(combined), set(STAT_FIELDS))
+        self.assertEqual(combined, expected)
+
+    def test_refresh_upserts_the_cached_row(self):
+        async def scenario(engine):
+            async with AsyncSession(engine) as db:
+                first = await refresh_platform_stats(db)
+                first_users = first.total_users
+            await self._seed(engine)
+            async with AsyncSession(engine) as db:
+                second = await refresh_platform_stats(db)
+            async with AsyncSession(engine) as db:
+                cached = await cached_platform_stats(db)
+            return first_users, second, cached
+
+        first_users, second, cached = run_with_engine(scenario)
+        self.assertEqual(second.total_users, first_users + 2)
+        self.assertEqual(cached.total_users, second.total_users)
+        self.assertLess(stats_age_seconds(cached), 60)
+        self.assertGreater(stats_age_seconds(cached, utcnow() + timedelta(minutes=5)), 240)
+
+    def test_writes_are_folded_into_the_row(self):
+        async def scenario(engine):
+            async with AsyncSession(engine) as db:
+                await db.execute(delete(PlatformStats))
+                await db.commit()
+            await self._seed(engine)
+            async with AsyncSession(engine) as db:
+                # Not seeded yet: the deltas wait for the recount.
+                unseeded = await fold_platform_stats(db, 100)
+                pending = await db.scalar(select(func.count()).select_from(PlatformStatsDelta))
+            async with AsyncSession(engine) as db:
+                await refresh_platform_stats(db)
+            client_tg = await self._seed(engine)
+            async with AsyncSession(engine) as db:
+                await db.execute(
+                    update(EscrowAccount)
+                    .where(EscrowAccount.escrow_ref.like("stats_%"), EscrowAccount.status == "held")
+                    .values(status="disputed")
+                )
+                await db.execute(update(User).where(User.telegram_id == client_tg).values(role="model"))
+                await db.execute(
+                    update(Transaction).where(Transaction.transaction_ref.like("stats_%")).values(amount=20)
+                )
+                await db.commit()
+            async with AsyncSession(engine) as db:
+                batches = []
+                while batch := await fold_platform_stats(db, 3):
+                    batches.append(batch)
+                cached = await cached_platform_stats(db)
+                folded = {name: getattr(cached, name) for name in STAT_FIELDS}
+                return unseeded, pending, batches, folded, await compute_platform_stats(db)
+
+        unseeded, pending, batches, folded, expected = run_with_engine(scenario)
+        self.assertIsNone(unseeded)
+        self.assertGreater(pending, 0)
+        self.assertTrue(batches)
+        self.assertEqual(folded, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
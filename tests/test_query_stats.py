@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from shared.query_stats import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+    current_stats,
+    handler_queries,
+    instrument,
+    query_budget,
+    track,
+)
+
+
+class QueryStatsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://")
+        instrument(cls.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def _query(self, count: int = 1) -> None:
+        with self.engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("select 1"))
+
+    def test_counts_statements_in_block(self):
+        with track("block") as stats:
+            self._query(3)
+        self.assertEqual(stats.statements, 3)
+        self.assertGreater(stats.seconds, 0)
+        self.assertIsNone(current_stats())
+
+    def test_untracked_queries_are_ignored(self):
+        self._query()
+        with track("block") as stats:
+            pass
+        self.assertEqual(stats.statements, 0)
+
+    def test_nested_blocks_roll_up(self):
+        with track("outer") as outer:
+            self._query()
+            with track("inner") as inner:
+                self._query(2)
+        self.assertEqual(inner.statements, 2)
+        self.assertEqual(outer.statements, 3)
+
+    def test_assert_query_budget(self):
+        with assert_query_budget(2):
+            self._query(2)
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(2):
+                self._query(3)
+
+    def test_query_budget_decorator(self):
+        @query_budget(1)
+        async def handler(count: int) -> str:
+            self._query(count)
+            return "ok"
+
+        self.assertEqual(handler.query_budget, 1)
+        with assert_query_budget(1):
+            self.assertEqual(asyncio.run(handler(1)), "ok")
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                with self.assertLogs("shared.query_stats", "WARNING"):
+                    asyncio.run(handler(2))
+
+    def test_decorated_handler_inside_middleware_is_observed_once(self):
+        @query_budget(2)
+        async def budgeted_handler() -> None:
+            self._query()
+
+        label = budgeted_handler.__qualname__
+
+        async def dispatch() -> None:
+            # What QueryStatsMiddleware does around the resolved handler.
+            with track(label):
+                await budgeted_handler()
+
+        asyncio.run(dispatch())
+        self.assertEqual(sum(handler_queries._counts[(label,)]), 1)
+
+    def test_failed_statement_does_not_skew_timing(self):
+        with self.engine.connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.execute(text("select * from missing_table"))
+            conn.execute(text("select 1"))
+            self.assertEqual(conn.info.get("query_started"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from shared.telegram_dispatcher import DispatcherClosed, OutboundDispatcher, Priority, TokenBucket
+
+
+def _dispatcher(**overrides) -> OutboundDispatcher:
+    options = dict(concurrency=1, global_rate=1000.0, chat_rate=1000.0, group_rate=1000.0, max_retries=2)
+    options.update(overrides)
+    return OutboundDispatcher(**options)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_wait_time_after_capacity_is_spent(self):
+        bucket = TokenBucket(rate=2.0, capacity=1.0)
+        now = bucket.updated
+        self.assertEqual(bucket.wait_time(now), 0.0)
+        bucket.take()
+        self.assertAlmostEqual(bucket.wait_time(now), 0.5)
+        self.assertEqual(bucket.wait_time(now + 0.5), 0.0)
+
+    def test_block_delays_until_retry_after(self):
+        bucket = TokenBucket(rate=100.0, capacity=1.0)
+        now = bucket.updated
+        bucket.block(now, 3)
+        self.assertAlmostEqual(bucket.wait_time(now + 1), 2.0)
+
+
+class OutboundDispatcherTests(unittest.IsolatedAsyncioTestCase):
+    async def test_higher_priority_is_sent_first(self):
+        dispatcher = _dispatcher()
+        order: list[str] = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def record(name):
+            async def call():
+                order.append(name)
+            return call
+
+        first = asyncio.create_task(dispatcher.submit(blocker, chat_id=1))
+        await asyncio.sleep(0)
+        bulk = asyncio.create_task(dispatcher.submit(record("bulk"), chat_id=2, priority=Priority.BULK))
+        payment = asyncio.create_task(
+            dispatcher.submit(record("payment"), chat_id=3, priority=Priority.PAYMENT)
+        )
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, bulk, payment)
+        await dispatcher.close()
+        self.assertEqual(order, ["payment", "bulk"])
+
+    async def test_retry_after_is_honoured(self):
+        dispatcher = _dispatcher()
+        attempts = 0
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "flood", 0)
+            return "ok"
+
+        self.assertEqual(await dispatcher.submit(flaky, chat_id=1), "ok")
+        self.assertEqual(attempts, 2)
+        self.assertEqual(dispatcher.stats()["retried"], 1)
+        await dispatcher.close()
+
+    async def test_gives_up_after_max_retries(self):
+        dispatcher = _dispatcher(max_retries=1)
+
+        async def always_flooded():
+            raise TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "flood", 0)
+
+        with self.assertRaises(TelegramRetryAfter):
+            await dispatcher.submit(always_flooded, chat_id=1)
+        await dispatcher.close()
+
+    async def test_saturated_chat_does_not_hold_the_workers(self):
+        dispatcher = _dispatcher(concurrency=2, chat_rate=1.0)
+        sent: list[str] = []
+
+        def record(name):
+            async def call():
+                sent.append(name)
+            return call
+
+        # One message per second for chat 1: all but the first must wait.
+        burst = [
+            asyncio.create_task(dispatcher.submit(record(f"bulk{i}"), chat_id=1, priority=Priority.BULK))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(
+            dispatcher.submit(record("payment"), chat_id=2, priority=Priority.PAYMENT), 0.2
+        )
+        self.assertEqual(sent, ["bulk0", "payment"])
+        self.assertEqual(dispatcher.stats()["parked"], 4)
+        await asyncio.wait_for(burst[1], 1.5)
+        self.assertEqual(sent, ["bulk0", "payment", "bulk1"])
+        await dispatcher.close()
+        for task in burst[2:]:
+            with self.assertRaises(DispatcherClosed):
+                await task
+
+    async def test_retry_after_waits_outside_the_worker(self):
+        dispatcher = _dispatcher(concurrency=1)
+        sent: list[str] = []
+        flooded = True
+
+        async def flaky():
+            nonlocal flooded
+            if flooded:
+                flooded = False
+                raise TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "flood", 1)
+            sent.append("retried")
+
+        async def other():
+            sent.append("other")
+
+        retried = asyncio.create_task(dispatcher.submit(flaky, chat_id=1))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(dispatcher.submit(other, chat_id=2), 0.2)
+        await asyncio.wait_for(retried, 2)
+        self.assertEqual(sent, ["other", "retried"])
+        await dispatcher.close()
+
+    async def test_close_fails_sending_and_queued_requests(self):
+        dispatcher = _dispatcher()
+
+        async def hang():
+            await asyncio.Event().wait()
+
+        sending = asyncio.create_task(dispatcher.submit(hang, chat_id=1))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(dispatcher.submit(hang, chat_id=2))
+        await asyncio.sleep(0)
+        await dispatcher.close()
+        for task in (sending, queued):
+            with self.assertRaises(DispatcherClosed):
+                await asyncio.wait_for(task, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
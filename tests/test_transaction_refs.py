@@ -0,0 +1,81 @@
+import secrets
+import unittest
+from datetime import timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import requires_database, run_with_engine, telegram_id_block
+from models import EscrowAccount, Transaction, TransactionRef, User
+from shared.time_utils import utcnow
+
+
+@requires_database
+class TransactionRefTests(unittest.TestCase):
+    async def _user(self, db) -> User:
+        user = User(telegram_id=telegram_id_block(), role="client")
+        db.add(user)
+        await db.flush()
+        return user
+
+    def test_ref_is_unique_across_partitions(self):
+        async def scenario(engine):
+            ref = f"refs_{secrets.token_hex(6)}"
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user = await self._user(db)
+                db.add(Transaction(transaction_ref=ref, user_id=user.id, amount=5, created_at=utcnow()))
+                await db.commit()
+                # A month the first row's partition does not cover.
+                db.add(
+                    Transaction(
+                        transaction_ref=ref,
+                        user_id=user.id,
+                        amount=5,
+                        created_at=utcnow() - timedelta(days=400),
+                    )
+                )
+                with self.assertRaises(IntegrityError):
+                    await db.commit()
+                await db.rollback()
+                return (
+                    await db.execute(select(TransactionRef).where(TransactionRef.transaction_ref == ref))
+                ).scalars().all()
+
+        refs = run_with_engine(scenario)
+        self.assertEqual(len(refs), 1)
+
+    def test_referenced_transactions_cannot_be_deleted(self):
+        async def scenario(engine):
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user = await self._user(db)
+                kept, spare = (
+                    Transaction(transaction_ref=f"refs_{secrets.token_hex(6)}", user_id=user.id, amount=5)
+                    for _ in range(2)
+                )
+                db.add_all([kept, spare])
+                await db.flush()
+                db.add(
+                    EscrowAccount(
+                        escrow_ref=f"refs_{secrets.token_hex(6)}",
+                        escrow_type="session",
+                        payer_id=user.id,
+                        amount=5,
+                        platform_fee=1,
+                        transaction_id=kept.id,
+                    )
+                )
+                await db.commit()
+                await db.execute(delete(Transaction).where(Transaction.id == spare.id))
+                await db.commit()
+                spare_ref = await db.get(TransactionRef, spare.id)
+                with self.assertRaises(IntegrityError):
+                    await db.execute(delete(Transaction).where(Transaction.id == kept.id))
+                await db.rollback()
+                return spare_ref
+
+        self.assertIsNone(run_with_engine(scenario))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import secrets
+import unittest
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import requires_database, run_with_engine, telegram_id_block
+from models import EscrowAccount, User, WalletLedgerEntry
+from shared.escrow import refund_escrow, release_escrow
+from shared.wallet import compact_wallets, debit_wallet, wallet_balance
+
+
+@requires_database
+class WalletConcurrencyTests(unittest.TestCase):
+    escrows = 25
+
+    async def _seed(self, engine) -> tuple[int, int, list[int]]:
+        base_tg = telegram_id_block()
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            payer = User(telegram_id=base_tg, role="client", wallet_balance=0)
+            receiver = User(telegram_id=base_tg + 1, role="model", wallet_balance=0)
+            db.add_all([payer, receiver])
+            await db.flush()
+            escrows = [
+                EscrowAccount(
+                    escrow_ref=f"wallet_{secrets.token_hex(6)}",
+                    escrow_type="session",
+                    payer_id=payer.id,
+                    receiver_id=receiver.id,
+                    amount=10,
+                    platform_fee=2,
+                    receiver_payout=8,
+                    status="held",
+                )
+                for _ in range(self.escrows)
+            ]
+            db.add_all(escrows)
+            await db.flush()
+            ids = (payer.id, receiver.id, [escrow.id for escrow in escrows])
+            await db.commit()
+            return ids
+
+    async def _settle_in_parallel(self, engine, escrow_ids, settle) -> list[bool]:
+        async def one(escrow_id: int) -> bool:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                escrow = await db.get(EscrowAccount, escrow_id)
+                _, changed = await settle(db, escrow)
+                return changed
+
+        return await asyncio.gather(*(one(escrow_id) for escrow_id in escrow_ids))
+
+    async def _balance(self, engine, user_id: int) -> float:
+        async with AsyncSession(engine) as db:
+            return await wallet_balance(db, user_id)
+
+    def test_parallel_releases_credit_every_payout(self):
+        async def scenario(engine):
+            payer_id, receiver_id, escrow_ids = await self._seed(engine)
+            # Each escrow is settled twice at once; only one attempt may count.
+            changed = await self._settle_in_parallel(engine, escrow_ids * 2, release_escrow)
+            return changed, await self._balance(engine, receiver_id)
+
+        changed, balance = run_with_engine(scenario)
+        self.assertEqual(sum(changed), self.escrows)
+        self.assertEqual(balance, 8 * self.escrows)
+
+    def test_parallel_refunds_credit_every_amount(self):
+        async def scenario(engine):
+            payer_id, receiver_id, escrow_ids = await self._seed(engine)
+            changed = await self._settle_in_parallel(engine, escrow_ids, refund_escrow)
+            return changed, await self._balance(engine, payer_id)
+
+        changed, balance = run_with_engine(scenario)
+        self.assertTrue(all(changed))
+        self.assertEqual(balance, 10 * self.escrows)
+
+    def test_debit_never_overdraws(self):
+        async def scenario(engine):
+            payer_id, receiver_id, escrow_ids = await self._seed(engine)
+            await self._settle_in_parallel(engine, escrow_ids[:5], release_escrow)
+
+            async def debit() -> bool:
+                async with AsyncSession(engine) as db:
+                    balance = await debit_wallet(db, receiver_id, 8)
+                    await db.commit()
+                    return balance is not None
+
+            debited = await asyncio.gather(*(debit() for _ in range(8)))
+            async with AsyncSession(engine) as db:
+                # Debits already left the stored balance, so only credits fold in.
+                stored = await db.scalar(select(User.wallet_balance).where(User.id == receiver_id))
+                while await compact_wallets(db, 100):
+                    pass
+                compacted = await db.scalar(select(User.wallet_balance).where(User.id == receiver_id))
+            return debited, stored, compacted, await self._balance(engine, receiver_id)
+
+        debited, stored, compacted, balance = run_with_engine(scenario)
+        self.assertEqual(sum(debited), 5)
+        self.assertEqual(stored, -8 * 5)
+        self.assertEqual(compacted, 0)
+        self.assertEqual(balance, 0)
+
+    def test_concurrent_compaction_folds_each_entry_once(self):
+        async def scenario(engine):
+            payer_id, receiver_id, escrow_ids = await self._seed(engine)
+            await self._settle_in_parallel(engine, escrow_ids, release_escrow)
+            before = await self._balance(engine, receiver_id)
+
+            async def compact() -> int:
+                async with AsyncSession(engine) as db:
+                    total = 0
+                    while batch := await compact_wallets(db, 4):
+                        total += batch
+                    return total
+
+            await asyncio.gather(*(compact() for _ in range(3)))
+            async with AsyncSession(engine) as db:
+                stored = await db.scalar(select(User.wallet_balance).where(User.id == receiver_id))
+                pending = await db.scalar(
+                    select(WalletLedgerEntry.id).where(
+                        (WalletLedgerEntry.user_id == receiver_id)
+                        & WalletLedgerEntry.compacted_at.is_(None)
+                    )
+                )
+            return before, stored, pending, await self._balance(engine, receiver_id)
+
+        before, stored, pending, after = run_with_engine(scenario)
+        self.assertEqual(before, 8 * self.escrows)
+        self.assertEqual(stored, 8 * self.escrows)
+        self.assertIsNone(pending)
+        self.assertEqual(after, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from shared.webhook_capture import WebhookCaptureLog, iter_captured_events, percentile
+
+
+class WebhookCaptureTests(unittest.TestCase):
+    def test_segments_rotate_and_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            capture = WebhookCaptureLog(directory, segment_bytes=1024, max_segments=3)
+            body = b'{"event":"charge.success","data":{"reference":"' + b"x" * 400 + b'"}}'
+
+            async def write():
+                for _ in range(10):
+                    await capture.append(
+                        "paystack",
+                        {"X-Paystack-Signature": "abc", "Cookie": "secret"},
+                        body,
+                    )
+
+            asyncio.run(write())
+            segments = sorted(Path(directory).glob("webhooks-*.jsonl.gz"))
+            self.assertEqual(len(segments), 3)
+            events = list(iter_captured_events([directory]))
+            self.assertTrue(events)
+            self.assertEqual(events[-1]["body"], body.decode())
+            self.assertEqual(events[-1]["headers"], {"X-Paystack-Signature": "abc"})
+
+    def test_percentile_nearest_rank(self):
+        samples = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import asyncio
+import multiprocessing
+import os
+import secrets
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db_helpers import TEST_DATABASE_URL, create_tables, make_engine, requires_database, telegram_id_block
+from models import EscrowAccount, NotificationOutbox, Session, User
+from shared.time_utils import utcnow
+
+
+def _run_worker(start, results) -> None:
+    from worker.worker import (
+        process_auto_release,
+        process_session_timeouts,
+        process_wallet_compaction,
+    )
+
+    async def run():
+        start.wait()
+        started = time.perf_counter()
+        released = await process_auto_release()
+        expired = await process_session_timeouts()
+        elapsed = time.perf_counter() - started
+        await process_wallet_compaction()
+        return released, len(expired), elapsed
+
+    results.put(asyncio.run(run()))
+
+
+@requires_database
+class WorkerScalingTests(unittest.TestCase):
+    escrows = 1500
+    sessions = 300
+    receivers = 200
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = make_engine()
+        asyncio.run(create_tables(cls.engine))
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run(cls.engine.dispose())
+
+    def _seed(self) -> dict:
+        async def seed():
+            tag = secrets.token_hex(4)
+            base_tg = telegram_id_block()
+            past = utcnow() - timedelta(minutes=1)
+            async with AsyncSession(self.engine) as db:
+                users = [
+                    User(telegram_id=base_tg + index, role="model", wallet_balance=0)
+                    for index in range(self.receivers + 1)
+                ]
+                db.add_all(users)
+                await db.flush()
+                payer, receivers = users[0], users[1:]
+                db.add_all(
+                    EscrowAccount(
+                        escrow_ref=f"scale_{tag}_{index}",
+                        escrow_type="session",
+                        payer_id=payer.id,
+                        receiver_id=receivers[index % self.receivers].id,
+                        amount=10,
+                        platform_fee=2,
+                        receiver_payout=8,
+                        status="held",
+                        auto_release_at=past,
+                    )
+                    for index in range(self.escrows)
+                )
+                db.add_all(
+                    Session(
+                        session_ref=f"scale_{tag}_{index}",
+                        client_id=payer.id,
+                        model_id=receivers[0].id,
+                        status="active",
+                        scheduled_end=past,
+                    )
+                    for index in range(self.sessions)
+                )
+                user_ids = [user.id for user in receivers]
+                await db.commit()
+                return {"tag": tag, "user_ids": user_ids}
+
+        return asyncio.run(seed())
+
+    def _run(self, processes: int) -> tuple[dict, list, float]:
+        seeded = self._seed()
+        context = multiprocessing.get_context("spawn")
+        start = context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=_run_worker, args=(start, results))
+            for _ in range(processes)
+        ]
+        # Spawned children load settings while unpickling _run_worker, so
+        # they must inherit the environment rather than set it themselves.
+        environment = {
+            "DATABASE_URL": TEST_DATABASE_URL,
+            "MANUAL_RELEASE_ONLY": "false",
+            "WORKER_BATCH_SIZE": os.getenv("WORKER_BATCH_SIZE", "50"),
+        }
+        with mock.patch.dict(os.environ, environment):
+            for worker in workers:
+                worker.start()
+        # Give the children time to import before releasing them together.
+        time.sleep(3)
+        start.set()
+        outcomes = [results.get(timeout=120) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=30)
+        elapsed = max(outcome[2] for outcome in outcomes)
+        return seeded, [outcome[:2] for outcome in outcomes], elapsed
+
+    def _assert_exactly_once(self, seeded: dict, outcomes: list) -> None:
+        tag = seeded["tag"]
+        # Per-process counts can include unrelated due rows already in the
+        # database, so exactly-once is checked on the rows seeded for this run.
+        self.assertGreaterEqual(sum(released for released, _ in outcomes), self.escrows)
+
+        async def check():
+            async with AsyncSession(self.engine) as db:
+                held = await db.scalar(
+                    select(func.count()).where(
+                        EscrowAccount.escrow_ref.like(f"scale_{tag}_%")
+                        & (EscrowAccount.status != "released")
+                    )
+                )
+                balance = await db.scalar(
+                    select(func.sum(User.wallet_balance)).where(User.id.in_(seeded["user_ids"]))
+                )
+                logs = await db.scalar(
+                    select(func.count()).where(
+                        (NotificationOutbox.channel == "escrow_log")
+                        & NotificationOutbox.message.like(f"%scale_{tag}_%")
+                    )
+                )
+                notices = await db.scalar(
+                    select(func.count()).where(
+                        (NotificationOutbox.channel == "user")
+                        & NotificationOutbox.message.like(f"Session scale_{tag}_%")
+                    )
+                )
+                return held, balance, logs, notices
+
+        held, balance, logs, notices = asyncio.run(check())
+        self.assertEqual(held, 0)
+        self.assertEqual(balance, 8 * self.escrows)
+        self.assertEqual(logs, self.escrows)
+        self.assertEqual(notices, 2 * self.sessions)
+
+    def test_replicas_share_work_exactly_once(self):
+        timings = {}
+        for processes in (1, 4):
+            seeded, outcomes, elapsed = self._run(processes)
+            self._assert_exactly_once(seeded, outcomes)
+            timings[processes] = (self.escrows + self.sessions) / elapsed
+            if processes > 1:
+                # The work was actually shared rather than drained by one replica.
+                self.assertGreaterEqual(sum(1 for released, _ in outcomes if released), 2)
+        print(
+            "\nworker throughput: "
+            + ", ".join(f"{n} proc {rate:.0f} items/s" for n, rate in timings.items())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
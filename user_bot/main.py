@@ -1,3 +1,4 @@
+import dataclasses
 from pathlib import Path
 import sys
 from typing import Optional
@@ -22,8 +23,13 @@ sys.path.append(str(ROOT))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("user_bot")
+from shared.auth_context import AuthContext, auth_contexts, load_auth_context
+from shared.bot_pool import close_bots, get_bot
 from shared.config import settings
-from shared.db import AsyncSessionLocal
+from shared.db import AsyncSessionLocal, pool_stats, read_session
+from shared.internal_api import internal_token_middleware
+from shared.middlewares import ActorMiddleware, QueryStatsMiddleware
+from shared.query_stats import query_budget
 from models import ClientProfile, DigitalContent, ModelProfile, Transaction, User
 from bot.content_flow import (
     create_content,
@@ -35,7 +41,13 @@ from bot.content_flow import (
 )
 from shared.transactions import create_transaction
 from shared.time_utils import utcnow
-from shared.notifications import send_admin_message
+from shared.notifications import (
+    broadcast_to_admins,
+    flush_escrow_log,
+    send_admin_message,
+    send_escrow_log,
+)
+from shared.telegram_dispatcher import Priority
 from bot.session_flow import (
     create_session_request,
     get_or_create_user,
@@ -44,7 +56,7 @@ from bot.session_flow import (
     get_user_by_telegram_id,
     mark_session_confirmed,
     set_escrow_status,
-    set_session_status,
+    start_session,
     update_user_role,
 )
 
@@ -328,15 +340,8 @@ async def register_client(message: types.Message):
 
 async def _send_role_menu(message: types.Message, role: str):
     if role == "model":
-        async with AsyncSessionLocal() as db:
-            user = await get_user_by_telegram_id(db, message.from_user.id)
-            model_profile = None
-            if user:
-                profile = await db.execute(
-                    select(ModelProfile).where(ModelProfile.user_id == user.id)
-                )
-                model_profile = profile.scalar_one_or_none()
-        if model_profile and model_profile.verification_status == "approved":
+        context = await _auth_context(message.from_user.id)
+        if context and context.verification_status == "approved":
             keyboard = _model_verified_keyboard()
             text = (
                 "Model dashboard ✨\n"
@@ -385,13 +390,23 @@ async def _send_onboarding_dashboard(message: types.Message, role: str) -> None:
         return
 
 
+async def _auth_context(telegram_id: int) -> Optional[AuthContext]:
+    context = await auth_contexts.get(telegram_id)
+    if context is None:
+        async with AsyncSessionLocal() as db:
+            context = await load_auth_context(db, telegram_id)
+        if context is not None:
+            await auth_contexts.set(context)
+    return context
+
+
 async def _get_user_or_prompt_role(
     message: types.Message, user_id: int
-) -> Optional[User]:
-    async with AsyncSessionLocal() as db:
-        user = await get_user_by_telegram_id(db, user_id)
-        if not user:
-            user = await get_or_create_user(
+) -> Optional[AuthContext]:
+    context = await _auth_context(user_id)
+    if context is None:
+        async with AsyncSessionLocal() as db:
+            await get_or_create_user(
                 db=db,
                 telegram_id=user_id,
                 username=message.from_user.username if message.from_user else None,
@@ -399,37 +414,35 @@ async def _get_user_or_prompt_role(
                 last_name=message.from_user.last_name if message.from_user else None,
                 role="unassigned",
             )
-        if user.status == "banned":
-            await message.answer("Your account has been suspended. Contact support.")
+            context = await load_auth_context(db, user_id)
+    if context.status == "banned":
+        await message.answer("Your account has been suspended. Contact support.")
+        return None
+    if context.role == "unassigned":
+        role = None
+        if context.verification_status == "approved":
+            role = "model"
+        elif context.verification_status in {"submitted", "pending"}:
+            await message.answer("Verification pending. Await admin approval.")
             return None
-        if user.role == "unassigned":
-            profile = await db.execute(
-                select(ModelProfile).where(ModelProfile.user_id == user.id)
-            )
-            model_profile = profile.scalar_one_or_none()
-            if model_profile and model_profile.verification_status == "approved":
-                await update_user_role(db, user, "model")
-                return user
-            if model_profile and model_profile.verification_status in {"submitted", "pending"}:
-                await message.answer("Verification pending. Await admin approval.")
-                return None
-            client_profile = await db.execute(
-                select(ClientProfile).where(ClientProfile.user_id == user.id)
-            )
-            if client_profile.scalar_one_or_none():
-                await update_user_role(db, user, "client")
-                return user
+        elif context.has_client_profile:
+            role = "client"
+        if role is None:
             await message.answer(
                 "Open the app to choose your role and continue.",
                 reply_markup=_entry_keyboard(),
             )
             return None
-    return user
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, context.id)
+            await update_user_role(db, user, role)
+        context = dataclasses.replace(context, role=role)
+    return context
 
 
 async def _require_role_from_user_id(
     message: types.Message, user_id: int, role: str
-) -> Optional[User]:
+) -> Optional[AuthContext]:
     user = await _get_user_or_prompt_role(message, user_id)
     if not user:
         return None
@@ -439,25 +452,20 @@ async def _require_role_from_user_id(
     return user
 
 
-async def _require_role(message: types.Message, role: str) -> Optional[User]:
+async def _require_role(message: types.Message, role: str) -> Optional[AuthContext]:
     if not message.from_user:
         await message.answer("Unable to identify user. Please try again.")
         return None
     return await _require_role_from_user_id(message, message.from_user.id, role)
 
 
-async def _require_verified_model(message: types.Message) -> Optional[User]:
+async def _require_verified_model(message: types.Message) -> Optional[AuthContext]:
     user = await _require_role(message, "model")
     if not user:
         return None
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(ModelProfile).where(ModelProfile.user_id == user.id)
-        )
-        model_profile = result.scalar_one_or_none()
-        if not model_profile or model_profile.verification_status != "approved":
-            await message.answer("Verification required before accessing this feature.")
-            return None
+    if not user.is_verified_model:
+        await message.answer("Verification required before accessing this feature.")
+        return None
     return user
 
 
@@ -586,6 +594,9 @@ async def registration_input_handler(message: types.Message):
             if not profile.scalar_one_or_none():
                 db.add(ClientProfile(user_id=user.id))
                 await db.commit()
+            # update_user_role invalidated before the profile existed, so a
+            # read in between may have cached the context without it.
+            await auth_contexts.invalidate(user.telegram_id)
             PENDING_REGISTRATIONS.pop(user_id, None)
 
         await message.answer(
@@ -703,6 +714,7 @@ async def _submit_verification_video(
         model_profile.verification_status = "submitted"
         model_profile.verification_submitted_at = utcnow()
         await db.commit()
+    await auth_contexts.invalidate(user_id)
 
     await message.answer("Verification submitted. Await admin review.")
     await _notify_admins_verification(message, user, video_file_id)
@@ -948,14 +960,10 @@ async def create_session_handler(message: types.Message):
         await message.answer("Invalid arguments. Example: /create_session 123456 video 50 10")
         return
 
+    if not user.access_fee_paid:
+        await message.answer("Access fee required. Use /pay_access to unlock bookings.")
+        return
     async with AsyncSessionLocal() as db:
-        profile = await db.execute(
-            select(ClientProfile).where(ClientProfile.user_id == user.id)
-        )
-        client_profile = profile.scalar_one_or_none()
-        if not client_profile or not client_profile.access_fee_paid:
-            await message.answer("Access fee required. Use /pay_access to unlock bookings.")
-            return
         client = await get_or_create_user(
             db=db,
             telegram_id=message.from_user.id,
@@ -996,13 +1004,11 @@ async def start_session_handler(message: types.Message):
             await message.answer("Session not found.")
             return
 
-        user = await get_user_by_telegram_id(db, message.from_user.id)
-        if not user or user.id != session.model_id:
+        if user.id != session.model_id:
             await message.answer("Only the model can start the session.")
             return
 
-        session.started_at = utcnow()
-        await set_session_status(db, session, "active")
+        await start_session(db, session)
         await message.answer(f"Session {session_ref} started.")
 
 
@@ -1023,8 +1029,7 @@ async def end_session_handler(message: types.Message):
             await message.answer("Session not found.")
             return
 
-        user = await get_user_by_telegram_id(db, message.from_user.id)
-        if not user or user.id != session.model_id:
+        if user.id != session.model_id:
             await message.answer("Only the model can end the session.")
             return
 
@@ -1063,8 +1068,7 @@ async def dispute_session_handler(message: types.Message):
             await message.answer("Session not found.")
             return
 
-        user = await get_user_by_telegram_id(db, message.from_user.id)
-        if not user or user.id not in {session.client_id, session.model_id}:
+        if user.id not in {session.client_id, session.model_id}:
             await message.answer("Only participants can dispute a session.")
             return
 
@@ -1075,11 +1079,9 @@ async def dispute_session_handler(message: types.Message):
         else:
             await db.commit()
         await message.answer(f"Session {session_ref} disputed: {reason}")
-        if settings.escrow_log_channel_id:
-            await message.bot.send_message(
-                settings.escrow_log_channel_id,
-                f"Dispute opened for session {session_ref} by user {message.from_user.id}: {reason}",
-            )
+        await send_escrow_log(
+            f"Dispute opened for session {session_ref} by user {message.from_user.id}: {reason}"
+        )
 
 
 async def confirm_session_handler(message: types.Message):
@@ -1193,19 +1195,16 @@ async def add_content_handler(message: types.Message):
     await start_content_flow(message)
 
 
+@query_budget(2)
 async def list_content_handler(message: types.Message):
     user = await _require_role(message, "client")
     if not user:
         return
+    if not user.access_fee_paid:
+        await message.answer("Access fee required. Use /pay_access to unlock the gallery.")
+        return
 
-    async with AsyncSessionLocal() as db:
-        profile = await db.execute(
-            select(ClientProfile).where(ClientProfile.user_id == user.id)
-        )
-        client_profile = profile.scalar_one_or_none()
-        if not client_profile or not client_profile.access_fee_paid:
-            await message.answer("Access fee required. Use /pay_access to unlock the gallery.")
-            return
+    async with read_session() as db:
         content_list = await list_active_content(db)
         if not content_list:
             await message.answer("No content available.")
@@ -1217,8 +1216,9 @@ async def list_content_handler(message: types.Message):
         await message.answer("\n".join(lines))
 
 
+@query_budget(2)
 async def _send_my_content(message: types.Message, user_id: int):
-    async with AsyncSessionLocal() as db:
+    async with read_session() as db:
         user = await _require_role_from_user_id(message, user_id, "model")
         if not user:
             return
@@ -1258,14 +1258,10 @@ async def buy_content_handler(message: types.Message):
         await message.answer("Invalid content id.")
         return
 
+    if not user.access_fee_paid:
+        await message.answer("Access fee required. Use /pay_access to unlock the gallery.")
+        return
     async with AsyncSessionLocal() as db:
-        profile = await db.execute(
-            select(ClientProfile).where(ClientProfile.user_id == user.id)
-        )
-        client_profile = profile.scalar_one_or_none()
-        if not client_profile or not client_profile.access_fee_paid:
-            await message.answer("Access fee required. Use /pay_access to unlock the gallery.")
-            return
         content = await get_content_by_id(db, content_id)
         if not content or not content.is_active:
             await message.answer("Content not found or inactive.")
@@ -1292,6 +1288,7 @@ async def pay_access_handler(message: types.Message):
             client_profile = ClientProfile(user_id=user.id)
             db.add(client_profile)
             await db.commit()
+            await auth_contexts.invalidate(user.telegram_id)
 
         transaction = await create_transaction(
             db,
@@ -1447,7 +1444,6 @@ async def _notify_admins_crypto(message: types.Message, transaction_ref: str) ->
     if not settings.admin_telegram_ids or not settings.admin_bot_token:
         logger.warning("Admin notification not configured; crypto approval pending.")
         return
-    admin_bot = Bot(token=settings.admin_bot_token)
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -1462,16 +1458,12 @@ async def _notify_admins_crypto(message: types.Message, transaction_ref: str) ->
             ]
         ]
     )
-    for admin_id in settings.admin_telegram_ids:
-        try:
-            await admin_bot.send_message(
-                admin_id,
-                f"Crypto payment submitted ✅\nTransaction ref: {transaction_ref}",
-                reply_markup=keyboard,
-            )
-        except Exception as exc:
-            logger.warning("Failed to notify admin %s: %s", admin_id, exc)
-    await admin_bot.session.close()
+    await broadcast_to_admins(
+        settings.admin_bot_token,
+        f"Crypto payment submitted ✅\nTransaction ref: {transaction_ref}",
+        reply_markup=keyboard,
+        priority=Priority.PAYMENT,
+    )
 
 
 async def submit_verification_handler(message: types.Message):
@@ -1479,14 +1471,9 @@ async def submit_verification_handler(message: types.Message):
     if not user:
         return
 
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(
-            select(ModelProfile).where(ModelProfile.user_id == user.id)
-        )
-        profile = result.scalar_one_or_none()
-        if profile and profile.verification_status == "approved":
-            await message.answer("You are already verified ✅")
-            return
+    if user.verification_status == "approved":
+        await message.answer("You are already verified ✅")
+        return
 
     if not message.video:
         PENDING_VERIFICATIONS.add(user.id)
@@ -1502,7 +1489,8 @@ async def submit_verification_handler(message: types.Message):
         )
         model_profile = profile.scalar_one_or_none()
         if not model_profile:
-            model_profile = ModelProfile(user_id=user.id, display_name=user.first_name)
+            account = await db.get(User, user.id)
+            model_profile = ModelProfile(user_id=user.id, display_name=account.first_name)
             db.add(model_profile)
             await db.commit()
         if photo_ids:
@@ -1512,6 +1500,7 @@ async def submit_verification_handler(message: types.Message):
         model_profile.verification_status = "submitted"
         model_profile.verification_submitted_at = utcnow()
         await db.commit()
+    await auth_contexts.invalidate(user.telegram_id)
 
     await message.answer("Verification submitted. Await admin review.")
     await _notify_admins_verification(message, user, video_id, photo_ids)
@@ -1519,7 +1508,7 @@ async def submit_verification_handler(message: types.Message):
 
 async def _notify_admins_verification(
     message: types.Message,
-    user: User,
+    user: User | AuthContext,
     video_file_id: str,
     photo_ids: Optional[list[str]] = None,
 ) -> None:
@@ -1529,7 +1518,6 @@ async def _notify_admins_verification(
     if not settings.admin_bot_token:
         logger.warning("ADMIN_BOT_TOKEN not set; cannot notify admins.")
         return
-    admin_bot = Bot(token=settings.admin_bot_token)
     keyboard = None
     if settings.webapp_url:
         admin_url = f"{settings.webapp_url.rstrip('/')}/admin"
@@ -1543,16 +1531,11 @@ async def _notify_admins_verification(
                 ]
             ]
         )
-    for admin_id in settings.admin_telegram_ids:
-        try:
-            await admin_bot.send_message(
-                admin_id,
-                f"New model verification submitted ✅\nUser ID: {user.public_id}\nOpen the admin console to review.",
-                reply_markup=keyboard,
-            )
-        except Exception as exc:
-            logger.warning("Failed to notify admin %s: %s", admin_id, exc)
-    await admin_bot.session.close()
+    await broadcast_to_admins(
+        settings.admin_bot_token,
+        f"New model verification submitted ✅\nUser ID: {user.public_id}\nOpen the admin console to review.",
+        reply_markup=keyboard,
+    )
 
 
 async def on_startup(bot: Bot):
@@ -1570,14 +1553,18 @@ async def on_startup(bot: Bot):
 
 async def on_shutdown(bot: Bot):
     await bot.delete_webhook()
-    await bot.session.close()
+    await flush_escrow_log()
+    await close_bots()
 
 
 def main():
     _init_sentry()
 
-    bot = Bot(token=_require_bot_token())
+    bot = get_bot(_require_bot_token())
     dp = Dispatcher()
+    dp.update.outer_middleware(ActorMiddleware())
+    dp.message.middleware(QueryStatsMiddleware())
+    dp.callback_query.middleware(QueryStatsMiddleware())
     logger.info("User bot starting on %s:%s", settings.user_bot_host, settings.user_bot_port)
 
     dp.message.register(start_handler, Command("start"))
@@ -1589,9 +1576,30 @@ def main():
     async def handle_shutdown(app: web.Application):
         await on_shutdown(bot)
 
-    app = web.Application()
+    async def handle_db_pool(request: web.Request):
+        return web.json_response(pool_stats())
+
+    async def handle_auth_cache(request: web.Request):
+        return web.json_response(auth_contexts.stats())
+
+    async def handle_auth_cache_invalidate(request: web.Request):
+        # Called by the miniapp after it commits a role, status, verification
+        # or access-fee change for these users.
+        try:
+            payload = await request.json()
+            user_ids = [int(user_id) for user_id in payload.get("user_ids") or []]
+        except (ValueError, TypeError, AttributeError):
+            raise web.HTTPBadRequest()
+        async with AsyncSessionLocal() as db:
+            invalidated = await auth_contexts.invalidate_users(db, user_ids)
+        return web.json_response({"invalidated": invalidated})
+
+    app = web.Application(middlewares=[internal_token_middleware])
     app.on_startup.append(handle_startup)
     app.on_shutdown.append(handle_shutdown)
+    app.router.add_get("/internal/db-pool", handle_db_pool)
+    app.router.add_get("/internal/auth-cache", handle_auth_cache)
+    app.router.add_post("/internal/auth-cache/invalidate", handle_auth_cache_invalidate)
 
     from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
@@ -1726,7 +1734,6 @@ async def _notify_admins_content(
     if not settings.admin_bot_token:
         logger.warning("ADMIN_BOT_TOKEN not set; cannot notify admins.")
         return
-    admin_bot = Bot(token=settings.admin_bot_token)
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -1745,16 +1752,11 @@ async def _notify_admins_content(
             ]
         ]
     )
-    for admin_id in settings.admin_telegram_ids:
-        try:
-            await admin_bot.send_message(
-                admin_id,
-                f"New content submitted ✅\nContent #{content.id}\n{content.title} - ${content.price}",
-                reply_markup=keyboard,
-            )
-        except Exception as exc:
-            logger.warning("Failed to notify admin %s: %s", admin_id, exc)
-    await admin_bot.session.close()
+    await broadcast_to_admins(
+        settings.admin_bot_token,
+        f"New content submitted ✅\nContent #{content.id}\n{content.title} - ${content.price}",
+        reply_markup=keyboard,
+    )
 
 
 if __name__ == "__main__":
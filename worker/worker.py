@@ -1,86 +1,424 @@
 import asyncio
+import functools
 from pathlib import Path
 import sys
+import time
+from typing import Optional, Sequence
 
-from sqlalchemy import select
-from datetime import timedelta
+from aiohttp import web
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import aliased
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
-from shared.db import AsyncSessionLocal
-from shared.escrow import release_escrow
-from shared.notifications import send_user_message
+from shared.bot_pool import close_bots
+from shared.db import AsyncSessionLocal, engine, handle_db_error, pool_stats
+from shared.deadlines import DeadlineScheduler
+from shared.metrics import registry
+from shared.escrow import apply_release, release_log_message
+from shared.notifications import flush_escrow_log
+from shared.outbox import drain_outbox, enqueue_escrow_log, enqueue_user_message
+from shared.partitions import archive_expired_partitions, ensure_partitions
+from shared.stats import cached_platform_stats, fold_platform_stats, refresh_platform_stats
 from shared.config import settings
 from shared.time_utils import utcnow
-from shared.db import engine
+from shared.wallet import compact_wallets, record_entries
 from sqlalchemy.exc import DBAPIError
 from models import EscrowAccount, Session, User
 
 
-async def process_auto_release():
+ESCROW_DEADLINE = "escrow"
+SESSION_DEADLINE = "session"
+
+deadlines = DeadlineScheduler()
+
+job_seconds = registry.histogram(
+    "worker_job_duration_seconds", "Duration of one worker job run.", ["job"]
+)
+rows_processed = registry.counter(
+    "worker_rows_processed_total", "Rows released, expired or sent by worker jobs.", ["job"]
+)
+job_errors = registry.counter(
+    "worker_errors_total", "Worker job errors by exception type.", ["job", "error"]
+)
+overdue_age = registry.gauge(
+    "worker_overdue_age_seconds",
+    "Age of the oldest escrow or session past its deadline (0 when none).",
+    ["kind"],
+)
+db_pool_gauges = registry.gauge("db_pool", "Database connection pool state.", ["stat"])
+deadline_gauges = registry.gauge(
+    "worker_deadline_scheduler", "Deadline scheduler state and firing lateness.", ["stat"]
+)
+
+
+def timed_job(job: str):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as exc:
+                job_errors.inc(job=job, error=type(exc).__name__)
+                raise
+            finally:
+                job_seconds.observe(time.perf_counter() - started, job=job)
+            rows_processed.inc(len(result) if isinstance(result, set) else result or 0, job=job)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _db_error(job: str, exc: DBAPIError) -> None:
+    job_errors.inc(job=job, error=type(exc.orig or exc).__name__)
+    handle_db_error(exc)
+
+
+@timed_job("auto_release")
+async def process_auto_release(escrow_ids: Optional[Sequence[int]] = None) -> int:
     if settings.manual_release_only:
-        return
+        return 0
+    released = 0
     try:
         async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(EscrowAccount).where(
-                    (EscrowAccount.status == "held")
-                    & (EscrowAccount.auto_release_at.is_not(None))
-                    & (EscrowAccount.auto_release_at <= utcnow())
+            while True:
+                # Each replica claims a bounded batch; SKIP LOCKED leaves rows
+                # another replica is already releasing to that replica.
+                query = (
+                    select(EscrowAccount)
+                    .where(
+                        (EscrowAccount.status == "held")
+                        & (EscrowAccount.auto_release_at.is_not(None))
+                        & (EscrowAccount.auto_release_at <= utcnow())
+                    )
+                    .order_by(EscrowAccount.auto_release_at)
+                    .limit(settings.worker_batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                if escrow_ids is not None:
+                    query = query.where(EscrowAccount.id.in_(escrow_ids))
+                escrows = list((await db.execute(query)).scalars().all())
+                credits = []
+                for escrow in escrows:
+                    credit = apply_release(escrow, reason="auto_release")
+                    if credit is not None:
+                        credits.append(credit)
+                    enqueue_escrow_log(db, release_log_message(escrow, "auto_release"))
+                await record_entries(db, credits)
+                await db.commit()
+                released += len(escrows)
+                if len(escrows) < settings.worker_batch_size:
+                    break
+    except DBAPIError as exc:
+        # Connection drops can happen; the broken connection is discarded and
+        # the job runs again next cycle.
+        _db_error("auto_release", exc)
+    return released
+
+
+@timed_job("session_timeouts")
+async def process_session_timeouts(session_ids: Optional[Sequence[int]] = None) -> set[int]:
+    expired: set[int] = set()
+    try:
+        async with AsyncSessionLocal() as db:
+            client = aliased(User)
+            model = aliased(User)
+            while True:
+                now = utcnow()
+                due = (
+                    select(Session.id)
+                    .where((Session.status == "active") & (Session.scheduled_end <= now))
+                    .order_by(Session.scheduled_end)
+                    .limit(settings.worker_batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                if session_ids is not None:
+                    due = due.where(Session.id.in_(session_ids))
+                # Sessions expire by id alone; the participants are outer-joined
+                # afterwards, so one whose user row is missing still expires.
+                claimed = (
+                    update(Session)
+                    .where(Session.id.in_(due.scalar_subquery()))
+                    .values(status="awaiting_confirmation", ended_at=now)
+                    .returning(Session.id, Session.session_ref, Session.client_id, Session.model_id)
+                    .cte("claimed")
+                )
+                stmt = select(
+                    claimed.c.id, claimed.c.session_ref, client.telegram_id, model.telegram_id
+                ).select_from(
+                    claimed.outerjoin(client, client.id == claimed.c.client_id).outerjoin(
+                        model, model.id == claimed.c.model_id
+                    )
                 )
+                rows = (await db.execute(stmt)).all()
+                if not rows:
+                    await db.commit()
+                    break
+                for session_id, session_ref, client_tg, model_tg in rows:
+                    expired.add(session_id)
+                    message = (
+                        f"Session {session_ref} time ended. "
+                        f"Confirm completion with /confirm_session {session_ref}."
+                    )
+                    for telegram_id in (client_tg, model_tg):
+                        if telegram_id is not None:
+                            enqueue_user_message(db, telegram_id, message)
+                await db.commit()
+    except DBAPIError as exc:
+        _db_error("session_timeouts", exc)
+    return expired
+
+
+@timed_job("outbox")
+async def process_outbox() -> int:
+    sent = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            # Keep draining while batches come back full.
+            while True:
+                claimed = await drain_outbox(db)
+                sent += claimed
+                if claimed < settings.outbox_batch_size:
+                    break
+    except DBAPIError as exc:
+        _db_error("outbox", exc)
+    return sent
+
+
+@timed_job("wallet_compaction")
+async def process_wallet_compaction() -> int:
+    compacted = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            while True:
+                batch = await compact_wallets(db, settings.worker_batch_size)
+                compacted += batch
+                if batch < settings.worker_batch_size:
+                    break
+    except DBAPIError as exc:
+        _db_error("wallet_compaction", exc)
+    return compacted
+
+
+async def wallet_loop():
+    while True:
+        await process_wallet_compaction()
+        await asyncio.sleep(settings.wallet_compact_seconds)
+
+
+@timed_job("partition_maintenance")
+async def process_partition_maintenance() -> int:
+    now = utcnow()
+    retention = {
+        "transactions": settings.transactions_retention_months,
+        "admin_actions": settings.admin_actions_retention_months,
+    }
+    changed = 0
+    try:
+        for table, months in retention.items():
+            created = await ensure_partitions(engine, table, now, settings.partition_months_ahead)
+            archived = await archive_expired_partitions(
+                engine, table, now, months, settings.partition_archive_schema
             )
-            escrows = list(result.scalars().all())
-            for escrow in escrows:
-                _, changed = await release_escrow(db, escrow, reason="auto_release")
-                if not changed:
+            for name in archived:
+                print(f"Archived partition {name} to {settings.partition_archive_schema}")
+            changed += len(created) + len(archived)
+    except DBAPIError as exc:
+        _db_error("partition_maintenance", exc)
+    return changed
+
+
+async def partition_loop():
+    while True:
+        await process_partition_maintenance()
+        await asyncio.sleep(settings.partition_maintenance_seconds)
+
+
+@timed_job("stats_fold")
+async def process_platform_stats() -> int:
+    folded = 0
+    try:
+        async with AsyncSessionLocal() as db:
+            while True:
+                batch = await fold_platform_stats(db, settings.worker_batch_size)
+                if batch is None:
+                    # Never seeded (fresh database or migration 0017): the
+                    # one full recount; deltas take over from there.
+                    async with AsyncSessionLocal() as seed:
+                        await refresh_platform_stats(seed)
                     continue
+                folded += batch
+                if batch < settings.worker_batch_size:
+                    break
     except DBAPIError as exc:
-        # Connection drops can happen; reset pool and try again next cycle.
-        print(f"Worker DB error: {exc}")
-        await engine.dispose()
+        _db_error("stats_fold", exc)
+    return folded
+
+
+async def stats_loop():
+    while True:
+        await process_platform_stats()
+        await asyncio.sleep(settings.stats_refresh_seconds)
+
+
+async def outbox_loop():
+    while True:
+        await process_outbox()
+        await asyncio.sleep(settings.outbox_poll_seconds)
+
+
+class DeadlineLoader:
+    def __init__(self, scheduler: DeadlineScheduler) -> None:
+        self.scheduler = scheduler
+        self._last_escrow_id = 0
+        self._last_session_start = None
+
+    @timed_job("deadline_load")
+    async def load(self, *, full: bool = False) -> None:
+        # Incremental loads only pick up escrows created and sessions started
+        # since the previous load; a full load rebuilds the heap so edited or
+        # finished rows are reflected too.
+        if full:
+            self.scheduler.clear()
+            self._last_escrow_id = 0
+            self._last_session_start = None
+        try:
+            async with AsyncSessionLocal() as db:
+                if not settings.manual_release_only:
+                    await self._load_escrows(db)
+                await self._load_sessions(db)
+        except DBAPIError as exc:
+            _db_error("deadline_load", exc)
+
+    async def _load_escrows(self, db) -> None:
+        result = await db.execute(
+            select(EscrowAccount.id, EscrowAccount.auto_release_at).where(
+                (EscrowAccount.status == "held")
+                & (EscrowAccount.auto_release_at.is_not(None))
+                & (EscrowAccount.id > self._last_escrow_id)
+            )
+        )
+        for escrow_id, due_at in result.all():
+            self.scheduler.schedule(ESCROW_DEADLINE, escrow_id, due_at)
+            self._last_escrow_id = max(self._last_escrow_id, escrow_id)
 
+    async def _load_sessions(self, db, session_ids: Optional[Sequence[int]] = None) -> None:
+        query = select(Session.id, Session.started_at, Session.scheduled_end).where(
+            (Session.status == "active") & (Session.scheduled_end.is_not(None))
+        )
+        if session_ids is not None:
+            query = query.where(Session.id.in_(session_ids))
+        elif self._last_session_start is not None:
+            query = query.where(Session.started_at >= self._last_session_start)
+        result = await db.execute(query)
+        for session_id, started_at, scheduled_end in result.all():
+            self.scheduler.schedule(SESSION_DEADLINE, session_id, scheduled_end)
+            if session_ids is None and started_at is not None and (
+                self._last_session_start is None or started_at > self._last_session_start
+            ):
+                self._last_session_start = started_at
 
-async def process_session_timeouts():
+    async def reschedule_sessions(self, session_ids: Sequence[int]) -> None:
+        # Sessions that were due but not expired had their scheduled_end
+        # pushed back (extensions); re-read it instead of waiting for a resync.
+        try:
+            async with AsyncSessionLocal() as db:
+                await self._load_sessions(db, session_ids)
+        except DBAPIError as exc:
+            _db_error("deadline_load", exc)
+
+
+async def fire_due_deadlines(loader: DeadlineLoader) -> int:
+    due = deadlines.pop_due()
+    escrow_ids = [key for kind, key, _ in due if kind == ESCROW_DEADLINE]
+    session_ids = [key for kind, key, _ in due if kind == SESSION_DEADLINE]
+    if escrow_ids:
+        await process_auto_release(escrow_ids)
+    if session_ids:
+        expired = await process_session_timeouts(session_ids)
+        pending = [session_id for session_id in session_ids if session_id not in expired]
+        if pending:
+            await loader.reschedule_sessions(pending)
+    return len(due)
+
+
+async def maintenance_loop():
+    loader = DeadlineLoader(deadlines)
+    await loader.load(full=True)
+    now = time.monotonic()
+    next_refresh = now + settings.worker_deadline_refresh_seconds
+    next_resync = now + settings.worker_deadline_resync_seconds
+    while True:
+        await fire_due_deadlines(loader)
+        now = time.monotonic()
+        if now >= next_resync:
+            print(f"Deadline scheduler: {deadlines.stats()}")
+            await loader.load(full=True)
+            next_resync = now + settings.worker_deadline_resync_seconds
+            next_refresh = now + settings.worker_deadline_refresh_seconds
+        elif now >= next_refresh:
+            await loader.load()
+            next_refresh = now + settings.worker_deadline_refresh_seconds
+        await deadlines.wait(max(0.0, next_refresh - time.monotonic()))
+
+
+async def refresh_backlog_gauges() -> None:
+    now = utcnow()
     try:
         async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(Session).where(
-                    (Session.status == "active")
-                    & (Session.started_at.is_not(None))
-                    & (Session.duration_minutes.is_not(None))
+            oldest_escrow = await db.scalar(
+                select(func.min(EscrowAccount.auto_release_at)).where(
+                    (EscrowAccount.status == "held") & (EscrowAccount.auto_release_at <= now)
+                )
+            )
+            oldest_session = await db.scalar(
+                select(func.min(Session.scheduled_end)).where(
+                    (Session.status == "active") & (Session.scheduled_end <= now)
                 )
             )
-            sessions = list(result.scalars().all())
-            now = utcnow()
-            for session in sessions:
-                cutoff = session.started_at + timedelta(minutes=session.duration_minutes)
-                if cutoff <= now:
-                    session.status = "awaiting_confirmation"
-                    session.ended_at = now
-                    await db.commit()
-                    client = await db.get(User, session.client_id)
-                    model = await db.get(User, session.model_id)
-                    if client:
-                        await send_user_message(
-                            client.telegram_id,
-                            f"Session {session.session_ref} time ended. Confirm completion with /confirm_session {session.session_ref}.",
-                        )
-                    if model:
-                        await send_user_message(
-                            model.telegram_id,
-                            f"Session {session.session_ref} time ended. Confirm completion with /confirm_session {session.session_ref}.",
-                        )
     except DBAPIError as exc:
-        print(f"Worker DB error: {exc}")
-        await engine.dispose()
+        _db_error("metrics", exc)
+        return
+    if settings.manual_release_only:
+        oldest_escrow = None
+    for kind, oldest in (("escrow", oldest_escrow), ("session", oldest_session)):
+        overdue_age.set((now - oldest).total_seconds() if oldest else 0.0, kind=kind)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    await refresh_backlog_gauges()
+    for stat, value in deadlines.stats().items():
+        deadline_gauges.set(value, stat=stat)
+    pool = pool_stats()
+    for stat in ("size", "checked_out", "checked_in", "overflow"):
+        db_pool_gauges.set(pool[stat], stat=stat)
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server() -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, settings.worker_metrics_host, settings.worker_metrics_port).start()
+    return runner
 
 
 async def background_worker():
-    while True:
-        await process_auto_release()
-        await process_session_timeouts()
-        await asyncio.sleep(60)
+    runner = await start_metrics_server() if settings.worker_metrics_port else None
+    try:
+        await asyncio.gather(
+            maintenance_loop(), outbox_loop(), wallet_loop(), partition_loop(), stats_loop()
+        )
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await flush_escrow_log()
+        await close_bots()
 
 
 if __name__ == "__main__":